@@ -0,0 +1,28 @@
+-- Push workspace changes to ~/.config/scripts/x11/workspaces.py over D-Bus.
+--
+-- Load from rc.lua (after the tags are created):
+--   require("workspaces_signal")
+
+local awful = require("awful")
+
+local function publish()
+  local s = awful.screen.focused()
+  if not s then return end
+
+  local tags = {}
+  for _, t in ipairs(s.tags) do
+    table.insert(tags, t.selected and ("[" .. t.name .. "]") or t.name)
+  end
+
+  dbus.emit_signal("session", "/org/awesomewm/Workspaces",
+                   "org.awesomewm.Workspaces", "Changed",
+                   "s", table.concat(tags, " "))
+end
+
+tag.connect_signal("property::selected", publish)
+tag.connect_signal("property::name", publish)
+tag.connect_signal("property::activated", publish)
+screen.connect_signal("property::geometry", publish)
+client.connect_signal("focus", publish)  -- focus moving across screens
+
+return publish
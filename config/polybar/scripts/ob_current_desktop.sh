@@ -1,9 +1,4 @@
 #!/usr/bin/env bash
 
-# Output the current desktop immediately
-wmctrl -d | awk '$2 == "*" { print "" $1 + 1 }'
-
-# Then listen for changes using xprop
-xprop -root -spy _NET_CURRENT_DESKTOP | while read -r; do
-  wmctrl -d | awk '$2 == "*" { print "" $1 + 1 }'
-done
+# Event-driven: prints the current desktop once, then only on change
+exec /usr/bin/python3 ~/.config/scripts/dotctl.py workspaces openbox "$@"
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+audio_status.py — long-lived audio output producer for polybar / waybar.
+
+Keeps one subscription to the sound server open and prints the default
+sink's label, volume and mute state only when one of them changes:
+
+  • pulsectl installed: a single native-protocol connection subscribed to
+    sink + server events; queries go over the same connection.
+  • otherwise: one `pactl subscribe` child; each burst of sink/server
+    events triggers one dotlib.audio snapshot.
+
+The label/icon come from dotlib.audio, the same classification the
+switch_audio_sink.py menu uses. The current state is also written to
+$XDG_RUNTIME_DIR/audio_status.json for anything else that wants it.
+
+Usage:
+  audio_status.py                     # polybar:  tail = true
+  audio_status.py --json              # waybar:   "return-type": "json"
+  audio_status.py --once              # print the current state and exit
+  audio_status.py --format '{kind} {volume}% {desc}'
+
+Format fields: {icon} {kind} {volume} {desc} {label}
+  ({icon} is the volume/muted glyph, {kind} the sink-type emoji from the menu)
+"""
+
+import os
+import select
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from dotlib import audio
+
+ICON_VOLUME = ""  # fa-volume-high
+ICON_MUTED = ""   # fa-volume-xmark
+MUTED_COLOR = "#666"
+
+DEFAULT_FORMAT = "{icon} {volume}%"
+
+COALESCE_S = 0.05   # pactl prints several events per change; read them as one burst
+
+
+# ---------- rendering ----------------------------------------------------- #
+
+def render_text(sink: dict | None, fmt: str, polybar: bool = True) -> str:
+    if not sink:
+        return "N/A"
+    vol = sink.get("volume")
+    text = fmt.format(
+        icon=ICON_MUTED if sink.get("mute") else ICON_VOLUME,
+        kind=audio.icon_for(sink),
+        volume=vol if vol is not None else "?",
+        desc=audio.clean_description(sink.get("description")),
+        label=audio.label(sink, mark_default=False),
+    )
+    if polybar and sink.get("mute"):
+        text = f"%{{F{MUTED_COLOR}}}{text}%{{F-}}"
+    return text
+
+
+def render_json(sink: dict | None, fmt: str) -> str:
+    import json
+    if not sink:
+        return json.dumps({"text": "N/A", "tooltip": "no audio sink", "class": "none"})
+    return json.dumps({
+        "text": render_text(sink, fmt, polybar=False),
+        "tooltip": audio.label(sink, mark_default=False),
+        "class": "muted" if sink.get("mute") else "active",
+        "percentage": sink.get("volume") or 0,
+    }, ensure_ascii=False)
+
+
+class Emitter:
+    """Print (and publish) only when the rendered line actually changes."""
+
+    def __init__(self, render, fmt: str):
+        self.render = render
+        self.fmt = fmt
+        self.last = None
+
+    def __call__(self, sinks) -> None:
+        sink = audio.default_sink(sinks)
+        line = self.render(sink, self.fmt)
+        if line != self.last:
+            print(line, flush=True)
+            audio.write_status(sink)
+            self.last = line
+
+
+# ---------- event sources ------------------------------------------------- #
+
+def run_pulsectl(emit: Emitter) -> None:
+    import pulsectl
+
+    def stop(_ev):
+        raise pulsectl.PulseLoopStop
+
+    with pulsectl.Pulse("audio-status") as pulse:
+        pulse.event_mask_set("sink", "server")
+        pulse.event_callback_set(stop)
+        while True:
+            emit(audio.pulse_snapshot(pulse)[0])
+            pulse.event_listen()
+
+
+def _relevant(line: bytes) -> bool:
+    # "Event 'change' on sink #57" / "Event 'change' on server #-1"
+    return b" on sink #" in line or b" on server" in line
+
+
+def run_pactl(emit: Emitter) -> None:
+    proc = subprocess.Popen(["pactl", "subscribe"], stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL)
+    fd = proc.stdout.fileno()
+    buf = b""
+    try:
+        emit(audio.snapshot()[0])
+        while True:
+            select.select([fd], [], [])
+            dirty = False
+            # Drain the whole burst before re-querying once
+            while select.select([fd], [], [], COALESCE_S)[0]:
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    return
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                dirty = dirty or any(_relevant(l) for l in lines)
+            if dirty:
+                emit(audio.snapshot()[0])
+    finally:
+        proc.terminate()
+
+
+# ---------- main ---------------------------------------------------------- #
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Audio output producer for status bars")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, help=f"text format (default: '{DEFAULT_FORMAT}')")
+    parser.add_argument("--json", action="store_true", help="emit waybar JSON instead of plain text")
+    parser.add_argument("--once", action="store_true", help="print the current state and exit")
+    args = parser.parse_args()
+
+    emit = Emitter(render_json if args.json else render_text, args.format)
+    if args.once:
+        emit(audio.snapshot()[0])
+        return 0
+
+    if audio.load_pulsectl() is not None:
+        try:
+            run_pulsectl(emit)
+        except BrokenPipeError:
+            raise
+        except Exception:
+            pass  # native socket unavailable — fall back to pactl
+    run_pactl(emit)
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except (KeyboardInterrupt, BrokenPipeError):
+        sys.exit(0)
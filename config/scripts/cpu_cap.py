@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+cpu_cap.py — apply a CPU frequency cap per cpufreq policy, in one privileged call.
+
+The old scripts ran `echo | sudo tee` once per CPU (one sudo + one tee per
+thread). This computes the target values unprivileged and hands them, as
+one JSON plan, to the root-owned helper /usr/local/libexec/cpu-cap-apply
+(installed by install-*.sh), which validates the plan and writes every
+/sys/devices/system/cpu/cpufreq/policy*/ file directly (a policy covers all
+CPUs that share a clock, so there is one write per policy rather than per CPU).
+
+With intel_pstate it also sets intel_pstate/max_perf_pct and the energy
+performance preference (EPP) of each policy.
+
+The applied state is stored in $XDG_RUNTIME_DIR/cpu_cap.json and running
+cpu_freq.py producers are poked with SIGUSR1 so the bar updates immediately.
+
+Usage:
+  cpu_cap.py full | quiet | battery     # named profiles
+  cpu_cap.py --max-mhz 2400             # custom cap (old cpu_speed_limit.sh N)
+  cpu_cap.py toggle [--max-mhz 2400]    # full <-> quiet (or the given cap)
+  cpu_cap.py status                     # print the applied state as JSON
+
+The helper runs through `sudo -n` (the installer adds a NOPASSWD rule for
+that one root-owned path); without the rule it falls back to pkexec, which
+asks for the password through the polkit agent. CPU_CAP_SUDO overrides the
+command (e.g. "doas -n").
+"""
+
+import json
+import os
+import signal
+import sys
+from glob import glob
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from dotlib import proc
+
+POLICY_GLOB = "/sys/devices/system/cpu/cpufreq/policy[0-9]*"
+PSTATE_DIR = "/sys/devices/system/cpu/intel_pstate"
+
+# pct: share of each policy's cpuinfo_max_freq; epp: only applied if available
+PROFILES: dict[str, dict] = {
+    "full":    {"pct": 100, "epp": "balance_performance"},
+    "quiet":   {"pct": 60,  "epp": "balance_power"},
+    "battery": {"pct": 45,  "epp": "power"},
+}
+TOGGLE_PROFILE = "quiet"
+
+HELPER = os.environ.get("CPU_CAP_HELPER", "/usr/local/libexec/cpu-cap-apply")
+ELEVATE_TIMEOUT_S = 10   # sudo -n never prompts
+PROMPT_TIMEOUT_S = 120   # pkexec (or a custom CPU_CAP_SUDO) waits on the user
+
+STATE_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "cpu_cap.json")
+PRODUCER = "cpu_freq.py"
+
+
+# ---------- sysfs helpers ------------------------------------------------- #
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _read_int(path: str) -> int | None:
+    v = _read(path)
+    try:
+        return int(v) if v is not None else None
+    except ValueError:
+        return None
+
+
+# ---------- plan (unprivileged) ------------------------------------------- #
+
+def plan(profile: str, max_mhz: int | None) -> dict:
+    """Compute the per-policy targets for a profile or a custom MHz cap."""
+    spec = PROFILES.get(profile, {}) if max_mhz is None else {}
+    policies = []
+    for pdir in sorted(glob(POLICY_GLOB)):
+        hw_max = _read_int(os.path.join(pdir, "cpuinfo_max_freq"))
+        hw_min = _read_int(os.path.join(pdir, "cpuinfo_min_freq")) or 0
+        if not hw_max:
+            continue
+        if max_mhz is not None:
+            target = min(hw_max, max_mhz * 1000)
+        else:
+            target = hw_max * spec.get("pct", 100) // 100
+        entry = {"policy": os.path.basename(pdir), "max_khz": max(hw_min, target), "hw_max_khz": hw_max}
+
+        epp = spec.get("epp")
+        avail = _read(os.path.join(pdir, "energy_performance_available_preferences"))
+        if epp and avail and epp in avail.split():
+            entry["epp"] = epp
+        policies.append(entry)
+
+    state: dict = {"profile": profile if max_mhz is None else f"{max_mhz}MHz", "policies": policies}
+    if os.path.isdir(PSTATE_DIR) and policies:
+        top = max(p["hw_max_khz"] for p in policies)
+        want = max(p["max_khz"] for p in policies)
+        state["max_perf_pct"] = max(1, min(100, round(want * 100 / top)))
+    return state
+
+
+# ---------- apply (root helper) ------------------------------------------ #
+
+def elevate(state: dict) -> dict | None:
+    """Hand the plan to the root helper once; return the applied state it reports."""
+    plan_json = json.dumps(state)
+    if os.geteuid() == 0:
+        attempts = [([], ELEVATE_TIMEOUT_S)]
+    elif "CPU_CAP_SUDO" in os.environ:
+        attempts = [(os.environ["CPU_CAP_SUDO"].split(), PROMPT_TIMEOUT_S)]
+    else:
+        attempts = [(["sudo", "-n"], ELEVATE_TIMEOUT_S), (["pkexec"], PROMPT_TIMEOUT_S)]
+
+    reason = None
+    for prefix, timeout in attempts:
+        cp = proc.run(prefix + [HELPER], timeout=timeout, input=plan_json, stderr=True)
+        if cp.ok:
+            try:
+                return json.loads(cp.stdout)
+            except ValueError:
+                return None
+        reason = "timed out" if cp.timed_out else cp.stderr.strip() or cp.returncode
+        if cp.timed_out or cp.returncode == 2:
+            break   # the user never answered, or the helper ran and rejected the plan
+    print(f"Error: privileged apply failed: {reason}", file=sys.stderr)
+    return None
+
+
+# ---------- state & bar feedback ------------------------------------------ #
+
+def load_state() -> dict | None:
+    try:
+        with open(STATE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_capped() -> bool:
+    """Prefer the recorded state; fall back to sysfs if nothing was recorded."""
+    st = load_state()
+    if st is not None:
+        return st.get("profile") != "full"
+    for pdir in glob(POLICY_GLOB):
+        cur = _read_int(os.path.join(pdir, "scaling_max_freq"))
+        hw = _read_int(os.path.join(pdir, "cpuinfo_max_freq"))
+        if cur and hw and cur < hw:
+            return True
+    return False
+
+
+def save_state(state: dict) -> None:
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, STATE_FILE)
+
+
+def is_producer(argv: list[str]) -> bool:
+    """cpu_freq.py run directly, or through dotctl (dotctl.py cpu freq / dotctl-cpu-freq)."""
+    if argv and os.path.basename(argv[0]).startswith("python"):
+        argv = argv[1:]
+        while argv and argv[0].startswith("-"):   # interpreter options (-u, -X ...)
+            argv = argv[1:]
+    if not argv:
+        return False
+    words = [os.path.basename(argv[0])] + argv[1:3]
+    return words[0] in (PRODUCER, "dotctl-cpu-freq") or words == ["dotctl.py", "cpu", "freq"]
+
+
+def poke_producers() -> None:
+    """SIGUSR1 every running cpu_freq.py (direct or via dotctl) so the bar re-renders now."""
+    uid = os.getuid()
+    for pid_dir in glob("/proc/[0-9]*"):
+        try:
+            if os.stat(pid_dir).st_uid != uid:
+                continue
+            with open(os.path.join(pid_dir, "cmdline"), "rb") as f:
+                argv = [a.decode(errors="ignore") for a in f.read().split(b"\0")]
+        except OSError:
+            continue
+        if is_producer(argv):
+            try:
+                os.kill(int(os.path.basename(pid_dir)), signal.SIGUSR1)
+            except OSError:
+                pass
+
+
+# ---------- main ---------------------------------------------------------- #
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Per-policy CPU frequency cap manager")
+    parser.add_argument("profile", nargs="?", choices=sorted(PROFILES) + ["toggle", "status"])
+    parser.add_argument("--max-mhz", type=int, help="custom cap in MHz instead of a named profile")
+    args = parser.parse_args()
+
+    if args.profile == "status":
+        print(json.dumps(load_state() or {}, indent=2))
+        return 0
+
+    profile = args.profile or "full"
+    max_mhz = args.max_mhz
+    if profile == "toggle":
+        if is_capped():
+            profile, max_mhz = "full", None
+        else:
+            profile = TOGGLE_PROFILE
+
+    state = plan(profile, max_mhz)
+    if not state["policies"]:
+        print("Error: no cpufreq policies found", file=sys.stderr)
+        return 1
+
+    applied = elevate(state)
+    if applied is None:
+        return 1
+
+    for err in applied.get("errors", []):
+        print(f"Warning: {err}", file=sys.stderr)
+    save_state(applied)
+    poke_producers()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
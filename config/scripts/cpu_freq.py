@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+cpu_freq.py — long-lived CPU frequency producer for polybar / waybar.
+
+Instead of parsing the whole of /proc/cpuinfo every tick (which makes the
+kernel IPI every CPU to refresh `cpu MHz`), this keeps every
+/sys/devices/system/cpu/cpu*/cpufreq/scaling_cur_freq open and re-reads the
+open descriptors with pread(). One process lives for the whole session and
+only prints when the rendered line changes.
+
+cpu_cap.py records the applied profile in $XDG_RUNTIME_DIR/cpu_cap.json and
+sends SIGUSR1; the producer then re-reads that file and re-renders at once.
+
+Reported:
+  • average, min and max current frequency across all online CPUs
+  • per-cluster averages on hybrid CPUs (P/E cores, grouped by cpuinfo_max_freq)
+  • cap state: capped if ANY cpu has scaling_max_freq below its cpuinfo_max_freq
+
+Usage:
+  cpu_freq.py                     # polybar:  tail = true
+  cpu_freq.py --json              # waybar:   "return-type": "json"
+  cpu_freq.py --once              # print a single sample and exit
+  cpu_freq.py --interval 1 --format '{icon} {avg} GHz ({min}-{max})'
+
+Format fields: {icon} {avg} {min} {max} {clusters} {profile}
+"""
+
+import os
+import signal
+import sys
+from glob import glob
+
+CPU_GLOB = "/sys/devices/system/cpu/cpu[0-9]*"
+
+ICON_CAPPED = ""   # fa-seedling
+ICON_FULL = ""     # fa-fire
+
+DEFAULT_FORMAT = "{icon} {avg} GHz"
+
+CAP_STATE_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "cpu_cap.json")
+
+
+# ---------- sysfs readers ------------------------------------------------- #
+
+def _read_int(path: str) -> int | None:
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def read_profile() -> str:
+    """Profile last applied by cpu_cap.py, or '' if it never ran."""
+    import json
+    try:
+        with open(CAP_STATE_FILE, "r") as f:
+            return json.load(f).get("profile", "")
+    except (OSError, ValueError):
+        return ""
+
+
+def _pread_int(fd: int) -> int | None:
+    try:
+        return int(os.pread(fd, 32, 0).strip())
+    except (OSError, ValueError):
+        return None
+
+
+class Cpu:
+    """One logical CPU with its cpufreq files held open."""
+
+    def __init__(self, cpu_dir: str):
+        self.name = os.path.basename(cpu_dir)
+        freq_dir = os.path.join(cpu_dir, "cpufreq")
+        self.hw_max = _read_int(os.path.join(freq_dir, "cpuinfo_max_freq")) or 0
+        self.cur_fd = os.open(os.path.join(freq_dir, "scaling_cur_freq"), os.O_RDONLY)
+        self.max_fd = os.open(os.path.join(freq_dir, "scaling_max_freq"), os.O_RDONLY)
+
+    def cur_khz(self) -> int | None:
+        return _pread_int(self.cur_fd)
+
+    def cap_khz(self) -> int | None:
+        return _pread_int(self.max_fd)
+
+    def close(self) -> None:
+        for fd in (self.cur_fd, self.max_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class Sampler:
+    """Holds every online CPU open; re-scans only when a read fails (hotplug)."""
+
+    def __init__(self):
+        self.cpus: list[Cpu] = []
+        self.clusters: dict[int, list[Cpu]] = {}
+        self.rescan()
+
+    def rescan(self) -> None:
+        self.close()
+        for cpu_dir in sorted(glob(CPU_GLOB), key=lambda p: int(p.rsplit("cpu", 1)[1])):
+            try:
+                self.cpus.append(Cpu(cpu_dir))
+            except OSError:
+                continue  # offline CPU or no cpufreq driver
+        # Hybrid parts expose different cpuinfo_max_freq per core type
+        self.clusters = {}
+        for cpu in self.cpus:
+            self.clusters.setdefault(cpu.hw_max, []).append(cpu)
+
+    def close(self) -> None:
+        for cpu in self.cpus:
+            cpu.close()
+        self.cpus = []
+
+    def cluster_label(self, hw_max: int) -> str:
+        keys = sorted(self.clusters, reverse=True)
+        if len(keys) == 2:
+            return "P" if hw_max == keys[0] else "E"
+        return f"{hw_max / 1e6:.1f}G"
+
+    def sample(self) -> dict | None:
+        cur: dict[Cpu, int] = {}
+        capped = False
+        for cpu in self.cpus:
+            khz = cpu.cur_khz()
+            cap = cpu.cap_khz()
+            if khz is None or cap is None:
+                # A CPU went offline under us; pick up the new set next tick
+                self.rescan()
+                return None
+            cur[cpu] = khz
+            if cpu.hw_max and cap < cpu.hw_max:
+                capped = True
+        if not cur:
+            return None
+
+        values = list(cur.values())
+        clusters = {}
+        if len(self.clusters) > 1:
+            for hw_max, members in sorted(self.clusters.items(), reverse=True):
+                khz = [cur[c] for c in members]
+                clusters[self.cluster_label(hw_max)] = sum(khz) / len(khz) / 1e6
+        return {
+            "avg": sum(values) / len(values) / 1e6,
+            "min": min(values) / 1e6,
+            "max": max(values) / 1e6,
+            "clusters": clusters,
+            "capped": capped,
+        }
+
+
+# ---------- rendering ----------------------------------------------------- #
+
+def render_text(s: dict, fmt: str) -> str:
+    clusters = " ".join(f"{k}:{v:.2f}" for k, v in s["clusters"].items())
+    return fmt.format(
+        icon=ICON_CAPPED if s["capped"] else ICON_FULL,
+        avg=f"{s['avg']:.2f}",
+        min=f"{s['min']:.2f}",
+        max=f"{s['max']:.2f}",
+        clusters=clusters,
+        profile=s.get("profile", ""),
+    )
+
+
+def render_json(s: dict, fmt: str) -> str:
+    import json
+    tooltip = [f"avg {s['avg']:.2f} GHz  min {s['min']:.2f}  max {s['max']:.2f}"]
+    for k, v in s["clusters"].items():
+        tooltip.append(f"{k}-cores {v:.2f} GHz")
+    tooltip.append("capped" if s["capped"] else "uncapped")
+    if s.get("profile"):
+        tooltip.append(f"profile: {s['profile']}")
+    return json.dumps({
+        "text": render_text(s, fmt),
+        "tooltip": "\n".join(tooltip),
+        "class": "capped" if s["capped"] else "full",
+    }, ensure_ascii=False)
+
+
+# ---------- main loop ----------------------------------------------------- #
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="CPU frequency producer for status bars")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between samples (default: 2)")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, help=f"text format (default: '{DEFAULT_FORMAT}')")
+    parser.add_argument("--json", action="store_true", help="emit waybar JSON instead of plain text")
+    parser.add_argument("--once", action="store_true", help="print one sample and exit")
+    args = parser.parse_args()
+
+    render = render_json if args.json else render_text
+    sampler = Sampler()
+    if not sampler.cpus:
+        print("N/A", flush=True)
+        return 1
+
+    # SIGUSR1 → sample immediately (e.g. right after the cap was changed).
+    # Blocked + sigtimedwait() so the wake-up doubles as the tick timer.
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGUSR1})
+
+    last = None
+    profile = read_profile()
+    while True:
+        s = sampler.sample()
+        if s is not None:
+            s["profile"] = profile
+            line = render(s, args.format)
+            if line != last:
+                print(line, flush=True)
+                last = line
+            if args.once:
+                return 0
+        if signal.sigtimedwait({signal.SIGUSR1}, args.interval) is not None:
+            profile = read_profile()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except (KeyboardInterrupt, BrokenPipeError):
+        sys.exit(0)
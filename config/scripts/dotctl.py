@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+dotctl.py — one entry point for the dotfiles scripts.
+
+  dotctl display pick-best [--apply]     dotctl bt pick
+  dotctl audio switch [--wofi]           dotctl power
+
+`dotctl help` lists every command. The session type picks the backend for
+commands that exist for both (x11/ or wayland/ script). Symlinks work too:
+`dotctl-display-pick-best` runs `dotctl display pick-best`.
+
+Nothing but os/sys is imported here; the chosen script is run as __main__
+from its cached bytecode (__pycache__, written by the installer's
+compileall), so each command pays only for the imports it needs itself.
+
+`dotctl check-startup [--budget-ms N]` imports every command's script under
+`python -X importtime` and fails when one of them exceeds the budget or
+can't be imported at all (a missing dependency counts as a failure).
+Bytecode is refreshed first, as the installer does; interpreter start-up
+(site, encodings) is the same for every script and is not counted.
+"""
+
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.realpath(__file__))
+
+DEFAULT_BUDGET_MS = 40.0
+
+# "group action" → (X11 script, Wayland script); None where there's no backend
+COMMANDS = {
+    "display pick-best":    ("x11/monitor_pick_best.py", "wayland/pick_best_output.py"),
+    "display menu":         ("x11/monitor_layout_menu.py", "wayland/monitor_layout_menu.py"),
+    "display switch":       ("x11/monitor_switcher_reasonable.py", None),
+    "display switch-all":   ("x11/monitor_switcher_all.py", None),
+    "display switch-native": ("x11/monitor_switcher_native.py", None),
+    "display hotplug":      ("x11/monitor_hotplug.py", "wayland/monitor_hotplug.py"),
+    "display profiles":     ("x11/display_profiles.py", None),
+    "display post-layout":  ("x11/post_layout.py", None),
+    "display outputs":      (None, "wayland/wlr_output_client.py"),
+    "display kanshi":       (None, "wayland/kanshi_gen.py"),
+    "bt pick":              ("x11/bluetooth_picker.py", None),
+    "wifi pick":            ("wifi_picker.py", "wifi_picker.py"),
+    "audio switch":         ("switch_audio_sink.py", "switch_audio_sink.py"),
+    "audio status":         ("audio_status.py", "audio_status.py"),
+    "power":                ("x11/power_menu.py", None),
+    "bars":                 ("x11/bar_manager.py", None),
+    "wallpaper":            ("x11/wallpaper.py", None),
+    "session":              ("x11/session.py", None),
+    "workspaces":           ("x11/workspaces.py", None),
+    "keyboard":             ("x11/keyboard_layout.py", None),
+    "cpu cap":              ("cpu_cap.py", "cpu_cap.py"),
+    "cpu freq":             ("cpu_freq.py", "cpu_freq.py"),
+    "notify":               ("notify.py", "notify.py"),
+}
+
+
+def backend() -> int:
+    return 1 if os.environ.get("WAYLAND_DISPLAY") else 0
+
+
+def resolve(words):
+    """(command, script path, remaining args) for the longest matching command;
+    the path is None when the command has no script for this session's backend."""
+    for n in (2, 1):
+        key = " ".join(words[:n])
+        if len(words) >= n and key in COMMANDS:
+            rel = COMMANDS[key][backend()]
+            return key, rel and os.path.join(SCRIPTS_DIR, rel), words[n:]
+    return None, None, words
+
+
+def load(path: str, name: str):
+    """Module object + code for `path`, using (and refreshing) __pycache__."""
+    import types
+    from importlib.machinery import SourceFileLoader
+
+    loader = SourceFileLoader(name, path)
+    code = loader.get_code(name)
+    mod = types.ModuleType(name)
+    mod.__file__ = path
+    mod.__loader__ = loader
+    mod.__builtins__ = __builtins__
+    return mod, code
+
+
+def run(path: str, args) -> None:
+    mod, code = load(path, "__main__")
+    sys.argv = [path, *args]
+    sys.path[0] = os.path.dirname(path)   # scripts import their siblings
+    sys.modules["__main__"] = mod
+    exec(code, mod.__dict__)
+
+
+# ---------- startup budget ------------------------------------------------ #
+
+MARK = "-- dotctl: script starts --"
+
+
+def import_cost_ms(path: str):
+    """(ms, None) for the cumulative import time of a script's top level, or
+    (None, error) when it fails to import. Interpreter start-up is not counted."""
+    import subprocess
+
+    probe = ("import os, sys; sys.path[0] = sys.argv[1]; sys.argv = sys.argv[2:]; "
+             "import dotctl; sys.path[0] = os.path.dirname(sys.argv[0]); "
+             "mod, code = dotctl.load(sys.argv[0], '__dotctl_check__'); "
+             "print(dotctl.MARK, file=sys.stderr, flush=True); exec(code, mod.__dict__)")
+    cp = subprocess.run([sys.executable, "-X", "importtime", "-c", probe, SCRIPTS_DIR, path],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                        cwd=os.path.dirname(path))
+    _startup, _, report = cp.stderr.partition(MARK + "\n")
+    if cp.returncode != 0:
+        errors = [l for l in report.splitlines() if l and not l.startswith("import time:")]
+        return None, errors[-1] if errors else f"exit {cp.returncode}"
+    total_us = 0
+    for line in report.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000.0, None
+
+
+def check_startup(args) -> int:
+    budget = DEFAULT_BUDGET_MS
+    if "--budget-ms" in args:
+        budget = float(args[args.index("--budget-ms") + 1])
+
+    # Measure what the installer leaves behind: every module read from bytecode
+    import subprocess
+    subprocess.run([sys.executable, "-m", "compileall", "-q", "-x", r"app_menu\.py$", SCRIPTS_DIR],
+                   stdout=subprocess.DEVNULL)
+
+    failed = False
+    seen = set()
+    for key, scripts in COMMANDS.items():
+        for rel in scripts:
+            if not rel or rel in seen:
+                continue
+            seen.add(rel)
+            path = os.path.join(SCRIPTS_DIR, rel)
+            if not os.path.exists(path):
+                print(f"  {'—':>8}     {rel}  (not installed)")   # the other session's script
+                continue
+            cost, error = import_cost_ms(path)
+            if cost is None:
+                failed = True
+                print(f"  {'—':>8}     {rel}  IMPORT FAILED: {error}")
+                continue
+            over = cost > budget
+            failed |= over
+            print(f"  {cost:8.1f} ms  {rel}{'  OVER BUDGET' if over else ''}")
+    print(f"budget: {budget:.0f} ms per script")
+    return 1 if failed else 0
+
+
+def usage() -> str:
+    lines = ["usage: dotctl <command> [args...]", ""]
+    for key, (x11, wl) in COMMANDS.items():
+        lines.append(f"  {key:<24} {x11 or '-':<36} {wl or '-'}")
+    lines += ["", "  check-startup [--budget-ms N]"]
+    return "\n".join(lines)
+
+
+def main(argv) -> int:
+    prog = os.path.basename(argv[0])
+    words = argv[1:]
+    if prog.startswith("dotctl-"):
+        words = prog[len("dotctl-"):].split("-", 1) + words
+        # "display-pick-best" → "display pick-best"; single-word commands stay as they are
+        if " ".join(words[:2]) not in COMMANDS:
+            words = [prog[len("dotctl-"):]] + argv[1:]
+
+    if not words or words[0] in ("help", "-h", "--help"):
+        print(usage())
+        return 0
+    if words[0] == "check-startup":
+        return check_startup(words[1:])
+
+    key, path, rest = resolve(words)
+    if key is not None and path is None:
+        print(f"dotctl: {key}: not available on {('X11', 'Wayland')[backend()]}", file=sys.stderr)
+        return 2
+    if path is None:
+        print(f"dotctl: unknown command: {' '.join(words[:2])}\n\n{usage()}", file=sys.stderr)
+        return 2
+    run(path, rest)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        status = main(sys.argv)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # `dotctl help | head`: the reader went away; don't flush into it again at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 0
+    sys.exit(status)
@@ -0,0 +1,9 @@
+"""
+dotlib — helpers shared by the X11 and Wayland scripts.
+
+The scripts stay standalone executables; they put ~/.config/scripts on
+sys.path before importing from here:
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+    from dotlib import power
+"""
@@ -0,0 +1,235 @@
+"""
+audio.py — PipeWire/PulseAudio sinks: listing, labels and switching.
+
+Everything is fetched in one go: with pulsectl installed a single native
+protocol connection answers sinks, sink-inputs and the default sink;
+otherwise `pactl -f json list sinks` and `pactl get-default-sink` run
+concurrently. No per-sink re-scan of `pactl list sinks`.
+
+Sinks are plain dicts:
+
+    {"index": 57, "name": "alsa_output…", "description": "HDMI / DisplayPort 1",
+     "bus": "pci", "form_factor": None, "mute": False, "volume": 40, "default": True}
+
+Requires:
+  - pactl (pipewire-pulse or PulseAudio), or
+  - pulsectl (optional, preferred when importable)
+"""
+
+import os
+import re
+
+from . import proc
+
+CLIENT_NAME = "dotfiles-audio"
+PACTL_TIMEOUT_S = 3   # a stalled pipewire-pulse must not freeze the menu or the bar
+
+# Last state published by audio_status.py (the long-running bar producer)
+STATUS_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "audio_status.json")
+
+# Vendor prefixes dropped from descriptions before display
+DESC_PREFIXES = (
+    "Tiger Lake-LP Smart Sound Technology Audio Controller",
+)
+DESC_KIND = re.compile(r".*?(Analog|HDMI|Digital|Line Out|Bluetooth)")
+
+ICON_HEADPHONES = "🎧"
+ICON_HDMI = "📺"
+ICON_BLUETOOTH = "📻"
+ICON_SPEAKER = "🔊"
+ICON_UNKNOWN = "❓"
+MARK_DEFAULT = " 🟢"
+
+
+# ---------- labels -------------------------------------------------------- #
+
+def clean_description(desc: str) -> str:
+    desc = (desc or "").strip()
+    for prefix in DESC_PREFIXES:
+        if desc.startswith(prefix):
+            desc = desc[len(prefix):].strip()
+    m = DESC_KIND.match(desc)
+    if m:
+        desc = desc[m.start(1):]
+    return desc
+
+
+def icon_for(sink: dict) -> str:
+    """Same buckets as the old shell menus, helped by the device properties."""
+    desc = (sink.get("description") or "").lower()
+    ff = (sink.get("form_factor") or "").lower()
+    if "headphone" in desc or ff in ("headphone", "headset"):
+        return ICON_HEADPHONES
+    if "hdmi" in desc or "displayport" in desc:
+        return ICON_HDMI
+    if "bluetooth" in desc or sink.get("bus") == "bluetooth":
+        return ICON_BLUETOOTH
+    if any(w in desc for w in ("analog", "line out", "speaker")) or ff == "speaker":
+        return ICON_SPEAKER
+    return ICON_UNKNOWN
+
+
+def label(sink: dict, mark_default: bool = True) -> str:
+    text = f"{icon_for(sink)} {clean_description(sink.get('description'))}"
+    if mark_default and sink.get("default"):
+        text += MARK_DEFAULT
+    return text
+
+
+# ---------- pactl backend ------------------------------------------------- #
+
+def _sink_from_json(s: dict) -> dict:
+    props = s.get("properties") or {}
+    return {
+        "index": s.get("index"),
+        "name": s.get("name"),
+        "description": s.get("description") or props.get("device.description") or s.get("name"),
+        "bus": props.get("device.bus"),
+        "form_factor": props.get("device.form_factor"),
+        "mute": bool(s.get("mute")),
+        "volume": _json_volume(s.get("volume")),
+        "default": False,
+    }
+
+
+def _json_volume(vol) -> int | None:
+    """Average channel volume in percent from pactl's JSON volume map."""
+    if not isinstance(vol, dict):
+        return None
+    pcts = []
+    for ch in vol.values():
+        m = re.match(r"\s*(\d+)%", str((ch or {}).get("value_percent", "")))
+        if m:
+            pcts.append(int(m.group(1)))
+    return round(sum(pcts) / len(pcts)) if pcts else None
+
+
+def _pactl_snapshot() -> tuple[list[dict], str | None]:
+    import json
+    sinks_r, default_r = proc.run_many([["pactl", "-f", "json", "list", "sinks"],
+                                        ["pactl", "get-default-sink"]], timeout=PACTL_TIMEOUT_S)
+    try:
+        sinks = [_sink_from_json(s) for s in json.loads(sinks_r.stdout or "[]")]
+    except ValueError:
+        sinks = []
+    default = default_r.stdout.strip() if default_r.ok else ""
+    return sinks, default or None
+
+
+def _pactl_sink_inputs() -> list[int]:
+    ids = []
+    for line in proc.output(["pactl", "list", "short", "sink-inputs"], PACTL_TIMEOUT_S).splitlines():
+        head = line.split(None, 1)[0] if line.strip() else ""
+        if head.isdigit():
+            ids.append(int(head))
+    return ids
+
+
+def _pactl_switch(sink_name: str) -> None:
+    proc.run(["pactl", "set-default-sink", sink_name], PACTL_TIMEOUT_S)
+    # One pactl per stream, several in flight at once
+    proc.run_many([["pactl", "move-sink-input", str(i), sink_name] for i in _pactl_sink_inputs()],
+                  PACTL_TIMEOUT_S, max_parallel=8)
+
+
+# ---------- pulsectl backend ---------------------------------------------- #
+
+_pulsectl = False  # not tried yet
+
+
+def load_pulsectl():
+    """The pulsectl module, imported on first use; None when it isn't installed."""
+    global _pulsectl
+    if _pulsectl is False:
+        try:
+            import pulsectl
+        except ImportError:
+            pulsectl = None
+        _pulsectl = pulsectl
+    return _pulsectl
+
+
+def _pulse_sink(s, default: str | None) -> dict:
+    props = getattr(s, "proplist", {}) or {}
+    return {
+        "index": s.index,
+        "name": s.name,
+        "description": s.description,
+        "bus": props.get("device.bus"),
+        "form_factor": props.get("device.form_factor"),
+        "mute": bool(s.mute),
+        "volume": round(s.volume.value_flat * 100),
+        "default": s.name == default,
+    }
+
+
+def pulse_snapshot(pulse) -> tuple[list[dict], str | None]:
+    """snapshot() over an already open pulsectl.Pulse connection."""
+    default = pulse.server_info().default_sink_name
+    return [_pulse_sink(s, default) for s in pulse.sink_list()], default
+
+
+def _pulse_snapshot() -> tuple[list[dict], str | None]:
+    with load_pulsectl().Pulse(CLIENT_NAME) as pulse:
+        return pulse_snapshot(pulse)
+
+
+def _pulse_switch(sink_name: str) -> None:
+    with load_pulsectl().Pulse(CLIENT_NAME) as pulse:
+        target = next((s for s in pulse.sink_list() if s.name == sink_name), None)
+        if target is None:
+            return
+        pulse.sink_default_set(target)
+        for si in pulse.sink_input_list():
+            pulse.sink_input_move(si.index, target.index)
+
+
+# ---------- public API ---------------------------------------------------- #
+
+def snapshot() -> tuple[list[dict], str | None]:
+    """Return (sinks, default sink name); sink["default"] is set accordingly."""
+    if load_pulsectl() is not None:
+        try:
+            return _pulse_snapshot()
+        except Exception:
+            pass  # no server on the native socket — try pactl
+    sinks, default = _pactl_snapshot()
+    for s in sinks:
+        s["default"] = s["name"] == default
+    return sinks, default
+
+
+def default_sink(sinks: list[dict]) -> dict | None:
+    return next((s for s in sinks if s.get("default")), None)
+
+
+def switch_to(sink_name: str) -> None:
+    """Make sink_name the default and move every playing stream onto it."""
+    if load_pulsectl() is not None:
+        try:
+            _pulse_switch(sink_name)
+            return
+        except Exception:
+            pass
+    _pactl_switch(sink_name)
+
+
+def write_status(sink: dict | None) -> None:
+    import json
+    tmp = f"{STATUS_FILE}.{os.getpid()}"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(sink or {}, f, ensure_ascii=False)
+        os.replace(tmp, STATUS_FILE)
+    except OSError:
+        pass
+
+
+def read_status() -> dict | None:
+    """Current default sink as last published by audio_status.py, or None."""
+    import json
+    try:
+        with open(STATUS_FILE, "r") as f:
+            return json.load(f) or None
+    except (OSError, ValueError):
+        return None
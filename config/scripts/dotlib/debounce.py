@@ -0,0 +1,33 @@
+"""
+debounce.py — collapse bursts of events into one delayed call.
+"""
+
+import threading
+from collections.abc import Callable
+
+
+class Debouncer:
+    """Call `fn(*args)` once, `delay` seconds after the LAST trigger()."""
+
+    def __init__(self, delay: float, fn: Callable):
+        self.delay = delay
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def trigger(self, *args) -> bool:
+        """Schedule the call; returns True if a pending call was superseded."""
+        with self._lock:
+            superseded = self._timer is not None and self._timer.is_alive()
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.fn, args)
+            self._timer.daemon = True
+            self._timer.start()
+            return superseded
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
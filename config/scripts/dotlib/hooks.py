@@ -0,0 +1,124 @@
+"""
+hooks.py — the post-layout stage: independent hooks, concurrently, when needed.
+
+After a modeset every hook (wallpaper, notification, ...) starts at once in
+its own thread, so the desktop is finished when the slowest hook is rather
+than after the sum of all of them. A hook names the part of the layout it
+depends on (`inputs`: layout → any JSON value); when that equals what it
+got on its last successful run the hook is skipped — the wallpaper, say,
+when only the refresh rate changed:
+
+    hooks.run_all([
+        Hook("wallpaper", redraw_wallpaper, inputs=lambda l: geometries(l)),
+        Hook("notify", announce, inputs=lambda l: l),
+    ], layout)
+
+Those inputs, and the timing of the last run, are kept in STATE_FILE.
+Every hook is a span when tracing is on (dotlib/trace.py).
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from . import trace
+
+STATE_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "post-layout.json")
+HOOK_TIMEOUT_S = 30.0   # hooks bound their own commands (dotlib/proc.py); this is a backstop
+
+Layout = dict[str, object]
+
+
+class Hook:
+    def __init__(self, name: str, run: Callable[[], bool | None],
+                 inputs: Callable[[Layout], object] | None = None):
+        self.name = name
+        self.run = run        # False means failed; None/True succeeded
+        self.inputs = inputs  # None: run after every layout change
+
+
+def _load_state() -> dict:
+    import json
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("inputs", {})
+    return state
+
+
+def _save_state(state: dict) -> None:
+    import json
+    tmp = f"{STATE_FILE}.{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, STATE_FILE)
+    except OSError:
+        pass
+
+
+def forget() -> None:
+    """Drop the saved inputs so every hook runs next time (a new X server
+    starts with a bare root window whatever the last layout was)."""
+    try:
+        os.remove(STATE_FILE)
+    except OSError:
+        pass
+
+
+def run_all(hooks: list[Hook], layout: Layout, force: bool = False) -> dict[str, dict]:
+    """Run the hooks whose inputs changed, all at once; name → {"status", "took"}."""
+    import json
+    state = _load_state()
+    t0 = time.monotonic()
+    results: dict[str, dict] = {}
+    keys: dict[str, object] = {}
+    threads = []
+
+    def worker(h: Hook) -> None:
+        began = time.monotonic()
+        with trace.span(f"hook {h.name}") as sp:
+            try:
+                status = "failed" if h.run() is False else "ok"
+            except Exception as e:
+                status = f"error: {e}"
+            sp.args["status"] = status
+        results[h.name] = {"status": status, "took": time.monotonic() - began}
+
+    for h in hooks:
+        # JSON round trip: tuples and lists compare equal to what was stored
+        key = json.loads(json.dumps(h.inputs(layout))) if h.inputs else None
+        if not force and key is not None and state["inputs"].get(h.name) == key:
+            results[h.name] = {"status": "skipped", "took": 0.0}
+            continue
+        keys[h.name] = key
+        t = threading.Thread(target=worker, args=(h,), name=f"hook-{h.name}", daemon=True)
+        threads.append((h, t))
+        t.start()
+
+    deadline = time.monotonic() + HOOK_TIMEOUT_S
+    for h, t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+        if t.is_alive():
+            results[h.name] = {"status": "timeout", "took": time.monotonic() - t0}
+        if keys[h.name] is None:
+            continue
+        if results[h.name]["status"] == "ok":
+            state["inputs"][h.name] = keys[h.name]
+        else:
+            state["inputs"].pop(h.name, None)  # retry next time
+
+    state["last"] = {"ts": time.time(), "took": time.monotonic() - t0, "hooks": dict(results)}
+    _save_state(state)
+    return results
+
+
+def report(results: dict[str, dict]) -> str:
+    total = max((r["took"] for r in results.values()), default=0.0)
+    lines = [f"post-layout: hooks done in {total:.3f}s"]
+    for name, r in sorted(results.items(), key=lambda kv: -kv[1]["took"]):
+        lines.append(f"  {name:<12} {r['took']:7.3f}  {r['status']}")
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+"""
+menu.py — open rofi/wofi pickers instantly from their last rendered entries.
+
+Pickers used to gather everything (xrandr, bluetoothctl, nmcli, pactl)
+before the menu appeared. pick() instead:
+
+  1. starts the refresh (`produce()`) in a background thread,
+  2. opens the menu at once with the entries cached from the last run
+     (~/.cache/dotfiles-menus/<name>.json), marked STALE_MARK when the cache
+     is older than `stale_after` seconds,
+  3. rofi (stream=True, `-async-pre-read 0`): appends the fresh entries
+     whose value isn't already on screen as soon as the refresh finishes
+     (rofi can't replace rows it shows, so a stale row stays as it is and
+     is never repeated); wofi can't take rows after it opens, so it shows
+     the cache and the refresh only updates it for next time,
+  4. writes the fresh entries back to the cache, even if the user picked
+     before the refresh finished (the thread is not a daemon, so the
+     process lingers until the cache is saved).
+
+A picked cached row whose entry the finished refresh no longer lists (a
+wifi network that has gone) counts as cancelled. A refresh that failed or
+came back empty (nmcli/bluetoothctl hitting their deadline) is ignored: the
+cache is kept and cached picks go through. The menu runs through
+dotlib/proc.py and is closed after MENU_TIMEOUT_S.
+
+Entries are (label, value) pairs; values must be JSON-serialisable. A
+`key` (e.g. the connected-output fingerprint) invalidates the cache when
+the thing being listed changed identity.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from . import proc
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "dotfiles-menus")
+STALE_MARK = " ⌛"
+DEFAULT_STALE_AFTER = 30.0
+MENU_TIMEOUT_S = 300.0   # a menu left open is closed and counts as cancelled
+
+Entry = tuple[str, object]
+
+
+class MenuCache:
+    def __init__(self, name: str, key: str = ""):
+        self.path = os.path.join(CACHE_DIR, f"{name}.json")
+        self.key = key
+
+    def load(self) -> tuple[float, list[Entry]] | None:
+        """(age in seconds, entries) or None when missing / for another key."""
+        import json
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("key") != self.key:
+                return None
+            return time.time() - float(data["ts"]), [(l, v) for l, v in data["entries"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, entries: list[Entry]) -> None:
+        import json
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": self.key, "ts": time.time(), "entries": [list(e) for e in entries]},
+                          f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+def _value_key(value: object) -> str:
+    import json
+    return json.dumps(value, sort_keys=True)
+
+
+def pick(name: str, produce: Callable[[], list[Entry]], menu_cmd: list[str], key: str = "",
+         stale_after: float = DEFAULT_STALE_AFTER, stream: bool = True,
+         empty: str = "Nothing found") -> object:
+    """Show the menu; return the chosen entry's value, or None if cancelled.
+
+    `menu_cmd` is the dmenu-style command (rofi -dmenu … / wofi --show dmenu …).
+    With stream=True it must be rofi: `-async-pre-read 0 -format i` are added.
+    """
+    cache = MenuCache(name, key)
+    cached = cache.load()
+    fresh: list[list[Entry]] = []
+
+    def refresh() -> None:
+        try:
+            entries = [(l, v) for l, v in produce()]
+        except Exception:
+            return
+        if not entries:
+            return  # a scan that timed out looks the same; keep the cache and the rows
+        fresh.append(entries)
+        cache.save(entries)
+
+    worker = threading.Thread(target=refresh, name=f"menu-refresh-{name}")
+    worker.start()
+
+    rows: list[Entry] = []
+    stale = cached is not None and cached[0] > stale_after
+    if cached is not None:
+        rows = [(l + STALE_MARK if stale else l, v) for l, v in cached[1]]
+
+    def still_listed(value: object) -> object:
+        """The picked value, unless the finished refresh no longer lists it."""
+        if fresh and _value_key(value) not in {_value_key(v) for _, v in fresh[0]}:
+            return None
+        return value
+
+    if not stream:
+        if cached is None:
+            worker.join()
+            rows = list(fresh[0]) if fresh else []
+        if not rows:
+            rows = [(empty, None)]
+        r = proc.run(menu_cmd, timeout=MENU_TIMEOUT_S, input="\n".join(l for l, _ in rows) + "\n")
+        chosen = r.stdout.rstrip("\n")
+        return still_listed(next((v for l, v in rows if l == chosen), None))
+
+    def feed(stdin, running) -> None:
+        if rows:
+            stdin.write("\n".join(l for l, _ in rows) + "\n")
+            stdin.flush()
+        on_screen = {_value_key(v) for _, v in rows}
+
+        while worker.is_alive() and running():
+            worker.join(0.05)
+        if running():
+            extra = [(l, v) for l, v in (fresh[0] if fresh else []) if _value_key(v) not in on_screen]
+            if not rows and not extra:
+                extra = [(empty, None)]
+            if extra:
+                stdin.write("\n".join(l for l, _ in extra) + "\n")
+                stdin.flush()
+                rows.extend(extra)
+
+    r = proc.stream(menu_cmd + ["-async-pre-read", "0", "-format", "i"], feed, timeout=MENU_TIMEOUT_S)
+    out = r.stdout.strip()
+    if not r.ok or not out.lstrip("-").isdigit():
+        return None
+    idx = int(out)
+    return still_listed(rows[idx][1]) if 0 <= idx < len(rows) else None
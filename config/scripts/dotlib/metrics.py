@@ -0,0 +1,197 @@
+"""
+metrics.py — counters and histograms for the long-running daemons.
+
+Exposed in the Prometheus text format, either as a file rewritten after
+every update (point node_exporter's textfile collector at it) or on a unix
+socket that answers every connection with the current text:
+
+    reg = Registry()
+    events = reg.counter("hotplug_udev_events_total", "udev events received", ["subsystem"])
+    events.inc(subsystem="drm")
+    reg.export_file(path)         # or: reg.serve_unix(path)
+
+    socat - UNIX-CONNECT:$XDG_RUNTIME_DIR/monitor_hotplug.sock
+
+Child processes can't reach the daemon's registry; they report outcomes
+(e.g. a fallback layout) with report(), which appends to the file named by
+DOTFILES_METRICS_REPORT when the daemon set one for them.
+"""
+
+import os
+import threading
+from collections.abc import Sequence
+
+ENV_REPORT = "DOTFILES_METRICS_REPORT"
+
+# Seconds; a re-layout spans xrandr/compositor round trips up to a slow dock
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 34.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _key(names: Sequence[str], values: dict[str, str]) -> Labels:
+    return tuple((n, str(values.get(n, ""))) for n in names)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    return "+Inf" if v == float("inf") else (str(int(v)) if float(v).is_integer() else repr(float(v)))
+
+
+class Counter:
+    def __init__(self, registry: "Registry", name: str, doc: str, labels: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.values: dict[Labels, float] = {} if self.labels else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _key(self.labels, labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+        self.registry.changed()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self.values.items()):
+            lines.append(f"{self.name}{_fmt_labels(key)} {_fmt_value(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, registry: "Registry", name: str, doc: str,
+                 buckets: Sequence[float] = LATENCY_BUCKETS, labels: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels → ([count per bucket], sum, count)
+        self.values: dict[Labels, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _key(self.labels, labels)
+        with self.registry.lock:
+            counts, total, n = self.values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value, n + 1)
+        self.registry.changed()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, n) in sorted(self.values.items()):
+            for le, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', _fmt_value(le)))} {c}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics: list = []
+        self.file: str | None = None
+
+    def counter(self, name: str, doc: str, labels: Sequence[str] = ()) -> Counter:
+        m = Counter(self, name, doc, labels)
+        self.metrics.append(m)
+        return m
+
+    def histogram(self, name: str, doc: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  labels: Sequence[str] = ()) -> Histogram:
+        m = Histogram(self, name, doc, buckets, labels)
+        self.metrics.append(m)
+        return m
+
+    def render(self) -> str:
+        with self.lock:
+            return "\n".join(line for m in self.metrics for line in m.render()) + "\n"
+
+    # ---- exporters ---- #
+
+    def changed(self) -> None:
+        if self.file:
+            self._write_file()
+
+    def _write_file(self) -> None:
+        # Under the lock: the udev thread and the reaction thread share the tmp name
+        with self.lock:
+            tmp = f"{self.file}.{os.getpid()}"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self.render())
+                os.replace(tmp, self.file)   # scrapers never see a half-written file
+            except OSError:
+                pass
+
+    def export_file(self, path: str) -> None:
+        """Keep `path` up to date from now on."""
+        self.file = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._write_file()
+
+    def serve_unix(self, path: str) -> "socket.socket":
+        """Answer every connection on the unix socket `path` with render()."""
+        import socket
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        srv.bind(path)
+        os.chmod(path, 0o600)
+        srv.listen(4)
+
+        def loop() -> None:
+            while True:
+                try:
+                    conn, _ = srv.accept()
+                except OSError:
+                    return  # closed
+                with conn:
+                    try:
+                        conn.sendall(self.render().encode())
+                    except OSError:
+                        pass
+
+        threading.Thread(target=loop, name="metrics-socket", daemon=True).start()
+        return srv
+
+
+# ---------- outcomes reported by child processes -------------------------- #
+
+def report(outcome: str) -> None:
+    """Record an outcome for the daemon that started us (no-op otherwise)."""
+    path = os.environ.get(ENV_REPORT)
+    if not path:
+        return
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(outcome + "\n")
+    except OSError:
+        pass
+
+
+def collect_reports(path: str) -> list[str]:
+    """Outcomes children appended to `path` (the file is consumed)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            outcomes = [line.strip() for line in f if line.strip()]
+        os.unlink(path)
+    except OSError:
+        return []
+    return outcomes
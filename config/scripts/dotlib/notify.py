@@ -0,0 +1,176 @@
+"""
+notify.py — desktop notifications over D-Bus, one bubble per topic.
+
+Calls org.freedesktop.Notifications.Notify on the session bus over one
+jeepney connection per process instead of forking notify-send for every
+message. A `tag` names a bubble: the next notification with the same tag
+replaces it (replaces_id) instead of stacking another popup, so a hotplug
+burst or a Bluetooth connect attempt stays a single, updated bubble:
+
+    notify.send("Display", "DP-3 2560x1440 @ 144 Hz", tag="display")
+    notify.send("❌ Not supported", tag="display", urgency=notify.CRITICAL)
+
+Bubble ids are kept in $XDG_RUNTIME_DIR/notify.json, so short-lived scripts
+(pick_best_output.py from waybar, autorandr's postswitch) replace what the
+previous run showed. Sending the text a bubble already shows is dropped
+until RATE_LIMIT_S pass without that repeat; untagged messages are
+rate-limited by their text.
+
+Without jeepney or a session bus it falls back to notify-send, passing
+--replace-id where the installed libnotify knows it. From a shell:
+`dotctl notify [--tag T] [--icon I] SUMMARY [BODY]` (scripts/notify.py).
+
+Requires:
+  - jeepney (optional, preferred when importable), or
+  - notify-send
+"""
+
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+from collections.abc import Iterator
+
+from . import proc, trace
+
+APP_NAME = "dotfiles"
+STATE_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "notify.json")
+RATE_LIMIT_S = 10.0
+SEND_TIMEOUT_S = 2.0   # a wedged notification daemon must not hold up a layout change
+
+LOW, NORMAL, CRITICAL = 0, 1, 2
+URGENCY_NAMES = ("low", "normal", "critical")
+
+BUS_NAME = "org.freedesktop.Notifications"
+OBJECT_PATH = "/org/freedesktop/Notifications"
+
+_jeepney = False  # not tried yet
+_conn = None      # this process's session bus connection
+
+
+def load_jeepney():
+    """The jeepney module, imported on first use; None when it isn't installed."""
+    global _jeepney
+    if _jeepney is False:
+        try:
+            import jeepney
+            import jeepney.io.blocking
+        except ImportError:
+            jeepney = None
+        _jeepney = jeepney
+    return _jeepney
+
+
+# ---------- backends ------------------------------------------------------ #
+
+def _connection():
+    global _conn
+    if _conn is None:
+        import atexit
+        from jeepney.io.blocking import open_dbus_connection
+
+        _conn = open_dbus_connection(bus="SESSION")
+        atexit.register(_conn.close)
+    return _conn
+
+
+def _send_dbus(summary: str, body: str, icon: str, replaces_id: int, urgency: int, expire_ms: int) -> int:
+    from jeepney import DBusAddress, new_method_call
+    from jeepney.wrappers import unwrap_msg
+
+    addr = DBusAddress(OBJECT_PATH, bus_name=BUS_NAME, interface=BUS_NAME)
+    msg = new_method_call(addr, "Notify", "susssasa{sv}i",
+                          (APP_NAME, replaces_id, icon, summary, body, [],
+                           {"urgency": ("y", urgency)}, expire_ms))
+    reply = _connection().send_and_get_reply(msg, timeout=SEND_TIMEOUT_S)
+    return unwrap_msg(reply)[0]
+
+
+def _send_cli(summary: str, body: str, icon: str, replaces_id: int, urgency: int,
+              expire_ms: int) -> int | None:
+    argv = ["notify-send", "-a", APP_NAME, "-u", URGENCY_NAMES[urgency]]
+    if icon:
+        argv += ["-i", icon]
+    if expire_ms >= 0:
+        argv += ["-t", str(expire_ms)]
+    text = [summary] + ([body] if body else [])
+
+    r = proc.run(argv + ["-p"] + (["-r", str(replaces_id)] if replaces_id else []) + text,
+                 timeout=SEND_TIMEOUT_S)
+    if r.ok:
+        out = r.stdout.strip()
+        return int(out) if out.isdigit() else 0
+    if r.missing or r.timed_out:
+        return None
+    # libnotify < 0.7.9 knows neither --print-id nor --replace-id
+    return 0 if proc.ok(argv + text, timeout=SEND_TIMEOUT_S) else None
+
+
+# ---------- shared state -------------------------------------------------- #
+
+@contextmanager
+def _state() -> Iterator[dict]:
+    """notify.json, locked while it is read and rewritten (never across a send)."""
+    import json
+    fd = os.open(STATE_FILE, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        with os.fdopen(os.dup(fd), "r", encoding="utf-8") as f:
+            try:
+                state = json.load(f)
+            except ValueError:
+                state = {}
+        state.setdefault("bubbles", {})   # tag → notification id
+        state.setdefault("recent", {})    # tag or text → [text, time sent]
+        yield state
+        data = json.dumps(state).encode()
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, data)
+    finally:
+        os.close(fd)  # drops the lock
+
+
+# ---------- public API ---------------------------------------------------- #
+
+def send(summary: str, body: str = "", tag: str | None = None, icon: str = "",
+         urgency: int = NORMAL, expire_ms: int = -1) -> bool:
+    """Show a notification, or update the bubble of `tag`; False if nothing could show it."""
+    global _conn
+    text = f"{summary}\n{body}"
+    key = tag or text
+    now = time.time()
+    with _state() as state:
+        last = state["recent"].get(key)
+        if last and last[0] == text and now - last[1] < RATE_LIMIT_S:
+            last[1] = now  # a steady repeat (a poller) stays quiet
+            return True
+        replaces_id = state["bubbles"].get(tag, 0) if tag else 0
+        # Claim the text now so a concurrent identical message is dropped
+        # while this one is being sent
+        state["recent"] = {k: v for k, v in state["recent"].items() if now - v[1] < RATE_LIMIT_S}
+        state["recent"][key] = [text, now]
+
+    # The lock is released here: a slow notification daemon (or the
+    # notify-send fallback) must not hold up every other notifier
+    with trace.span("notify", tag=tag) as sp:
+        nid = None
+        if load_jeepney():
+            try:
+                nid = _send_dbus(summary, body, icon, replaces_id, urgency, expire_ms)
+            except Exception as e:  # no bus, no daemon, timeout: try notify-send
+                sp.args["dbus_error"] = str(e)
+                _conn = None
+        if nid is None:
+            nid = _send_cli(summary, body, icon, replaces_id, urgency, expire_ms)
+        sp.args["id"] = nid
+
+    if nid is None:
+        with _state() as state:
+            if (state["recent"].get(key) or [None])[0] == text:
+                del state["recent"][key]   # nothing showed it; let a retry through
+        return False
+    if tag and nid:
+        with _state() as state:
+            state["bubbles"][tag] = nid
+    return True
@@ -0,0 +1,90 @@
+"""
+power.py — AC/battery state and the per-display refresh-rate policy.
+
+On battery a 120/144 Hz panel costs noticeable power and GPU time, so the
+"pick best" scripts ask RefreshPolicy for a refresh cap before choosing a
+mode. Caps are configured per display fingerprint in
+~/.config/display-refresh.json:
+
+    {
+      "battery_max_hz": 60,
+      "ac_max_hz": null,
+      "outputs": {
+        "DEL U2720Q": {"battery": 60, "ac": null},
+        "eDP-1":      {"battery": 48}
+      }
+    }
+
+battery_max_hz / ac_max_hz are the defaults (null = uncapped); "outputs"
+overrides them per display.
+
+A fingerprint is "<make> <model>" as the platform reports it (wlr-randr
+Make/Model on Wayland, EDID vendor/model on X11); the connector name works
+too. Matching is case-insensitive.
+"""
+
+import os
+from glob import glob
+from collections.abc import Iterable
+
+POWER_SUPPLY_DIR = "/sys/class/power_supply"
+CONFIG_PATH = os.path.join(os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")),
+                           "display-refresh.json")
+
+DEFAULTS = {"battery_max_hz": 60, "ac_max_hz": None, "outputs": {}}
+HZ_SLOP = 0.5   # 60.001 Hz still counts as 60
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def on_battery() -> bool:
+    """True when no mains/USB-PD supply is online. Desktops without any report False."""
+    supplies = []
+    for d in glob(os.path.join(POWER_SUPPLY_DIR, "*")):
+        if _read(os.path.join(d, "type")) in ("Mains", "USB"):
+            supplies.append(_read(os.path.join(d, "online")) == "1")
+    return bool(supplies) and not any(supplies)
+
+
+def power_source() -> str:
+    return "battery" if on_battery() else "ac"
+
+
+class RefreshPolicy:
+    def __init__(self, path: str = CONFIG_PATH, battery: bool | None = None):
+        import json
+        cfg = dict(DEFAULTS)
+        try:
+            with open(path, "r") as f:
+                cfg.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        self.defaults = {"battery": cfg.get("battery_max_hz"), "ac": cfg.get("ac_max_hz")}
+        self.outputs: dict[str, dict] = {k.lower(): v for k, v in (cfg.get("outputs") or {}).items()}
+        self.battery = on_battery() if battery is None else battery
+
+    def cap(self, *fingerprints: str | None) -> float | None:
+        """Refresh cap for the first fingerprint that has an entry, else the default."""
+        key = "battery" if self.battery else "ac"
+        for fp in fingerprints:
+            entry = self.outputs.get((fp or "").strip().lower())
+            if entry is not None and key in entry:
+                return entry[key]
+        return self.defaults[key]
+
+    @staticmethod
+    def pick(rates: Iterable[float], cap: float | None) -> float | None:
+        """Highest rate within the cap; the lowest one if all exceed it."""
+        rates: list[float] = sorted(rates, reverse=True)
+        if not rates:
+            return None
+        if cap is None:
+            return rates[0]
+        within = [r for r in rates if r <= cap + HZ_SLOP]
+        return within[0] if within else rates[-1]
@@ -0,0 +1,192 @@
+"""
+proc.py — external commands with deadlines.
+
+Every call takes an argument vector (never a shell string) and a deadline.
+The command runs in its own process group; when the deadline passes the
+whole group gets SIGTERM, then SIGKILL after KILL_GRACE_S, so a wedged
+bluetoothctl/nmcli/xrandr — or anything it spawned — can't block the
+caller. The caller gets a Result either way and decides what a timeout
+means (one menu entry missing, a fallback, ...):
+
+    r = proc.run(["nmcli", "-t", "dev", "wifi", "list"], timeout=8)
+    if r.timed_out: ...
+    text = proc.output(["xrandr", "--query"])          # "" on failure/timeout
+    results = proc.run_many([argv1, argv2], timeout=3)  # concurrent, capped
+    r = proc.stream(rofi_argv, feed, timeout=300)       # input written while it runs
+
+Pass timeout=None for interactive commands (rofi/wofi menus) that wait on
+the user. Every call is a span when tracing is on (dotlib/trace.py).
+
+subprocess and signal are imported on the first call, not with the module,
+so a script that only might run a command doesn't pay for them at start-up.
+"""
+
+import os
+import time
+from collections.abc import Callable, Sequence
+from io import TextIOWrapper
+
+from . import trace
+
+DEFAULT_TIMEOUT_S = 5.0
+KILL_GRACE_S = 0.5
+MAX_PARALLEL = 4
+
+
+class Result:
+    """Outcome of one command; returncode is None when it was killed on timeout."""
+
+    def __init__(self, argv: Sequence[str], returncode: int | None, stdout: str = "",
+                 stderr: str = "", timed_out: bool = False, missing: bool = False, elapsed: float = 0.0):
+        self.argv = list(argv)
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.missing = missing
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    def __repr__(self) -> str:
+        state = "timeout" if self.timed_out else "missing" if self.missing else f"rc={self.returncode}"
+        return f"<Result {self.argv[0] if self.argv else '?'} {state} {self.elapsed:.3f}s>"
+
+
+def _drain(proc: "subprocess.Popen") -> tuple[str | None, str | None]:
+    """Whatever output is left after the group was killed. A grandchild that
+    left the group (setsid) may still hold the pipes open, so don't wait on
+    them for longer than KILL_GRACE_S."""
+    import subprocess
+
+    try:
+        return proc.communicate(timeout=KILL_GRACE_S)
+    except (subprocess.TimeoutExpired, ValueError):
+        for f in (proc.stdin, proc.stdout, proc.stderr):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        return None, None
+
+
+def _kill_group(proc: "subprocess.Popen") -> None:
+    import signal
+    import subprocess
+
+    for sig, wait in ((signal.SIGTERM, KILL_GRACE_S), (signal.SIGKILL, None)):
+        try:
+            os.killpg(proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+        try:
+            proc.wait(wait)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+def run(argv: Sequence[str], timeout: float | None = DEFAULT_TIMEOUT_S, input: str | None = None,
+        env: dict[str, str] | None = None, capture: bool = True, stderr: bool = False) -> Result:
+    """Run argv to completion or until `timeout` seconds have passed.
+
+    capture=False leaves stdout alone (inherited); stderr=True captures it
+    too, otherwise it is discarded when capturing.
+    """
+    import subprocess
+
+    argv = [str(a) for a in argv]
+    t0 = time.monotonic()
+    with trace.command(argv) as sp:
+        try:
+            proc = subprocess.Popen(
+                argv, text=True, start_new_session=True, env=trace.env(env),
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE if capture else None,
+                stderr=(subprocess.PIPE if stderr else subprocess.DEVNULL) if capture else None,
+            )
+        except (FileNotFoundError, PermissionError):
+            sp.args["missing"] = True
+            return Result(argv, 127, missing=True, elapsed=time.monotonic() - t0)
+        try:
+            out, err = proc.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_group(proc)
+            out, err = _drain(proc)
+            sp.args["timed_out"] = True
+            return Result(argv, None, out or "", err or "", timed_out=True, elapsed=time.monotonic() - t0)
+        except BaseException:
+            _kill_group(proc)  # KeyboardInterrupt etc.: don't leave the group behind
+            raise
+        sp.args["returncode"] = proc.returncode
+        return Result(argv, proc.returncode, out or "", err or "", elapsed=time.monotonic() - t0)
+
+
+def stream(argv: Sequence[str], feed: Callable[[TextIOWrapper, Callable[[], bool]], None],
+           timeout: float | None = DEFAULT_TIMEOUT_S, env: dict[str, str] | None = None) -> Result:
+    """Like run(), but the input is written by `feed(stdin, running)` while the
+    command is already up (a rofi menu filling in rows). `running()` is False
+    once the command exited or the deadline passed; feed should return then.
+    A pipe closed early (the user already picked) ends feeding quietly."""
+    import subprocess
+
+    argv = [str(a) for a in argv]
+    t0 = time.monotonic()
+    deadline = None if timeout is None else t0 + timeout
+    with trace.command(argv) as sp:
+        try:
+            proc = subprocess.Popen(argv, text=True, start_new_session=True, env=trace.env(env),
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL)
+        except (FileNotFoundError, PermissionError):
+            sp.args["missing"] = True
+            return Result(argv, 127, missing=True, elapsed=time.monotonic() - t0)
+
+        def running() -> bool:
+            return proc.poll() is None and (deadline is None or time.monotonic() < deadline)
+
+        try:
+            try:
+                feed(proc.stdin, running)
+            except BrokenPipeError:
+                pass
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            out, _ = proc.communicate(timeout=left)
+        except subprocess.TimeoutExpired:
+            _kill_group(proc)
+            out, _ = _drain(proc)
+            sp.args["timed_out"] = True
+            return Result(argv, None, out or "", timed_out=True, elapsed=time.monotonic() - t0)
+        except BaseException:
+            _kill_group(proc)
+            raise
+        sp.args["returncode"] = proc.returncode
+        return Result(argv, proc.returncode, out or "", elapsed=time.monotonic() - t0)
+
+
+def output(argv: Sequence[str], timeout: float | None = DEFAULT_TIMEOUT_S, **kw) -> str:
+    """stdout of a successful run, else ""."""
+    r = run(argv, timeout, **kw)
+    return r.stdout if r.ok else ""
+
+
+def ok(argv: Sequence[str], timeout: float | None = DEFAULT_TIMEOUT_S, **kw) -> bool:
+    return run(argv, timeout, **kw).ok
+
+
+def run_many(argvs: Sequence[Sequence[str]], timeout: float | None = DEFAULT_TIMEOUT_S,
+             max_parallel: int = MAX_PARALLEL, **kw) -> list[Result]:
+    """Run the commands concurrently, at most max_parallel at a time; results in input order.
+
+    Each command has its own deadline, so one that hangs costs at most
+    `timeout` and doesn't hold back the others' results.
+    """
+    if len(argvs) <= 1:
+        return [run(a, timeout, **kw) for a in argvs]
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(argvs)), thread_name_prefix="run") as pool:
+        return list(pool.map(lambda a: run(a, timeout, **kw), argvs))
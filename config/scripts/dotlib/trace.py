@@ -0,0 +1,246 @@
+"""
+trace.py — opt-in timing spans across the display scripts.
+
+Off unless DOTFILES_TRACE is set ("1" → $XDG_RUNTIME_DIR/dotfiles-trace, or
+a directory); when off every call is a cheap no-op.
+
+    with trace.span("parse", output=name) as sp:
+        ...
+        sp.args["modes"] = len(modes)
+
+    subprocess.run(cmd, env=trace.env())   # child spans join this trace
+
+Each finished span is appended as one JSON line to <dir>/<trace id>.jsonl.
+A trace is started by root() (monitor_hotplug.py: one per reaction) or, in
+a script run on its own, on the first span. Child processes find the trace
+through DOTFILES_TRACE_ID / DOTFILES_TRACE_PARENT in their environment and
+append to the same file, so one hotplug gives one file covering the daemon,
+autorandr/xrandr, the layout script and the wallpaper. When the trace ends
+it is also written as <trace id>.json in Chrome trace-event format (open it
+in https://ui.perfetto.dev or chrome://tracing).
+"""
+
+import os
+import sys
+import threading
+import time
+from collections.abc import Sequence
+
+ENV_DIR = "DOTFILES_TRACE"
+ENV_ID = "DOTFILES_TRACE_ID"
+ENV_PARENT = "DOTFILES_TRACE_PARENT"
+
+DEFAULT_DIR = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "dotfiles-trace")
+KEEP_TRACES = 50
+
+_local = threading.local()       # .trace (root() in this thread), .stack of span ids
+_lock = threading.Lock()
+_own_trace: str | None = None  # started lazily by a script not run under a trace
+
+
+def trace_dir() -> str | None:
+    value = os.environ.get(ENV_DIR, "")
+    if value in ("", "0"):
+        return None
+    return DEFAULT_DIR if value == "1" else os.path.expanduser(value)
+
+
+def enabled() -> bool:
+    return trace_dir() is not None
+
+
+def _program() -> str:
+    return os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+
+def _new_trace_id(name: str) -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{os.urandom(2).hex()}"
+
+
+def _trace_id() -> str:
+    global _own_trace
+    tid = getattr(_local, "trace", None) or os.environ.get(ENV_ID)
+    if tid:
+        return tid
+    with _lock:
+        if _own_trace is None:
+            import atexit
+            _own_trace = _new_trace_id(_program())
+            atexit.register(export_chrome, _own_trace)
+        return _own_trace
+
+
+def _stack() -> list[str]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _parent() -> str | None:
+    stack = _stack()
+    return stack[-1] if stack else os.environ.get(ENV_PARENT)
+
+
+def _append(trace_id: str, record: dict) -> None:
+    import json
+
+    d = trace_dir()
+    line = json.dumps(record, default=str) + "\n"
+    try:
+        os.makedirs(d, exist_ok=True)
+        # One O_APPEND write per span: lines from concurrent processes don't interleave
+        fd = os.open(os.path.join(d, f"{trace_id}.jsonl"), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+class Span:
+    """A timed step; `args` is recorded with it and may be filled in while it runs."""
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+        self.id: str | None = None
+
+    def __enter__(self) -> "Span":
+        if enabled():
+            self.id = os.urandom(4).hex()
+            self.trace = _trace_id()
+            self.parent = _parent()
+            _stack().append(self.id)
+            self.ts = time.time()
+            self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.id is None:
+            return
+        dur = time.perf_counter() - self.t0
+        stack = _stack()
+        if stack and stack[-1] == self.id:
+            stack.pop()
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        _append(self.trace, {
+            "trace": self.trace, "span": self.id, "parent": self.parent, "name": self.name,
+            "ts": self.ts, "dur": dur, "pid": os.getpid(), "tid": threading.get_native_id(),
+            "proc": _program(), "args": self.args,
+        })
+
+
+class _Root(Span):
+    """A span that starts a new trace for the current thread and exports it on exit."""
+
+    def __enter__(self) -> "Span":
+        if enabled():
+            _local.trace = _new_trace_id(self.name)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        super().__exit__(exc_type, exc, tb)
+        if self.id is not None:
+            _local.trace = None
+            export_chrome(self.trace)
+            prune()
+
+
+def span(name: str, **args) -> Span:
+    return Span(name, args)
+
+
+def root(name: str, **args) -> Span:
+    return _Root(name, args)
+
+
+def command(argv, **args) -> Span:
+    """Span for running an external command (argv list or shell string)."""
+    words = argv.split() if isinstance(argv, str) else list(argv)
+    return Span(f"exec {os.path.basename(words[0]) if words else '?'}",
+                dict(args, argv=argv if isinstance(argv, str) else " ".join(words)))
+
+
+def env(base: dict[str, str] | None = None) -> dict[str, str] | None:
+    """Environment for a child process so its spans land in the current trace.
+
+    With `base` the ids are added to it; without, a copy of os.environ is
+    returned — or None while tracing is off (subprocess's default).
+    """
+    if not enabled():
+        return base
+    e = base if base is not None else dict(os.environ)
+    e[ENV_ID] = _trace_id()
+    parent = _parent()
+    if parent:
+        e[ENV_PARENT] = parent
+    return e
+
+
+# ---------- export -------------------------------------------------------- #
+
+def load(trace_id: str) -> list[dict]:
+    import json
+
+    records = []
+    try:
+        with open(os.path.join(trace_dir() or DEFAULT_DIR, f"{trace_id}.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass  # a writer killed mid-line
+    except OSError:
+        pass
+    return records
+
+
+def chrome_events(records: Sequence[dict]) -> list[dict]:
+    """Spans → Chrome trace "complete" events (µs), plus a name per process."""
+    events, procs = [], {}
+    for r in records:
+        procs.setdefault(r["pid"], r.get("proc") or str(r["pid"]))
+        events.append({
+            "name": r["name"], "cat": r.get("proc", "dotfiles"), "ph": "X",
+            "ts": round(r["ts"] * 1e6), "dur": max(1, round(r["dur"] * 1e6)),
+            "pid": r["pid"], "tid": r["tid"],
+            "args": dict(r.get("args") or {}, span=r["span"], parent=r.get("parent")),
+        })
+    for pid, name in procs.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}})
+    return events
+
+
+def export_chrome(trace_id: str) -> str | None:
+    import json
+
+    d = trace_dir()
+    records = load(trace_id) if d else []
+    if not records:
+        return None
+    path = os.path.join(d, f"{trace_id}.json")
+    tmp = f"{path}.{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": chrome_events(records), "displayTimeUnit": "ms"}, f)
+        os.replace(tmp, path)
+    except OSError:
+        return None
+    return path
+
+
+def prune(keep: int = KEEP_TRACES) -> None:
+    d = trace_dir()
+    try:
+        traces = sorted((e for e in os.scandir(d) if e.name.endswith(".jsonl")),
+                        key=lambda e: e.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for e in traces[keep:]:
+        for path in (e.path, e.path[:-1]):   # .jsonl and .json
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+notify.py — notify-send for shell hooks, with bubbles that update in place.
+
+Goes through dotlib.notify: one D-Bus call instead of a notify-send fork,
+and --tag replaces the bubble the previous call with that tag opened
+(repeats of the same text are rate-limited).
+
+Usage:
+  notify.py [--tag display] [--icon display] [--urgency critical] SUMMARY [BODY]
+  dotctl notify ...
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from dotlib import notify
+
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Send a desktop notification")
+    parser.add_argument("summary")
+    parser.add_argument("body", nargs="?", default="")
+    parser.add_argument("--tag", help="replace the previous notification with this tag")
+    parser.add_argument("-i", "--icon", default="")
+    parser.add_argument("-u", "--urgency", choices=notify.URGENCY_NAMES, default="normal")
+    parser.add_argument("-t", "--expire-time", type=int, default=-1, metavar="MS")
+    args = parser.parse_args()
+
+    sent = notify.send(args.summary, args.body, tag=args.tag, icon=args.icon,
+                       urgency=notify.URGENCY_NAMES.index(args.urgency), expire_ms=args.expire_time)
+    return 0 if sent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+switch_audio_sink.py — pick the default audio output from rofi or wofi.
+
+All sinks and the current default come from one snapshot (dotlib.audio);
+the chosen sink becomes the default and every active stream is moved onto
+it in one batch. The menu opens with the last known sinks (dotlib.menu)
+while the snapshot runs.
+
+Usage:
+  switch_audio_sink.py            # rofi (X11)
+  switch_audio_sink.py --wofi     # wofi (Wayland)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from dotlib import audio, menu, notify
+
+PROMPT = "Audio Output"
+WOFI_CONF = os.path.expanduser("~/.config/wofi/wifi.config")
+WOFI_STYLE = os.path.expanduser("~/.config/wofi/dark.css")
+
+
+def menu_cmd(use_wofi: bool) -> list[str]:
+    if not use_wofi:
+        return ["rofi", "-dmenu", "-i", "-p", PROMPT]
+    cmd = ["wofi", "--show", "dmenu", "--prompt", PROMPT, "--insensitive", "--hide-scroll"]
+    if os.path.isfile(WOFI_CONF):
+        cmd += ["--conf", WOFI_CONF]
+    if os.path.isfile(WOFI_STYLE):
+        cmd += ["--style", WOFI_STYLE]
+    return cmd
+
+
+def list_sinks() -> list[tuple[str, list[str]]]:
+    """(menu label, [sink name, plain label]) for every sink."""
+    sinks, _default = audio.snapshot()
+    return [(audio.label(s), [s["name"], audio.label(s, mark_default=False)]) for s in sinks]
+
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Switch the default audio sink")
+    parser.add_argument("--wofi", action="store_true", help="use wofi instead of rofi")
+    args = parser.parse_args()
+
+    # Last known sinks show at once; rofi gets the fresh list streamed in
+    choice = menu.pick("audio-sinks", list_sinks, menu_cmd(args.wofi),
+                       stream=not args.wofi, empty="No audio sinks found")
+    if not choice:
+        return 0
+
+    name, plain = choice
+    audio.switch_to(name)
+    notify.send(f"🔊 Switched audio output to: {plain}", tag="audio")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
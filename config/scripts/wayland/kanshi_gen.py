@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+kanshi_gen.py — compile pick_best_output.py's decisions into kanshi profiles.
+
+kanshi applies a profile the moment a known set of outputs appears, with no
+Python in the hot path. This script precomputes those profiles from the
+monitors seen so far (~/.config/kanshi/monitors.json) using the same logic
+pick_best_output.py runs at hotplug time: the best output of each set gets
+its best mode at 0,0 with the PPI-derived scale, the others are disabled.
+
+One profile is emitted per connected set actually observed
+(~/.config/kanshi/sets.json), so the config grows with the setups in use,
+not with every combination of monitors ever seen. After them come catch-all
+profiles (one per output count, up to MAX_CONNECTED `output *` lines) whose
+only job is to `exec kanshi_gen.py learn`: an unseen monitor or set is
+recorded, the profiles are regenerated and kanshi is reloaded; a set kanshi
+still can't match is decided and applied directly, like
+pick_best_output.py --apply.
+
+Both generated blocks are delimited by marker comments in
+~/.config/kanshi/config; hand-written profiles between them are kept.
+
+Profiles are compiled for AC power: monitor_hotplug.py (started from
+wayfire.ini) runs `pick_best_output.py --refresh` after each hotplug and
+power change, which lowers the rates of the applied profile on battery.
+
+Usage:
+  kanshi_gen.py learn        # record new monitors/sets; regenerate + reload if any
+  kanshi_gen.py generate     # regenerate from the store
+  kanshi_gen.py print        # print the generated profiles
+
+Requires:
+  - kanshi (kanshictl to reload)
+  - wlr_output_client.py (pywayland or wlr-randr)
+"""
+
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import proc
+import pick_best_output as pbo
+from mode_index import ModeIndex
+from wlr_output_client import Unavailable, apply_layout, get_outputs
+
+KANSHI_DIR = os.path.join(os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")), "kanshi")
+CONFIG_FILE = os.path.join(KANSHI_DIR, "config")
+STORE_FILE = os.path.join(KANSHI_DIR, "monitors.json")
+SETS_FILE = os.path.join(KANSHI_DIR, "sets.json")
+SELF = os.path.realpath(__file__)
+
+MAX_CONNECTED = 4         # catch-all profiles cover up to this many outputs
+INTERNAL_HINTS = ("eDP", "LVDS")
+
+BEGIN_PROFILES = "# >>> kanshi_gen.py profiles (generated, do not edit)"
+END_PROFILES = "# <<< kanshi_gen.py profiles"
+BEGIN_FALLBACK = "# >>> kanshi_gen.py fallback (generated, do not edit)"
+END_FALLBACK = "# <<< kanshi_gen.py fallback"
+
+
+# ---------- monitor store ------------------------------------------------- #
+
+def is_internal(name: str) -> bool:
+    return name.lower().startswith(tuple(h.lower() for h in INTERNAL_HINTS))
+
+
+def criteria(o: dict) -> str:
+    """kanshi's output criteria: the connector for the panel, else make/model/serial."""
+    if is_internal(o["name"]):
+        return o["name"]
+    return " ".join(v or "Unknown" for v in (o.get("make"), o.get("model"), o.get("serial")))
+
+
+def _load(path: str, default):
+    import json
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _save(path: str, data) -> None:
+    import json
+    os.makedirs(KANSHI_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_store() -> dict[str, dict]:
+    return _load(STORE_FILE, {})
+
+
+def save_store(store: dict[str, dict]) -> None:
+    _save(STORE_FILE, store)
+
+
+def load_sets() -> list[list[str]]:
+    return [sorted(keys) for keys in _load(SETS_FILE, [])]
+
+
+def save_sets(sets: list[list[str]]) -> None:
+    _save(SETS_FILE, sorted(sets))
+
+
+def connected_set(outputs: list[dict]) -> list[str]:
+    return sorted(criteria(o) for o in outputs if o["modes"])
+
+
+def remember_set(sets: list[list[str]], outputs: list[dict]) -> bool:
+    """Record the connected set if it's new; True when it was."""
+    keys = connected_set(outputs)
+    if not keys or keys in sets:
+        return False
+    sets.append(keys)
+    return True
+
+
+def remember(store: dict[str, dict], outputs: list[dict]) -> list[str]:
+    """Add unseen monitors to the store; returns their criteria."""
+    new = []
+    for o in outputs:
+        key = criteria(o)
+        if key in store or not o["modes"]:
+            continue
+        store[key] = {
+            "name": o["name"], "make": o.get("make"), "model": o.get("model"),
+            "phys_mm": list(o.get("phys_mm") or (None, None)),
+            "modes": [{k: m[k] for k in ("w", "h", "hz", "hz_str", "preferred")} for m in o["modes"]],
+        }
+        new.append(key)
+    return new
+
+
+def as_output(key: str, entry: dict) -> dict:
+    """Store entry → the output dict pick_best_output works on."""
+    o = dict(entry, key=key, enabled=None, phys_mm=tuple(entry.get("phys_mm") or (None, None)))
+    o["modes"] = [dict(m, current=False) for m in entry["modes"]]
+    o["index"] = ModeIndex(o["modes"])
+    return o
+
+
+# ---------- profiles ------------------------------------------------------ #
+
+def fmt_scale(scale: float) -> str:
+    return f"{scale:.3f}".rstrip("0").rstrip(".")
+
+
+def quoted(s: str) -> str:
+    return '"' + s.replace('"', "") + '"'
+
+
+def profile_for(keys: list[str], store: dict[str, dict]) -> list[str] | None:
+    outputs = [as_output(k, store[k]) for k in keys]
+    selected = pbo.pick_best_output(outputs)
+    if selected is None:
+        return None
+    scale, _ppi = pbo.choose_scale(selected)
+    bm = selected["best_mode"]
+    name = "+".join(o["name"] if is_internal(o["key"]) else (o.get("model") or o["key"]) for o in outputs)
+    lines = [f"profile {quoted(name)} {{"]
+    for o in outputs:
+        if o["key"] == selected["key"]:
+            lines.append(f"  output {quoted(o['key'])} enable mode {bm['w']}x{bm['h']}@{bm['hz']:.3f}Hz "
+                         f"position 0,0 scale {fmt_scale(scale)}")
+        else:
+            lines.append(f"  output {quoted(o['key'])} disable")
+    lines.append("}")
+    return lines
+
+
+def generate_profiles(store: dict[str, dict], sets: list[list[str]]) -> list[str]:
+    lines = [BEGIN_PROFILES]
+    for keys in sorted(sets, key=lambda k: (len(k), k)):
+        if not all(k in store for k in keys):
+            continue
+        prof = profile_for(keys, store)
+        if prof:
+            lines += prof + [""]
+    lines.append(END_PROFILES)
+    return lines
+
+
+def generate_fallback() -> list[str]:
+    lines = [BEGIN_FALLBACK]
+    for n in range(1, MAX_CONNECTED + 1):
+        lines.append("profile {")
+        lines += ["  output * enable"] * n
+        lines.append(f"  exec {SELF} learn")
+        lines += ["}", ""]
+    lines.append(END_FALLBACK)
+    return lines
+
+
+def strip_block(lines: list[str], begin: str, end: str) -> list[str]:
+    out, skipping = [], False
+    for line in lines:
+        if line == begin:
+            skipping = True
+        elif line == end and skipping:
+            skipping = False
+        elif not skipping:
+            out.append(line)
+    return out
+
+
+def write_config(store: dict[str, dict], sets: list[list[str]]) -> None:
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            manual = f.read().splitlines()
+    except OSError:
+        manual = []
+    manual = strip_block(strip_block(manual, BEGIN_PROFILES, END_PROFILES), BEGIN_FALLBACK, END_FALLBACK)
+    while manual and not manual[0].strip():
+        manual.pop(0)
+    while manual and not manual[-1].strip():
+        manual.pop()
+
+    text = "\n".join(generate_profiles(store, sets) + [""] + manual + [""] + generate_fallback()) + "\n"
+    os.makedirs(KANSHI_DIR, exist_ok=True)
+    tmp = f"{CONFIG_FILE}.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, CONFIG_FILE)
+
+
+def reload_kanshi() -> None:
+    if shutil.which("kanshictl"):
+        proc.run(["kanshictl", "reload"])
+
+
+# ---------- main ---------------------------------------------------------- #
+
+def learn() -> int:
+    try:
+        outputs = get_outputs()
+    except Unavailable as e:
+        print(f"Error: cannot read outputs: {e}", file=sys.stderr)
+        return 1
+    store, sets = load_store(), load_sets()
+    new = remember(store, outputs)
+    new_set = remember_set(sets, outputs)
+    if new or new_set:
+        if new:
+            print(f"New monitor(s): {', '.join(new)}")
+            save_store(store)
+        if new_set:
+            print(f"New set: {' + '.join(connected_set(outputs))}")
+            save_sets(sets)
+        write_config(store, sets)
+        reload_kanshi()
+        return 0
+
+    # A known set kanshi still didn't match: decide now
+    selected = pbo.pick_best_output(outputs, pbo.RefreshPolicy())
+    if selected is None:
+        return 3
+    scale, _ppi = pbo.choose_scale(selected)
+    return 0 if apply_layout(pbo.build_layout(selected, scale), outputs) else 1
+
+
+def main(argv: list[str]) -> int:
+    op = argv[0] if argv else "learn"
+    if op == "learn":
+        return learn()
+    if op == "generate":
+        write_config(load_store(), load_sets())
+        reload_kanshi()
+        return 0
+    if op == "print":
+        print("\n".join(generate_profiles(load_store(), load_sets()) + [""] + generate_fallback()))
+        return 0
+    print(__doc__.strip().split("Usage:")[1], file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,77 @@
+"""
+mode_index.py — per-output mode index, built once when wlr-randr output is parsed.
+
+Monitors can advertise 150+ modes (every CEA timing). Instead of
+de-duplicating and sorting the full list on each best_mode()/mode_for_res()
+call, each output gets a ModeIndex with:
+
+  by_res        (w, h) → modes, highest refresh first (duplicates dropped)
+  resolutions   every (w, h), largest area first
+  res_set       frozenset of (w, h) for O(1) membership / intersections
+  best          highest area, then preferred, then highest refresh
+  preferred     the mode flagged "preferred" (or None)
+  current       the mode flagged "current" (or None)
+  aspect_groups "16:9" → resolutions with that aspect ratio, largest first
+"""
+
+import math
+
+Res = tuple[int, int]
+
+
+def aspect_of(w: int, h: int) -> str:
+    g = math.gcd(w, h) or 1
+    return f"{w // g}:{h // g}"
+
+
+class ModeIndex:
+    __slots__ = ("by_res", "resolutions", "res_set", "best", "preferred", "current", "aspect_groups")
+
+    def __init__(self, modes: list[dict]):
+        by_res: dict[Res, list[dict]] = {}
+        seen = set()
+        self.preferred: dict | None = None
+        self.current: dict | None = None
+        for m in modes:
+            key = (m["w"], m["h"], round(m["hz"], 6))
+            if key in seen:
+                continue
+            seen.add(key)
+            by_res.setdefault((m["w"], m["h"]), []).append(m)
+            if m.get("preferred") and self.preferred is None:
+                self.preferred = m
+            if m.get("current") and self.current is None:
+                self.current = m
+        for lst in by_res.values():
+            lst.sort(key=lambda m: m["hz"], reverse=True)
+
+        self.by_res = by_res
+        self.resolutions: list[Res] = sorted(by_res, key=lambda wh: wh[0] * wh[1], reverse=True)
+        self.res_set = frozenset(by_res)
+
+        self.best: dict | None = None
+        if self.resolutions:
+            top = self.resolutions[0][0] * self.resolutions[0][1]
+            same_area = [m for wh in self.resolutions if wh[0] * wh[1] == top for m in by_res[wh]]
+            self.best = max(same_area, key=lambda m: (bool(m.get("preferred")), m["hz"]))
+
+        self.aspect_groups: dict[str, list[Res]] = {}
+        for wh in self.resolutions:
+            self.aspect_groups.setdefault(aspect_of(*wh), []).append(wh)
+
+    def best_within(self, max_hz: float | None, slop: float = 0.5) -> dict | None:
+        """Best resolution, at the highest refresh not above max_hz (lowest if none fits)."""
+        if self.best is None or max_hz is None:
+            return self.best
+        lst = self.by_res[(self.best["w"], self.best["h"])]
+        if self.best["hz"] <= max_hz + slop:
+            return self.best
+        within = [m for m in lst if m["hz"] <= max_hz + slop]
+        return within[0] if within else lst[-1]
+
+    def mode_for_res(self, w: int, h: int) -> dict | None:
+        lst = self.by_res.get((w, h))
+        return lst[0] if lst else None
+
+    def __len__(self) -> int:
+        return len(self.res_set)
@@ -3,40 +3,135 @@
 monitor_hotplug.py – react to display hot-plug events.
 
 Fixed for pyudev ≥ 0.21 (single-arg callback).
+
+kanshi owns the layout (wayfire.ini: outputs = kanshi) and its profiles
+are compiled for AC. This daemon (wayfire.ini: hotplug = ...) keeps the
+refresh cap in force on top of them: on start, on every display hotplug
+once kanshi has applied its profile, and when the machine switches between
+AC and battery (power_supply, debounced POWER_DEBOUNCE_S) it runs
+`pick_best_output.py --refresh`, which keeps the current layout and only
+re-picks each head's refresh rate under dotlib/power.py's RefreshPolicy.
+
+Display events are coalesced for HOTPLUG_DEBOUNCE_S so a dock's burst of
+connector events runs the helper once; reactions never overlap, and a
+helper that outlives REACTION_TIMEOUT_S is killed with its process group.
+
+With DOTFILES_TRACE=1 each reaction is one trace (dotlib/trace.py).
+
+Metrics (Prometheus text, dotlib/metrics.py) are kept in
+$XDG_RUNTIME_DIR/monitor_hotplug.prom and, with --metrics-socket, served on
+a unix socket; see the X11 monitor_hotplug.py for the list.
 """
 
 import logging
-import subprocess
 import sys
 import time
 import signal
-from pathlib import Path
 import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib.debounce import Debouncer
+from dotlib.power import power_source
+from dotlib import metrics, proc, trace
 
-try:
-    import pyudev
-except ImportError:
-    sys.stderr.write("pyudev not found – install it with:  pip install pyudev\n")
-    sys.exit(1)
+# ---------- metrics -------------------------------------------------------- #
+
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR", "/tmp")
+METRICS_FILE = os.path.join(RUNTIME_DIR, "monitor_hotplug.prom")
+REPORT_FILE = os.path.join(RUNTIME_DIR, f"monitor_hotplug.{os.getpid()}.report")
+
+METRICS = metrics.Registry()
+UDEV_EVENTS = METRICS.counter("hotplug_udev_events_total", "udev events received", ["subsystem"])
+COALESCED = METRICS.counter("hotplug_events_coalesced_total",
+                            "display events folded into an already pending reaction")
+REACTIONS = METRICS.counter("hotplug_reactions_total", "reactions run", ["trigger"])
+LATENCY = METRICS.histogram("hotplug_reaction_latency_seconds",
+                            "first event of a burst until the helper finished", labels=["trigger"])
+FAILURES = METRICS.counter("hotplug_modeset_failures_total", "reactions whose helper failed")
+FALLBACKS = METRICS.counter("hotplug_fallback_activations_total",
+                            "reactions that ended on the fallback layout")
 
 
 # ---------- custom reaction ------------------------------------------------ #
 
-def reaction(connector: str | None = None) -> None:
+REACTION_TIMEOUT_S = 60   # a helper stuck on the compositor is killed, not waited on
+REFRESH_ARGV = [sys.executable, os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                             "pick_best_output.py"), "--refresh"]
+
+_reaction_lock = threading.Lock()
+
+def reaction(connector: str | None = None, trigger: str = "start", since: float | None = None) -> None:
     """
     Run the helper inside the *same* session environment.
     """
-    logging.info("Display change (%s) – applying layout", connector or "?")
-
-    script = Path.home() / "display_monitor_plain.py"
-    env = os.environ.copy()  # preserves WAYLAND_DISPLAY, XDG_RUNTIME_DIR, etc.
-
-    try:
-        subprocess.run([sys.executable, str(script), "--apply"], check=True, env=env)
-    except FileNotFoundError:
-        logging.error("Helper not found: %s", script)
-    except subprocess.CalledProcessError as exc:
-        logging.error("Helper failed: %s", exc)
+    since = since or time.monotonic()
+    with _reaction_lock:
+        logging.info("Display change (%s) – re-picking refresh rates", connector or "?")
+
+        with trace.root("hotplug", connector=connector or "?", trigger=trigger):
+            env = os.environ.copy()  # preserves WAYLAND_DISPLAY, XDG_RUNTIME_DIR, etc.
+            env[metrics.ENV_REPORT] = REPORT_FILE
+            res = proc.run(REFRESH_ARGV, timeout=REACTION_TIMEOUT_S, env=env, capture=False)
+        ok = res.ok
+        if res.timed_out:
+            logging.error("Helper killed after %ss", REACTION_TIMEOUT_S)
+        elif not ok:
+            logging.error("Helper failed (%s)", res.returncode)
+
+        REACTIONS.inc(trigger=trigger)
+        LATENCY.observe(time.monotonic() - since, trigger=trigger)
+        if "fallback" in metrics.collect_reports(REPORT_FILE):
+            FALLBACKS.inc()
+        if not ok:
+            FAILURES.inc()
+
+
+# ---------- display events -------------------------------------------------- #
+
+HOTPLUG_DEBOUNCE_S = 1.5   # one reaction per burst, after kanshi applied its profile
+
+_burst_lock = threading.Lock()
+_burst_start: float | None = None
+_burst_connectors: set[str] = set()
+
+def _display_reaction() -> None:
+    global _burst_start
+    with _burst_lock:
+        since, _burst_start = _burst_start, None
+        connectors = ",".join(sorted(_burst_connectors))
+        _burst_connectors.clear()
+    reaction(connectors, "drm", since)
+
+_display_debounce = Debouncer(HOTPLUG_DEBOUNCE_S, _display_reaction)
+
+def handle_display_event(connector: str) -> None:
+    global _burst_start
+    with _burst_lock:
+        if _burst_start is None:
+            _burst_start = time.monotonic()
+        else:
+            COALESCED.inc()
+        _burst_connectors.add(connector)
+    _display_debounce.trigger()
+
+
+# ---------- power source ---------------------------------------------------- #
+
+POWER_DEBOUNCE_S = 2.0     # chargers bounce online/offline while negotiating
+
+_power_state: str | None = None
+_power_debounce = Debouncer(POWER_DEBOUNCE_S,
+                            lambda src, since: reaction(f"power:{src}", "power", since))
+
+def handle_power_event() -> None:
+    global _power_state
+    src = power_source()
+    if src == _power_state:
+        return  # battery capacity updates etc.
+    logging.info("Power source: %s → %s", _power_state or "?", src)
+    _power_state = src
+    _power_debounce.trigger(src, time.monotonic())
 
 
 # ---------- udev glue ------------------------------------------------------ #
@@ -47,6 +142,10 @@ def handle_event(*args):
     else:               # legacy pyudev
         action, device = args
 
+    UDEV_EVENTS.inc(subsystem=device.subsystem)
+    if device.subsystem == "power_supply":
+        handle_power_event()
+        return
     if action != "change":
         return
     if device.properties.get("HOTPLUG") != "1":
@@ -56,7 +155,7 @@ def handle_event(*args):
 
     connector = device.sys_name  # e.g. card0-HDMI-A-1
     logging.debug("Hot-plug on %s", connector)
-    reaction(connector)
+    handle_display_event(connector)
 
 
 # ---------- graceful shutdown --------------------------------------------- #
@@ -69,12 +168,30 @@ def shutdown_handler(signum, frame):
 
 
 def main():
+    import argparse
+
+    try:
+        import pyudev
+    except ImportError:
+        sys.stderr.write("pyudev not found – install it with:  pip install pyudev\n")
+        sys.exit(1)
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
+    parser = argparse.ArgumentParser(description="Monitor hot-plug watcher (Wayland)")
+    parser.add_argument("--metrics-file", default=METRICS_FILE,
+                        help=f"Prometheus text file to keep updated ('' = none; default: {METRICS_FILE})")
+    parser.add_argument("--metrics-socket", help="also serve the metrics on this unix socket")
+    args = parser.parse_args()
+
+    if args.metrics_file:
+        METRICS.export_file(args.metrics_file)
+    metrics_srv = METRICS.serve_unix(args.metrics_socket) if args.metrics_socket else None
+
     # Register signal handlers
     signal.signal(signal.SIGTERM, shutdown_handler)
     signal.signal(signal.SIGINT, shutdown_handler)
@@ -82,11 +199,14 @@ def main():
     context = pyudev.Context()
     monitor = pyudev.Monitor.from_netlink(context)
     monitor.filter_by(subsystem="drm")
+    monitor.filter_by(subsystem="power_supply")
 
     observer = pyudev.MonitorObserver(monitor, callback=handle_event,
                                       name="udev-monitor-observer")
     observer.start()
 
+    global _power_state
+    _power_state = power_source()
     reaction()
 
     logging.info("Listening for monitor hot-plug events… (Ctrl-C or SIGTERM to quit)")
@@ -94,7 +214,12 @@ def main():
         while not _stop:
             time.sleep(1)
     finally:
+        _power_debounce.cancel()
+        _display_debounce.cancel()
         observer.stop()
+        if metrics_srv is not None:
+            metrics_srv.close()
+            os.unlink(args.metrics_socket)
         logging.info("Observer stopped. Bye.")
 
 
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 import os
-import re
 import math
-import shlex
-import subprocess
-from typing import List, Dict, Optional, Tuple
+import sys
+
+from wlr_output_client import Unavailable, apply_layout, get_outputs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import notify as notifications, proc
 
 # ------------------ WOFI CONFIG SNIPPET ------------------
 WOFI_CONF = os.path.expanduser("~/.config/wofi/wifi.config")
@@ -23,138 +25,52 @@ SCALE_STEP = 0.125       # round scale (e.g., 1.00, 1.05, 1.10, ...)
 INTERNAL_HINTS = ("eDP", "LVDS")  # internal panel name prefixes
 
 # ------------------ UTIL ------------------
-def run_out(args: List[str]) -> str:
-    """Run a command and return stdout (text), or '' on failure."""
-    try:
-        return subprocess.check_output(args, text=True, stderr=subprocess.DEVNULL)
-    except Exception:
-        return ""
+def notify(summary: str, body: str | None = None):
+    notifications.send(summary, body or "", tag="display")
 
-def run_ok(args: List[str]) -> bool:
+# ------------------ OUTPUTS ------------------
+def get_wlr_info() -> list[dict]:
+    """Heads over wlr-output-management (wlr-randr as fallback); [] if neither works."""
     try:
-        subprocess.run(args, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        return False
-
-def notify(summary: str, body: Optional[str] = None):
-    exe = shutil_which("notify-send")
-    if not exe: return
-    cmd = [exe, summary] if not body else [exe, summary, body]
-    subprocess.run(cmd, check=False)
-
-def shutil_which(cmd: str) -> Optional[str]:
-    from shutil import which
-    return which(cmd)
-
-# ------------------ WLR-RANDR PARSE ------------------
-MODE_RE = re.compile(r'^\s{4}(\d+)x(\d+)\s+px,\s+([\d.]+)\s+Hz(?:\s+\((.*?)\))?\s*$')
-OUT_RE  = re.compile(r'^(\S+)\s+"([^"]*)"')
-MM_RE   = re.compile(r'^\s+Physical size:\s+(\d+)x(\d+)\s+mm')
-EN_RE   = re.compile(r'^\s+Enabled:\s+(yes|no)')
-
-def get_wlr_info() -> List[Dict]:
-    text = run_out(["wlr-randr"])
-    if not text:
+        return get_outputs()
+    except Unavailable:
         return []
-    return parse_outputs(text)
-
-def parse_outputs(text: str) -> List[Dict]:
-    outputs: List[Dict] = []
-    cur: Optional[Dict] = None
-    in_modes = False
-
-    for line in text.splitlines():
-        m_out = OUT_RE.match(line)
-        if m_out:
-            if cur: outputs.append(cur)
-            cur = {
-                "name": m_out.group(1),
-                "desc": m_out.group(2),
-                "enabled": None,
-                "phys_mm": (None, None),
-                "modes": [],  # dicts {w,h,hz,hz_str,preferred,current}
-            }
-            in_modes = False
-            continue
-
-        if cur is None:
-            continue
-
-        if line.strip() == "Modes:":
-            in_modes = True
-            continue
-
-        if in_modes:
-            m_mode = MODE_RE.match(line)
-            if m_mode:
-                w = int(m_mode.group(1)); h = int(m_mode.group(2))
-                hz_str = m_mode.group(3)
-                hz = float(hz_str)
-                flags = (m_mode.group(4) or "").lower()
-                cur["modes"].append({
-                    "w": w, "h": h, "hz": hz, "hz_str": hz_str,
-                    "preferred": "preferred" in flags,
-                    "current": "current" in flags
-                })
-                continue
-            else:
-                in_modes = False
-
-        m_mm = MM_RE.match(line)
-        if m_mm:
-            cur["phys_mm"] = (int(m_mm.group(1)), int(m_mm.group(2)))
-            continue
-
-        m_en = EN_RE.match(line)
-        if m_en:
-            cur["enabled"] = (m_en.group(1) == "yes")
-            continue
-
-    if cur: outputs.append(cur)
-    return outputs
 
 def is_internal(name: str) -> bool:
     lname = name.lower()
     return any(lname.startswith(h.lower()) for h in INTERNAL_HINTS)
 
-def find_internal_output(outputs: List[Dict]) -> Optional[Dict]:
+def find_internal_output(outputs: list[dict]) -> dict | None:
     for o in outputs:
         if is_internal(o["name"]):
             return o
     return None
 
-def find_external_output(outputs: List[Dict], internal_name: Optional[str]) -> Optional[Dict]:
-    for o in outputs:
-        if o["name"] != internal_name:
-            return o
-    return None
+def find_external_outputs(outputs: list[dict], internal_name: str | None) -> list[dict]:
+    return [o for o in outputs if o["name"] != internal_name and o["index"].best]
 
-def best_mode(modes: List[Dict]) -> Optional[Dict]:
-    if not modes: return None
-    # De-duplicate on w,h,hz
-    seen = set(); uniq = []
-    for m in modes:
-        key = (m["w"], m["h"], round(m["hz"], 6))
-        if key not in seen:
-            seen.add(key); uniq.append(m)
-    uniq.sort(key=lambda m: (m["w"]*m["h"], m["preferred"], m["hz"]), reverse=True)
-    return uniq[0]
-
-def mode_for_res(modes: List[Dict], w: int, h: int) -> Optional[Dict]:
-    candidates = [m for m in modes if m["w"] == w and m["h"] == h]
-    if not candidates: return None
-    candidates.sort(key=lambda m: m["hz"], reverse=True)
-    return candidates[0]
-
-def common_resolutions(a_modes: List[Dict], b_modes: List[Dict]) -> List[Tuple[int,int]]:
-    a = {(m["w"], m["h"]) for m in a_modes}
-    b = {(m["w"], m["h"]) for m in b_modes}
-    res = sorted(list(a & b), key=lambda wh: (wh[0]*wh[1]), reverse=True)
-    return res
+def physical_diag_mm(o: dict) -> float:
+    mm_w, mm_h = o.get("phys_mm") or (None, None)
+    return math.hypot(mm_w, mm_h) if mm_w and mm_h else 0.0
+
+def by_physical_size(outputs: list[dict]) -> list[dict]:
+    """Largest panel first; outputs that report no size keep their order at the end."""
+    return sorted(outputs, key=physical_diag_mm, reverse=True)
+
+def best_mode(o: dict) -> dict | None:
+    return o["index"].best
+
+def mode_for_res(o: dict, w: int, h: int) -> dict | None:
+    return o["index"].mode_for_res(w, h)
+
+def common_resolutions(outputs: list[dict]) -> list[tuple[int,int]]:
+    """Resolutions offered by every output, largest first."""
+    if not outputs: return []
+    common = frozenset.intersection(*(o["index"].res_set for o in outputs))
+    return sorted(common, key=lambda wh: wh[0]*wh[1], reverse=True)
 
 # ------------------ PPI & SCALE ------------------
-def compute_ppi(w_px: int, h_px: int, mm_w: Optional[int], mm_h: Optional[int]) -> Optional[float]:
+def compute_ppi(w_px: int, h_px: int, mm_w: int | None, mm_h: int | None) -> float | None:
     if not mm_w or not mm_h or mm_w <= 0 or mm_h <= 0: return None
     diag_px = math.hypot(w_px, h_px)
     diag_in = math.hypot(mm_w, mm_h) / 25.4
@@ -163,108 +79,125 @@ def compute_ppi(w_px: int, h_px: int, mm_w: Optional[int], mm_h: Optional[int])
 def round_scale(x: float) -> float:
     return max(1.0, round(x / SCALE_STEP) * SCALE_STEP)
 
-# ------------------ COMMAND BUILDERS ------------------
-def cmd_enable_only(name: str, mode: Dict, scale: Optional[float], all_outputs: List[Dict]) -> List[str]:
-    args = ["wlr-randr", "--output", name, "--on", "--mode", f"{mode['w']}x{mode['h']}@{mode['hz_str']}", "--pos", "0,0"]
-    if scale is not None:
-        args += ["--scale", f"{scale:.2f}"]
-    for o in all_outputs:
-        if o["name"] != name:
-            args += ["--output", o["name"], "--off"]
-    return args
-
-def cmd_extend_lr(left: Dict, left_mode: Dict, right: Dict, right_mode: Dict) -> List[str]:
-    # Left at 0,0; right placed to the right by left_mode width
-    args = [
-        "wlr-randr",
-        "--output", left["name"],  "--on", "--mode", f"{left_mode['w']}x{left_mode['h']}@{left_mode['hz_str']}", "--pos", "0,0",
-        "--output", right["name"], "--on", "--mode", f"{right_mode['w']}x{right_mode['h']}@{right_mode['hz_str']}", "--pos", f"{left_mode['w']},0"
-    ]
-    # Turn off any others (rare)
-    # (Assume only two for simplicity; add offs if more present)
-    return args
-
-def cmd_mirror(a: Dict, b: Dict, res: Tuple[int,int], a_mode: Dict, b_mode: Dict) -> List[str]:
-    # Place both at 0,0 (mirrored)
-    w, h = res
-    args = [
-        "wlr-randr",
-        "--output", a["name"], "--on", "--mode", f"{w}x{h}@{a_mode['hz_str']}", "--pos", "0,0",
-        "--output", b["name"], "--on", "--mode", f"{w}x{h}@{b_mode['hz_str']}", "--pos", "0,0"
-    ]
-    return args
+def output_scale(o: dict, mode: dict) -> float:
+    mm_w, mm_h = o.get("phys_mm", (None, None))
+    ppi = compute_ppi(mode["w"], mode["h"], mm_w, mm_h)
+    return 1.0 if ppi is None else round_scale(ppi / TARGET_PPI)
+
+# ------------------ LAYOUT SOLVER ------------------
+# A placement is {"out": output dict, "mode": mode dict, "scale": float, "x": int, "y": int}.
+
+def placements_for(outputs: list[dict]) -> list[dict]:
+    """Best mode + PPI-derived scale for each output (outputs without modes are skipped)."""
+    res = []
+    for o in outputs:
+        bm = best_mode(o)
+        if bm:
+            res.append({"out": o, "mode": bm, "scale": output_scale(o, bm), "x": 0, "y": 0})
+    return res
+
+def logical_size(p: dict) -> tuple[int,int]:
+    return (round(p["mode"]["w"] / p["scale"]), round(p["mode"]["h"] / p["scale"]))
+
+def solve_row(placed: list[dict]) -> list[dict]:
+    """Left to right in the given order, top-aligned, in logical (scaled) pixels."""
+    x = 0
+    for p in placed:
+        p["x"], p["y"] = x, 0
+        x += logical_size(p)[0]
+    return placed
+
+def solve_grid(placed: list[dict], cols: int | None = None) -> list[dict]:
+    """Rows of `cols` outputs (default: ~square); each row as tall as its tallest output."""
+    cols = cols or max(1, math.ceil(math.sqrt(len(placed))))
+    y = 0
+    for r in range(0, len(placed), cols):
+        row = solve_row(placed[r:r + cols])
+        for p in row:
+            p["y"] = y
+        y += max(logical_size(p)[1] for p in row)
+    return placed
+
+# ------------------ LAYOUT BUILDERS ------------------
+# A layout is what wlr_output_client applies: the listed heads on, every other head off.
+
+def layout_enable_only(name: str, mode: dict, scale: float | None) -> list[dict]:
+    return [{"name": name, "mode": mode, "x": 0, "y": 0, "scale": scale}]
+
+def layout_of(placed: list[dict]) -> list[dict]:
+    """Enable every placement; the layout switches off every output it does not use."""
+    return [{"name": p["out"]["name"], "mode": p["mode"], "x": p["x"], "y": p["y"], "scale": p.get("scale")}
+            for p in placed]
+
+def apply(layout: list[dict], outputs: list[dict]):
+    if not apply_layout(layout, outputs):
+        notify("❌ Layout rejected by the compositor")
 
 # ------------------ ACTIONS ------------------
-def external_only(outputs: List[Dict], internal: Optional[Dict]):
-    ext = find_external_output(outputs, internal["name"] if internal else None)
-    if not ext:
+def external_only(outputs: list[dict], internal: dict | None):
+    exts = placements_for(by_physical_size(find_external_outputs(outputs, internal["name"] if internal else None)))
+    if not exts:
         notify("❌ No external display found"); return
-    bm = best_mode(ext["modes"])
-    if not bm:
-        notify("❌ External has no modes"); return
-    cmd = cmd_enable_only(ext["name"], bm, None, outputs)
-    subprocess.run(cmd, check=False)
+    apply(layout_of(solve_row(exts)), outputs)
 
-def internal_only(outputs: List[Dict], internal: Optional[Dict]):
+def internal_only(outputs: list[dict], internal: dict | None):
     if not internal:
         notify("❌ Internal display not found"); return
-    bm = best_mode(internal["modes"])
+    bm = best_mode(internal)
     if not bm:
         notify("❌ Internal has no modes"); return
-    cmd = cmd_enable_only(internal["name"], bm, None, outputs)
-    subprocess.run(cmd, check=False)
-
-def extend_to_right(outputs: List[Dict], internal: Optional[Dict]):
-    if not internal:
-        notify("❌ Internal display not found"); return
-    ext = find_external_output(outputs, internal["name"])
-    if not ext:
+    apply(layout_enable_only(internal["name"], bm, None), outputs)
+
+def extend(outputs: list[dict], internal: dict | None, internal_first: bool, grid: bool = False):
+    """Internal panel plus every external, in a row (or grid), the rest switched off.
+    Externals go largest first away from the internal panel, so the biggest
+    screen sits next to it."""
+    exts = by_physical_size(find_external_outputs(outputs, internal["name"] if internal else None))
+    if not exts:
         notify("❌ No external display found"); return
-    im = best_mode(internal["modes"]); em = best_mode(ext["modes"])
-    if not im or not em:
+    ordered = ([internal] if internal else []) + exts if internal_first else exts[::-1] + ([internal] if internal else [])
+    placed = placements_for(ordered)
+    if len(placed) < 2:
         notify("❌ Missing modes to extend"); return
-    # "Extend to the right" (external on right of internal): internal left, external right
-    cmd = cmd_extend_lr(internal, im, ext, em)
-    subprocess.run(cmd, check=False)
+    placed = solve_grid(placed) if grid else solve_row(placed)
+    apply(layout_of(placed), outputs)
 
-def extend_to_left(outputs: List[Dict], internal: Optional[Dict]):
-    if not internal:
-        notify("❌ Internal display not found"); return
-    ext = find_external_output(outputs, internal["name"])
-    if not ext:
-        notify("❌ No external display found"); return
-    im = best_mode(internal["modes"]); em = best_mode(ext["modes"])
-    if not im or not em:
-        notify("❌ Missing modes to extend"); return
-    # "Extend to the left" (external on left of internal): external left, internal right
-    cmd = cmd_extend_lr(ext, em, internal, im)
-    subprocess.run(cmd, check=False)
+def extend_to_right(outputs: list[dict], internal: dict | None):
+    # "Extend to the right": internal leftmost, externals to its right
+    extend(outputs, internal, internal_first=True)
 
-def mirror_displays(outputs: List[Dict], internal: Optional[Dict]):
-    if not internal:
-        notify("❌ Internal display not found"); return
-    ext = find_external_output(outputs, internal["name"])
-    if not ext:
+def extend_to_left(outputs: list[dict], internal: dict | None):
+    # "Extend to the left": externals on the left, internal rightmost
+    extend(outputs, internal, internal_first=False)
+
+def extend_grid(outputs: list[dict], internal: dict | None):
+    extend(outputs, internal, internal_first=True, grid=True)
+
+def mirror_displays(outputs: list[dict], internal: dict | None):
+    """Mirror every output with modes at the largest resolution they ALL support."""
+    mirrored = [o for o in outputs if o["index"].best]
+    if len(mirrored) < 2:
         notify("❌ No external display found"); return
-    commons = common_resolutions(internal["modes"], ext["modes"])
+    commons = common_resolutions(mirrored)
     if not commons:
         notify("❌ No common resolution to mirror"); return
     w, h = commons[0]  # highest area
-    im = mode_for_res(internal["modes"], w, h)
-    em = mode_for_res(ext["modes"], w, h)
-    if not im or not em:
-        notify("❌ Could not pick mirror modes"); return
-    cmd = cmd_mirror(internal, ext, (w, h), im, em)
-    subprocess.run(cmd, check=False)
-
-def pick_best(outputs: List[Dict]):
+    placed = []
+    for o in mirrored:
+        m = mode_for_res(o, w, h)
+        if not m:
+            notify("❌ Could not pick mirror modes"); return
+        placed.append({"out": o, "mode": m, "scale": None, "x": 0, "y": 0})
+    apply(layout_of(placed), outputs)
+
+def pick_best(outputs: list[dict]):
     """
     Choose output by: enabled first, then largest pixel area, preferred flag, highest Hz.
-    Set scale targeting ~109 PPI and switch ALL others off.
+    set scale targeting ~109 PPI and switch ALL others off.
     """
     candidates = []
     for o in outputs:
-        bm = best_mode(o["modes"])
+        bm = best_mode(o)
         if not bm: continue
         score = (o.get("enabled") is True, bm["w"]*bm["h"], bm["preferred"], bm["hz"])
         candidates.append((score, o, bm))
@@ -280,21 +213,16 @@ def pick_best(outputs: List[Dict]):
         raw = ppi / TARGET_PPI
         scale = round_scale(raw)
 
-    cmd = cmd_enable_only(out["name"], bm, scale, outputs)
-    subprocess.run(cmd, check=False)
+    apply(layout_enable_only(out["name"], bm, scale), outputs)
     s = f"{out['name']} {bm['w']}x{bm['h']}@{bm['hz_str']}  scale={scale:.2f}" if scale else f"{out['name']} {bm['w']}x{bm['h']}@{bm['hz_str']}"
     notify("✅ Picked best output", s)
 
 # ------------------ MENU ------------------
-def wofi_select(options: List[str]) -> Optional[str]:
+def wofi_select(options: list[str]) -> str | None:
     """Show a Wofi dmenu and return the selected option, or None."""
     data = "\n".join(options)
-    try:
-        p = subprocess.run(wofi_base, input=data, text=True, capture_output=True, check=False)
-        choice = p.stdout.strip()
-        return choice if choice in options else None
-    except Exception:
-        return None
+    choice = proc.run(wofi_base, timeout=None, input=data).stdout.strip()
+    return choice if choice in options else None
 
 def main():
     options = [
@@ -303,6 +231,7 @@ def main():
         "Mirror display",
         "Extend to the right",
         "Extend to the left",
+        "Extend as grid",
         "Internal only"
     ]
     choice = wofi_select(options)
@@ -311,7 +240,7 @@ def main():
 
     outputs = get_wlr_info()
     if not outputs:
-        notify("❌ wlr-randr returned no outputs")
+        notify("❌ No outputs found")
         return
 
     internal = find_internal_output(outputs)
@@ -324,6 +253,8 @@ def main():
         extend_to_right(outputs, internal)
     elif choice == "Extend to the left":
         extend_to_left(outputs, internal)
+    elif choice == "Extend as grid":
+        extend_grid(outputs, internal)
     elif choice == "Internal only":
         internal_only(outputs, internal)
     elif choice == "Pick best":
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+wlr_output_client.py — zwlr_output_manager_v1 client (wlr-output-management).
+
+Reads heads and modes from the compositor as structured data and applies a
+whole layout in one configuration, instead of forking wlr-randr and parsing
+its human-readable output:
+
+  • get_outputs()   one round trip; the same dicts the scripts used to build
+                    from wlr-randr text (name, desc, make, model, enabled,
+                    phys_mm, pos, scale, modes, index)
+  • apply_layout()  test() first, apply() only if the compositor accepts it;
+                    a configuration cancelled by a concurrent head change is
+                    rebuilt against the new serial and retried once
+  • OutputManager.watch()  stay connected and call back after each `done`
+
+Reads and applies in one process share a single connection (connection()),
+so picking a layout and applying it costs no extra round trips.
+
+A layout is a list of {"name", "mode", "x", "y", "scale"} entries (mode is a
+mode dict, scale may be None); every head not in the list is disabled.
+
+Without pywayland, the protocol bindings or a compositor that offers the
+global, everything falls back to wlr-randr (parse + one apply command); so
+does a read or apply whose connection the compositor dropped.
+
+The protocol bindings are generated once from
+wlr-output-management-unstable-v1.xml (wlr-protocols package) into
+~/.cache/dotfiles-wayland/ when pywayland doesn't ship them.
+
+Usage:
+  wlr_output_client.py            # print outputs as JSON
+  wlr_output_client.py --watch    # print again on every head change
+
+Requires:
+  - pywayland (optional)
+  - wlr-randr (fallback)
+"""
+
+import atexit
+import importlib
+import json
+import os
+import re
+import shutil
+import sys
+from collections.abc import Callable
+
+from mode_index import ModeIndex
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import proc, trace
+
+PROTOCOL = "wlr_output_management_unstable_v1"
+PROTOCOL_XML = "wlr-output-management-unstable-v1.xml"
+PROTOCOL_XML_DIRS = ("/usr/share/wlr-protocols/unstable", "/usr/local/share/wlr-protocols/unstable")
+PROTOCOL_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                              "dotfiles-wayland")
+MANAGER_VERSION = 4
+WLR_RANDR_TIMEOUT_S = 10   # a modeset through wlr-randr waits on the compositor
+
+# ---------- wlr-randr fallback -------------------------------------------- #
+
+MODE_RE = re.compile(r'^\s{4}(\d+)x(\d+)\s+px,\s+([\d.]+)\s+Hz(?:\s+\((.*?)\))?\s*$')
+OUT_RE  = re.compile(r'^(\S+)\s+"([^"]*)"')
+MM_RE   = re.compile(r'^\s+Physical size:\s+(\d+)x(\d+)\s+mm')
+EN_RE   = re.compile(r'^\s+Enabled:\s+(yes|no)')
+MAKE_RE = re.compile(r'^\s+Make:\s+(.*)')
+MODEL_RE= re.compile(r'^\s+Model:\s+(.*)')
+SERIAL_RE=re.compile(r'^\s+Serial:\s+(.*)')
+POS_RE  = re.compile(r'^\s+Position:\s+(-?\d+),(-?\d+)')
+SCALE_RE= re.compile(r'^\s+Scale:\s+([\d.]+)')
+
+
+class Unavailable(RuntimeError):
+    """Neither the protocol nor wlr-randr could be used."""
+
+
+def run_wlr_randr(args: list[str] | None = None) -> str:
+    exe = shutil.which("wlr-randr")
+    if not exe:
+        raise Unavailable("wlr-randr not found")
+    cp = proc.run([exe, *(args or [])], timeout=WLR_RANDR_TIMEOUT_S, stderr=True)
+    if cp.timed_out:
+        raise Unavailable(f"wlr-randr: no answer after {WLR_RANDR_TIMEOUT_S}s")
+    if not cp.ok:
+        raise Unavailable(cp.stderr.strip() or cp.stdout.strip() or f"wlr-randr: exit {cp.returncode}")
+    return cp.stdout
+
+
+def parse_outputs(text: str) -> list[dict]:
+    outputs: list[dict] = []
+    cur: dict | None = None
+    in_modes = False
+
+    for line in text.splitlines():
+        m_out = OUT_RE.match(line)
+        if m_out:
+            if cur:
+                outputs.append(cur)
+            cur = new_output(m_out.group(1), m_out.group(2))
+            in_modes = False
+            continue
+
+        if cur is None:
+            continue
+
+        if line.strip() == "Modes:":
+            in_modes = True
+            continue
+
+        if in_modes:
+            m_mode = MODE_RE.match(line)
+            if m_mode:
+                flags = (m_mode.group(4) or "").lower()
+                cur["modes"].append({
+                    "w": int(m_mode.group(1)), "h": int(m_mode.group(2)),
+                    "hz": float(m_mode.group(3)), "hz_str": m_mode.group(3),
+                    "preferred": "preferred" in flags,
+                    "current": "current" in flags,
+                })
+                continue
+            else:
+                in_modes = False
+
+        m_mm = MM_RE.match(line)
+        if m_mm:
+            cur["phys_mm"] = (int(m_mm.group(1)), int(m_mm.group(2)))
+            continue
+
+        m_pos = POS_RE.match(line)
+        if m_pos:
+            cur["pos"] = (int(m_pos.group(1)), int(m_pos.group(2)))
+            continue
+
+        m_en = EN_RE.match(line)
+        if m_en:
+            cur["enabled"] = (m_en.group(1) == "yes")
+            continue
+
+        m_make = MAKE_RE.match(line)
+        if m_make:
+            cur["make"] = m_make.group(1).strip()
+            continue
+
+        m_model = MODEL_RE.match(line)
+        if m_model:
+            cur["model"] = m_model.group(1).strip()
+            continue
+
+        m_serial = SERIAL_RE.match(line)
+        if m_serial:
+            cur["serial"] = m_serial.group(1).strip() or None
+            continue
+
+        m_scale = SCALE_RE.match(line)
+        if m_scale:
+            cur["scale"] = float(m_scale.group(1))
+            continue
+
+    if cur:
+        outputs.append(cur)
+    for o in outputs:
+        o["index"] = ModeIndex(o["modes"])
+    return outputs
+
+
+def new_output(name: str, desc: str) -> dict:
+    return {
+        "name": name, "desc": desc,
+        "make": None, "model": None, "serial": None,
+        "enabled": None,
+        "phys_mm": (None, None),
+        "pos": (0, 0), "scale": 1.0,
+        "modes": [],  # dicts {w,h,hz,hz_str,preferred,current}
+    }
+
+
+def wlr_randr_args(layout: list[dict], outputs: list[dict]) -> list[str]:
+    """The equivalent wlr-randr command (for the fallback and for display)."""
+    args = ["wlr-randr"]
+    used = set()
+    for p in layout:
+        m = p["mode"]
+        used.add(p["name"])
+        args += ["--output", p["name"], "--on", "--mode", f"{m['w']}x{m['h']}@{m['hz_str']}",
+                 "--pos", f"{p.get('x', 0)},{p.get('y', 0)}"]
+        if p.get("scale"):
+            args += ["--scale", f"{p['scale']:.3f}"]
+    for o in outputs:
+        if o["name"] not in used:
+            args += ["--output", o["name"], "--off"]
+    return args
+
+
+# ---------- protocol bindings --------------------------------------------- #
+
+def _find_xml() -> str | None:
+    for d in PROTOCOL_XML_DIRS:
+        path = os.path.join(d, PROTOCOL_XML)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_protocol():
+    """The generated protocol module; raises ImportError when it can't be had."""
+    try:
+        return importlib.import_module(f"pywayland.protocol.{PROTOCOL}")
+    except ImportError:
+        pass
+
+    path = os.path.join(PROTOCOL_CACHE, f"{PROTOCOL}.py")
+    if not os.path.isfile(path):
+        from pywayland.scanner import Protocol
+        xml = _find_xml()
+        if xml is None:
+            raise ImportError(f"{PROTOCOL_XML} not found (install wlr-protocols)")
+        proto = Protocol.parse_file(xml)
+        os.makedirs(PROTOCOL_CACHE, exist_ok=True)
+        proto.output(PROTOCOL_CACHE, {i.name: proto.name for i in proto.interface})
+    if PROTOCOL_CACHE not in sys.path:
+        sys.path.insert(0, PROTOCOL_CACHE)
+    return importlib.import_module(PROTOCOL)
+
+
+# ---------- native client ------------------------------------------------- #
+
+HEAD_EVENTS = ("name", "description", "physical_size", "mode", "enabled", "current_mode",
+               "position", "transform", "scale", "finished", "make", "model",
+               "serial_number", "adaptive_sync")
+
+
+class OutputManager:
+    """One connection to the compositor's output manager global."""
+
+    def __init__(self, display_name: str | None = None):
+        try:
+            from pywayland.client import Display
+            self.proto = load_protocol()
+            self.display = Display(display_name)
+            self.display.connect()
+        except Exception as e:  # no pywayland / bindings / compositor
+            raise Unavailable(str(e)) from e
+
+        self.manager = None
+        self.serial: int | None = None
+        self.heads: dict[object, dict] = {}   # head proxy → state (modes keyed by mode proxy)
+
+        try:
+            registry = self.display.get_registry()
+            registry.dispatcher["global"] = self._on_global
+            self.display.roundtrip()
+            if self.manager is None:
+                self.close()
+                raise Unavailable("compositor does not offer zwlr_output_manager_v1")
+            while self.serial is None:
+                self._dispatch()
+        except ConnectionError as e:  # compositor went away mid-handshake
+            self.display.disconnect()
+            raise Unavailable(str(e)) from e
+
+    def close(self) -> None:
+        if self.manager is not None:
+            self.manager.stop()
+            self.display.flush()
+            self.manager = None
+        self.heads.clear()
+        self.display.disconnect()
+
+    def _dispatch(self) -> None:
+        self.display.flush()
+        if self.display.dispatch(block=True) == -1:
+            raise ConnectionError("lost connection to the compositor")
+
+    # --- events ---
+
+    def _on_global(self, registry, name, interface, version):
+        if interface == self.proto.ZwlrOutputManagerV1.name:
+            self.manager = registry.bind(name, self.proto.ZwlrOutputManagerV1,
+                                         min(version, MANAGER_VERSION))
+            self.manager.dispatcher["head"] = self._on_head
+            self.manager.dispatcher["done"] = self._on_done
+            self.manager.dispatcher["finished"] = self._on_finished
+
+    def _on_done(self, _manager, serial):
+        self.serial = serial
+
+    def _on_finished(self, _manager):
+        self.manager = None
+
+    def _on_head(self, _manager, head):
+        state = {"name": "", "desc": "", "make": None, "model": None, "serial": None,
+                 "enabled": False, "phys_mm": (None, None), "pos": (0, 0), "scale": 1.0,
+                 "transform": 0, "modes": {}, "current": None}
+        self.heads[head] = state
+
+        def on(event):
+            def handler(_head, *args):
+                self._head_event(head, state, event, args)
+            return handler
+
+        for event in HEAD_EVENTS:
+            head.dispatcher[event] = on(event)
+
+    def _head_event(self, head, state, event, args):
+        if event == "mode":
+            mode = args[0]
+            mstate = {"w": 0, "h": 0, "refresh": 0, "preferred": False}
+            state["modes"][mode] = mstate
+            mode.dispatcher["size"] = lambda _m, w, h: mstate.update(w=w, h=h)
+            mode.dispatcher["refresh"] = lambda _m, mhz: mstate.update(refresh=mhz)
+            mode.dispatcher["preferred"] = lambda _m: mstate.update(preferred=True)
+            mode.dispatcher["finished"] = lambda _m: state["modes"].pop(mode, None)
+        elif event == "current_mode":
+            state["current"] = args[0]
+        elif event == "finished":
+            self.heads.pop(head, None)
+        elif event == "description":
+            state["desc"] = args[0]
+        elif event == "serial_number":
+            state["serial"] = args[0]
+        elif event == "physical_size":
+            state["phys_mm"] = (args[0] or None, args[1] or None)
+        elif event == "position":
+            state["pos"] = (args[0], args[1])
+        elif event == "enabled":
+            state["enabled"] = bool(args[0])
+        elif event in ("name", "make", "model", "scale", "transform"):
+            state[event] = args[0]
+
+    # --- queries ---
+
+    def outputs(self) -> list[dict]:
+        outputs = []
+        for state in self.heads.values():
+            o = new_output(state["name"], state["desc"])
+            for key in ("make", "model", "serial", "enabled", "phys_mm", "pos", "scale"):
+                o[key] = state[key]
+            for proxy, m in state["modes"].items():
+                hz = m["refresh"] / 1000.0
+                o["modes"].append({
+                    "w": m["w"], "h": m["h"], "hz": hz, "hz_str": f"{hz:.6f}",
+                    "preferred": m["preferred"],
+                    "current": state["enabled"] and proxy is state["current"],
+                })
+            o["index"] = ModeIndex(o["modes"])
+            outputs.append(o)
+        return outputs
+
+    def watch(self, callback: Callable[[list[dict]], None]) -> None:
+        """Call back with fresh outputs after every change, until the connection drops."""
+        while self.manager is not None:
+            serial = self.serial
+            self._dispatch()
+            if self.serial != serial:
+                callback(self.outputs())
+
+    # --- configuration ---
+
+    def _mode_proxy(self, state: dict, mode: dict):
+        best = None
+        for proxy, m in state["modes"].items():
+            if (m["w"], m["h"]) != (mode["w"], mode["h"]):
+                continue
+            diff = abs(m["refresh"] / 1000.0 - mode["hz"])
+            if best is None or diff < best[0]:
+                best = (diff, proxy)
+        return best[1] if best and best[0] < 0.01 else None
+
+    def _run(self, layout: dict[str, dict], request: str) -> str:
+        config = self.manager.create_configuration(self.serial)
+        result = []
+        for event in ("succeeded", "failed", "cancelled"):
+            config.dispatcher[event] = lambda _c, event=event: result.append(event)
+
+        for head, state in self.heads.items():
+            p = layout.get(state["name"])
+            if p is None:
+                config.disable_head(head)
+                continue
+            ch = config.enable_head(head)
+            mode = self._mode_proxy(state, p["mode"])
+            if mode is not None:
+                ch.set_mode(mode)
+            else:
+                ch.set_custom_mode(p["mode"]["w"], p["mode"]["h"], round(p["mode"]["hz"] * 1000))
+            ch.set_position(p.get("x", 0), p.get("y", 0))
+            if p.get("scale"):
+                ch.set_scale(float(p["scale"]))
+
+        with trace.span(f"wlr {request}") as sp:
+            getattr(config, request)()
+            while not result:
+                self._dispatch()
+            sp.args["outcome"] = result[0]
+        config.destroy()
+        return result[0]
+
+    def apply(self, layout: list[dict], test: bool = True) -> bool:
+        by_name = {p["name"]: p for p in layout}
+        for _attempt in range(2):
+            serial = self.serial
+            outcome = self._run(by_name, "test") if test else "succeeded"
+            if outcome == "succeeded":
+                outcome = self._run(by_name, "apply")
+            if outcome != "cancelled":
+                return outcome == "succeeded"
+            # Heads changed under us: wait for the new serial, then rebuild
+            while self.serial == serial:
+                self._dispatch()
+        return False
+
+
+# ---------- entry points -------------------------------------------------- #
+
+_connection: OutputManager | None = None
+
+
+def connection() -> OutputManager:
+    """The process-wide connection; reads and applies share it (raises Unavailable)."""
+    global _connection
+    if _connection is None:
+        _connection = OutputManager()
+        atexit.register(_connection.close)
+    return _connection
+
+
+def _drop_connection() -> None:
+    """Forget a connection the compositor closed; the next call reconnects."""
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+        _connection = None
+
+
+def get_outputs() -> list[dict]:
+    """Current heads via the protocol, else parsed from wlr-randr (raises Unavailable)."""
+    with trace.span("read outputs") as sp:
+        try:
+            return connection().outputs()
+        except ConnectionError:
+            _drop_connection()
+        except Unavailable:
+            pass
+        sp.args["via"] = "wlr-randr"
+        return parse_outputs(run_wlr_randr())
+
+
+def apply_layout(layout: list[dict], outputs: list[dict]) -> bool:
+    """Enable exactly the heads in `layout`; test first, then apply."""
+    with trace.span("apply", heads=[p["name"] for p in layout]):
+        try:
+            return connection().apply(layout)
+        except ConnectionError:
+            _drop_connection()
+        except Unavailable:
+            pass
+        try:
+            run_wlr_randr(wlr_randr_args(layout, outputs)[1:])
+            return True
+        except Unavailable as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False
+
+
+def _printable(outputs: list[dict]) -> str:
+    return json.dumps([{k: v for k, v in o.items() if k != "index"} for o in outputs], indent=2)
+
+
+def main(argv: list[str]) -> int:
+    if "--watch" in argv:
+        try:
+            om = connection()
+        except Unavailable as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        try:
+            print(_printable(om.outputs()), flush=True)
+            om.watch(lambda outputs: print(_printable(outputs), flush=True))
+        except ConnectionError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        return 0
+    try:
+        print(_printable(get_outputs()))
+    except Unavailable as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        sys.exit(0)
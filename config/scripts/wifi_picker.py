@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+wifi_picker.py — pick a Wi-Fi network from rofi or wofi and connect to it.
+
+The menu opens at once with the networks seen last time (dotlib.menu);
+`nmcli … --rescan yes` runs behind it and, on rofi, its results are
+streamed into the open menu.
+
+Usage:
+  wifi_picker.py            # rofi (X11)
+  wifi_picker.py --wofi     # wofi (Wayland)
+"""
+
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from dotlib import menu, proc
+
+PROMPT = "Wi-Fi SSID"
+ROFI_CONF = os.path.expanduser("~/.config/rofi/wifi.rasi")
+WOFI_CONF = os.path.expanduser("~/.config/wofi/apps.config")
+WOFI_STYLE = os.path.expanduser("~/.config/wofi/dark.css")
+
+OPEN_SECURITY = ("", "--", "open", "none")
+
+SCAN_TIMEOUT_S = 15.0      # --rescan yes waits for the radio
+CONNECT_TIMEOUT_S = 45.0   # association + DHCP
+
+ICON_WIFI = ""     # fa-wifi
+ICON_IN_USE = "🟢"
+
+
+def menu_cmd(use_wofi: bool) -> list[str]:
+    if not use_wofi:
+        return ["rofi", "-dmenu", "-p", PROMPT, "-config", ROFI_CONF]
+    cmd = ["wofi", "--show", "dmenu", "--prompt", PROMPT, "--insensitive", "--hide-scroll"]
+    if os.path.isfile(WOFI_CONF):
+        cmd += ["--conf", WOFI_CONF]
+    if os.path.isfile(WOFI_STYLE):
+        cmd += ["--style", WOFI_STYLE]
+    return cmd
+
+
+def _split_terse(line: str) -> list[str]:
+    """Split an `nmcli -t` line on unescaped colons."""
+    return [f.replace("\\:", ":") for f in re.split(r"(?<!\\):", line)]
+
+
+def scan() -> list[tuple[str, list[str]]]:
+    """(label, [ssid, security]) per visible network; slow, runs behind the menu."""
+    p = proc.run(["nmcli", "-t", "-f", "IN-USE,SSID,SECURITY,SIGNAL", "dev", "wifi", "list", "--rescan", "yes"],
+                 timeout=SCAN_TIMEOUT_S)
+    entries = []
+    seen = set()
+    for line in p.stdout.splitlines():
+        fields = _split_terse(line)
+        if len(fields) < 4:
+            continue
+        inuse, ssid, security, signal = fields[:4]
+        # Skip empty SSIDs (hidden networks) and repeats from other BSSIDs
+        if not ssid.strip() or ssid in seen:
+            continue
+        seen.add(ssid)
+        security = security or "--"
+        lock = "🌐" if security.lower() in OPEN_SECURITY else "🔒"
+        icon = ICON_IN_USE if inuse == "*" else ICON_WIFI
+        signal = signal.split(".")[0] if signal.split(".")[0].isdigit() else "0"
+        entries.append((f"{icon}  [{lock} {signal}%]\t{ssid}", [ssid, security]))
+    return entries
+
+
+def connect(ssid: str, security: str) -> int:
+    # If we already have a saved connection for this SSID, bring it up.
+    saved = proc.output(["nmcli", "-t", "-f", "NAME", "connection", "show"]).splitlines()
+    if ssid in saved:
+        cmd = ["nmcli", "connection", "up", "id", ssid]
+    else:
+        cmd = ["nmcli", "dev", "wifi", "connect", ssid]
+        if security.lower() not in OPEN_SECURITY:
+            cmd.append("--ask")   # secrets via the NM agent
+    r = proc.run(cmd, timeout=CONNECT_TIMEOUT_S, capture=False)
+    if r.timed_out:
+        print(f"nmcli gave up after {CONNECT_TIMEOUT_S:.0f}s: {ssid}", file=sys.stderr)
+    return 1 if r.returncode is None else r.returncode
+
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Wi-Fi network picker")
+    parser.add_argument("--wofi", action="store_true", help="use wofi instead of rofi")
+    args = parser.parse_args()
+
+    choice = menu.pick("wifi", scan, menu_cmd(args.wofi), stream=not args.wofi,
+                       empty="No visible (broadcast) SSIDs found.")
+    if not choice:
+        return 0
+    ssid, security = choice
+    return connect(ssid, security)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
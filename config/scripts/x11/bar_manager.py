@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+bar_manager.py — one polybar per monitor, kept in step with RandR events.
+
+Replaces the killall/pgrep/sleep relaunch in polybar/launch.sh and the
+`polybar-msg cmd restart` calls after every layout change. The manager
+listens for RandR screen/CRTC/output change notifications and, once a
+burst of them settles, diffs the active monitors against the running bars:
+
+  • monitor appeared       → spawn `polybar <bar>` with MONITOR=<name>
+                             (and TRAY="spacer tray" on the primary output)
+  • monitor disappeared    → SIGTERM that bar only, wait on its pidfd
+  • geometry changed       → restart that bar in place over polybar IPC
+                             (polybar has no live geometry update)
+  • primary moved          → respawn the two bars whose TRAY changed
+                             (only one bar can own the systray)
+  • unchanged              → untouched (module scripts keep running)
+
+Bar exits are watched with pidfd (no pgrep/sleep polling); a bar that dies
+on its own is respawned, at most once per RESPAWN_DELAY_S.
+
+Only one manager runs per display; starting it again (launch.sh) makes the
+running one re-sync instead.
+
+Usage:
+  bar_manager.py [--bar top]
+
+Requires:
+  - polybar (enable-ipc = true, monitor = ${env:MONITOR:}, modules-right
+    ending in ${env:TRAY:})
+  - python-xlib (without it bars are started once and supervised, but not
+    re-synced on layout changes)
+"""
+
+import fcntl
+import logging
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import proc
+
+SETTLE_S = 0.3            # RandR emits a burst of events per layout change
+STOP_TIMEOUT_S = 3.0
+RESPAWN_DELAY_S = 2.0
+
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/polybar-{os.getuid()}"
+LOCK_FILE = os.path.join(RUNTIME_DIR, f"bar_manager{os.environ.get('DISPLAY', '').replace(':', '-')}.pid")
+
+# polybar ≥ 3.6 IPC: "polyipc" magic, version 0, u32 length, u8 type (0 = command)
+IPC_MAGIC = b"polyipc"
+IPC_VERSION = 0
+IPC_TYPE_CMD = 0
+
+log = logging.getLogger("bar_manager")
+
+Geometry = tuple[int, int, int, int]
+Monitors = tuple[dict[str, Geometry], str | None]   # geometries, primary
+TRAY_MODULES = "spacer tray"
+
+
+# ---------- monitors ------------------------------------------------------ #
+
+def _with_primary(mons: dict[str, Geometry], primary: str | None) -> Monitors:
+    # No primary set: the tray goes to the first monitor RandR lists
+    return mons, primary if primary in mons else next(iter(mons), None)
+
+
+def monitors_xlib(d) -> Monitors:
+    reply = d.screen().root.xrandr_get_monitors(is_active=True)
+    mons, primary = {}, None
+    for m in reply.monitors:
+        name = d.get_atom_name(m.name)
+        mons[name] = (m.x, m.y, m.width_in_pixels, m.height_in_pixels)
+        if m.primary:
+            primary = name
+    return _with_primary(mons, primary)
+
+
+def monitors_xrandr() -> Monitors:
+    out = proc.output(["xrandr", "--listmonitors"])
+    mons, primary = {}, None
+    for line in out.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) < 4:
+            continue
+        try:
+            wh, x, y = parts[2].split("+")
+            w, h = (int(v.split("/")[0]) for v in wh.split("x"))
+            mons[parts[-1]] = (int(x), int(y), w, h)
+        except ValueError:
+            continue
+        if "*" in parts[1]:   # " 0: +*eDP-1 1920/344x1080/193+0+0  eDP-1"
+            primary = parts[-1]
+    return _with_primary(mons, primary)
+
+
+# ---------- polybar IPC --------------------------------------------------- #
+
+def ipc_socket(pid: int) -> str:
+    base = os.path.join(os.environ["XDG_RUNTIME_DIR"], "polybar") if os.environ.get("XDG_RUNTIME_DIR") \
+        else f"/tmp/polybar-{os.getuid()}"
+    return os.path.join(base, f"ipc.{pid}.sock")
+
+
+def ipc_command(pid: int, cmd: str) -> bool:
+    import struct
+    import socket
+    payload = cmd.encode()
+    msg = IPC_MAGIC + struct.pack("<BIB", IPC_VERSION, len(payload), IPC_TYPE_CMD) + payload
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(1.0)
+            s.connect(ipc_socket(pid))
+            s.sendall(msg)
+            s.recv(64)   # status reply; content not needed
+        return True
+    except OSError:
+        return False
+
+
+# ---------- bars ---------------------------------------------------------- #
+
+class Bar:
+    def __init__(self, bar: str, monitor: str, geometry: Geometry, tray: bool = False):
+        self.monitor = monitor
+        self.geometry = geometry
+        self.tray = tray
+        env = dict(os.environ, MONITOR=monitor, TRAY=TRAY_MODULES if tray else "")
+        self.proc = subprocess.Popen(["polybar", bar], env=env, stdin=subprocess.DEVNULL,
+                                     start_new_session=True)
+        self.pidfd = os.pidfd_open(self.proc.pid)
+        self.started = time.monotonic()
+        log.info("Started bar on %s (pid %d)%s", monitor, self.proc.pid, " with the tray" if tray else "")
+
+    def fileno(self) -> int:
+        return self.pidfd
+
+    def reap(self) -> None:
+        self.proc.wait()
+        os.close(self.pidfd)
+
+    def stop(self) -> None:
+        self.proc.terminate()
+        if not select.select([self.pidfd], [], [], STOP_TIMEOUT_S)[0]:
+            log.warning("Bar on %s ignored SIGTERM, killing", self.monitor)
+            self.proc.kill()
+        self.reap()
+        log.info("Stopped bar on %s", self.monitor)
+
+
+class Manager:
+    def __init__(self, bar: str, query):
+        self.bar = bar
+        self.query = query
+        self.bars: dict[str, Bar] = {}
+        self.respawn_at: dict[str, float] = {}
+
+    def sync(self) -> None:
+        want, primary = self.query()
+        for name in [n for n in self.bars if n not in want]:
+            self.bars.pop(name).stop()
+        for name in [n for n in self.respawn_at if n not in want]:
+            del self.respawn_at[name]   # unplugged while waiting to respawn
+        # The environment is fixed at spawn (an IPC restart keeps it), so a
+        # bar that gains or loses the tray is replaced; the old tray owner
+        # goes first so the new one can take the selection
+        for name in sorted((n for n, b in self.bars.items() if b.tray != (n == primary)),
+                           key=lambda n: n == primary):
+            old = self.bars.pop(name)
+            old.stop()
+            self.bars[name] = Bar(self.bar, name, want[name], tray=name == primary)
+        for name, geo in want.items():
+            bar = self.bars.get(name)
+            if bar is None:
+                if time.monotonic() >= self.respawn_at.get(name, 0):
+                    self.respawn_at.pop(name, None)
+                    self.bars[name] = Bar(self.bar, name, geo, tray=name == primary)
+            elif bar.geometry != geo:
+                log.info("Geometry of %s changed %s → %s", name, bar.geometry, geo)
+                bar.geometry = geo
+                if not ipc_command(bar.proc.pid, "restart"):
+                    # No IPC socket: replace just this bar
+                    self.bars.pop(name).stop()
+                    self.bars[name] = Bar(self.bar, name, geo, tray=bar.tray)
+
+    def exited(self, bar: Bar) -> None:
+        bar.reap()
+        if self.bars.get(bar.monitor) is bar:
+            del self.bars[bar.monitor]
+            log.warning("Bar on %s exited (%s); respawning", bar.monitor, bar.proc.returncode)
+            if time.monotonic() - bar.started < RESPAWN_DELAY_S:
+                self.respawn_at[bar.monitor] = time.monotonic() + RESPAWN_DELAY_S
+
+    def next_respawn(self) -> float | None:
+        pending = [t for n, t in self.respawn_at.items() if n not in self.bars]
+        return max(0.0, min(pending) - time.monotonic()) if pending else None
+
+    def stop_all(self) -> None:
+        for name in list(self.bars):
+            self.bars.pop(name).stop()
+
+
+# ---------- single instance ----------------------------------------------- #
+
+def take_lock():
+    """Return the lock fd, or None after poking the manager that holds it."""
+    os.makedirs(RUNTIME_DIR, exist_ok=True)
+    fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        try:
+            os.kill(int(os.read(fd, 32).decode().strip()), signal.SIGUSR1)
+        except (ValueError, OSError):
+            pass
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    return fd
+
+
+# ---------- main loop ----------------------------------------------------- #
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Per-monitor polybar manager")
+    parser.add_argument("--bar", default="top", help="bar section name in config.ini (default: top)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("BAR_MANAGER_LOGLEVEL", "INFO").upper(),
+                        format="%(asctime)s [%(levelname)s] %(message)s", datefmt="%H:%M:%S")
+
+    if take_lock() is None:
+        log.info("Another manager is running; asked it to re-sync")
+        return 0
+
+    # Signals arrive through a pipe so select() wakes up for them
+    rfd, wfd = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+    signal.set_wakeup_fd(wfd)
+    pending = {"resync": False, "stop": False}
+
+    def on_signal(signum, _frame):
+        pending["stop" if signum in (signal.SIGTERM, signal.SIGINT) else "resync"] = True
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1, signal.SIGHUP):
+        signal.signal(sig, on_signal)
+
+    d = None
+    try:
+        from Xlib import display
+        from Xlib.ext import randr
+
+        d = display.Display()
+        d.screen().root.xrandr_select_input(randr.RRScreenChangeNotifyMask
+                                            | randr.RRCrtcChangeNotifyMask
+                                            | randr.RROutputChangeNotifyMask)
+        mgr = Manager(args.bar, lambda: monitors_xlib(d))
+    except Exception as e:  # no python-xlib / no RandR 1.5
+        log.warning("RandR events unavailable (%s); bars won't follow layout changes", e)
+        mgr = Manager(args.bar, monitors_xrandr)
+
+    mgr.sync()
+    try:
+        while not pending["stop"]:
+            watch = [rfd, *mgr.bars.values()]
+            if d is not None:
+                watch.append(d.fileno())
+            ready = select.select(watch, [], [], mgr.next_respawn())[0]
+
+            changed = pending["resync"]
+            pending["resync"] = False
+            for r in ready:
+                if isinstance(r, Bar):
+                    mgr.exited(r)
+                    changed = True
+                elif r == rfd:
+                    os.read(rfd, 64)
+            if d is not None and (d.fileno() in ready or d.pending_events()):
+                # Let the burst settle, then drain it as one change
+                time.sleep(SETTLE_S)
+                while d.pending_events():
+                    d.next_event()
+                changed = True
+            if changed or not ready:
+                mgr.sync()
+    finally:
+        mgr.stop_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,21 @@
 #!/usr/bin/env python3
 
-import subprocess
 import os
 import re
-from typing import List, Tuple
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import menu, notify, proc
+
+BLUETOOTHCTL_TIMEOUT_S = 3.0   # listing / info; bluetoothd can wedge
+CONNECT_TIMEOUT_S = 20.0
 
-def run_cmd(cmd: List[str]) -> subprocess.CompletedProcess:
-    return subprocess.run(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=False,
-    )
 
+def run_cmd(cmd: list[str], timeout: float = BLUETOOTHCTL_TIMEOUT_S) -> proc.Result:
+    return proc.run(cmd, timeout=timeout, stderr=True)
 
-def get_paired_devices() -> List[Tuple[str, str]]:
+
+def get_paired_devices() -> list[tuple[str, str]]:
     """Return list of (mac, name) for paired devices."""
     # Try modern form first
     p = run_cmd(["bluetoothctl", "devices", "Paired"])
@@ -25,7 +24,7 @@ def get_paired_devices() -> List[Tuple[str, str]]:
         # Fallback to older alias
         p = run_cmd(["bluetoothctl", "paired-devices"])
         out = p.stdout.strip()
-    devices: List[Tuple[str, str]] = []
+    devices: list[tuple[str, str]] = []
     for line in out.splitlines():
         # Lines look like: "Device AA:BB:CC:DD:EE:FF Device Name With Spaces"
         line = line.strip()
@@ -113,7 +112,11 @@ def clean_name(name: str) -> str:
 
 def get_device_metadata(mac: str, fallback_name: str) -> tuple[bool, str, str]:
     """Return (connected, symbol, alias) for device by mac."""
-    p = run_cmd(["bluetoothctl", "info", mac])
+    return parse_device_info(run_cmd(["bluetoothctl", "info", mac]), fallback_name)
+
+
+def parse_device_info(p: proc.Result, fallback_name: str) -> tuple[bool, str, str]:
+    """(connected, symbol, alias) from `bluetoothctl info`; a timed-out call gives the plain name."""
     connected = False
     icon_hint = ""
     alias = fallback_name
@@ -131,71 +134,48 @@ def get_device_metadata(mac: str, fallback_name: str) -> tuple[bool, str, str]:
     return connected, symbol, alias
 
 
-def show_rofi(choices: List[Tuple[str, str, bool, str]]) -> str:
-    """Show rofi with pretty choices; return selected MAC or empty string."""
-    # Format: visible text + tab + MAC to extract later
-    lines = []
-    for mac, alias, connected, symbol in choices:
+def list_choices() -> list[tuple[str, str]]:
+    """(pretty label, mac) for every paired device; slow, runs behind the menu."""
+    choices: list[tuple[str, str]] = []
+    devices = get_paired_devices()
+    # One `bluetoothctl info` per device, side by side; a hung one only loses its details
+    infos = proc.run_many([["bluetoothctl", "info", mac] for mac, _ in devices],
+                          timeout=BLUETOOTHCTL_TIMEOUT_S, stderr=True)
+    for (mac, name), info in zip(devices, infos):
+        connected, symbol, alias = parse_device_info(info, name)
         suffix = " 🟢" if connected else ""
-        pretty = f"{symbol} {alias}{suffix}"
-        lines.append(f"{pretty}\t{mac}")
-
-    rofi_cfg = os.path.expanduser("~/.config/rofi/wifi.rasi")
-    rofi_cmd = [
-        "rofi",
-        "-dmenu",
-        "-p",
-        " Bluetooth",
-        "-config",
-        rofi_cfg,
-    ]
-
-    # Invoke rofi
-    p = subprocess.run(
-        rofi_cmd,
-        input="\n".join(lines) + ("\n" if lines else ""),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=False,
-    )
-    selected = p.stdout.strip()
-    if not selected:
-        return ""
-    # Extract MAC from tab-separated column 2
-    mac = selected.split("\t")[1].strip() if "\t" in selected else ""
-    return mac
+        choices.append((f"{symbol} {alias}{suffix}", mac))
+    return choices
 
 
 def main() -> int:
-    devices = get_paired_devices()
-    if not devices:
-        # No paired devices
-        subprocess.run(
-            ["rofi", "-e", "No paired Bluetooth devices found."]
-        )
-        return 0
-
-    # Query connection status and symbol (best-effort)
-    choices: List[Tuple[str, str, bool, str]] = []
-    for mac, name in devices:
-        connected, symbol, alias = get_device_metadata(mac, name)
-        choices.append((mac, alias, connected, symbol))
-
-    mac = show_rofi(choices)
+    # Opens at once with the last known devices; fresh state streams in
+    rofi_cfg = os.path.expanduser("~/.config/rofi/wifi.rasi")
+    mac = menu.pick(
+        "bluetooth",
+        list_choices,
+        ["rofi", "-dmenu", "-p", " Bluetooth", "-config", rofi_cfg],
+        empty="No paired Bluetooth devices found.",
+    )
     if not mac:
         return 0
 
-    # Attempt to connect
-    connect = run_cmd(["bluetoothctl", "connect", mac])
-    if connect.returncode == 0:
+    # Attempt to connect; progress and outcome update one notification bubble
+    name = clean_name(dict(get_paired_devices()).get(mac, mac))
+    notify.send("Bluetooth", f"Connecting to {name}…", tag="bluetooth", icon="bluetooth")
+    connect = run_cmd(["bluetoothctl", "connect", mac], timeout=CONNECT_TIMEOUT_S)
+    if connect.ok:
+        notify.send("Bluetooth", f"Connected to {name}", tag="bluetooth", icon="bluetooth")
         return 0
 
     # If connect failed, show brief error
-    msg = connect.stderr.strip() or connect.stdout.strip() or "Failed to connect"
-    # Keep it short for rofi -e
+    if connect.timed_out:
+        msg = f"No answer from the device within {CONNECT_TIMEOUT_S:.0f}s"
+    else:
+        msg = connect.stderr.strip() or connect.stdout.strip() or "Failed to connect"
+    # Keep it short for the bubble
     msg = (msg[:200] + "…") if len(msg) > 200 else msg
-    subprocess.run(["rofi", "-e", f"Bluetooth: {msg}"])
+    notify.send("Bluetooth", f"{name}: {msg}", tag="bluetooth", icon="bluetooth", urgency=notify.CRITICAL)
     return 1
 
 
@@ -0,0 +1,296 @@
+"""
+display_edid.py — EDID parsing and the output-set fingerprint.
+
+outputs_checksum8() is the key used for saved display layouts, both by
+monitor_layout_menu.py and the native profile store (display_profiles.py).
+"""
+
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import trace
+
+
+def _parse_edid_vendor_model(edid_hex):
+    """Return (vendor, model) parsed from an EDID hex string.
+
+    - `vendor`: 3-letter PNP ID (e.g., 'DEL').
+    - `model`: Monitor name from descriptor 0xFC when available,
+      otherwise ASCII string descriptor 0xFE, otherwise product code.
+    """
+    if not edid_hex:
+        return (None, None)
+    try:
+        if isinstance(edid_hex, (bytes, bytearray)):
+            b = bytes(edid_hex)
+        else:
+            s = re.sub(r"\s+", "", str(edid_hex))
+            b = bytes.fromhex(s)
+    except Exception:
+        return (None, None)
+
+    if len(b) < 128:
+        return (None, None)
+
+    # Manufacturer (PNP ID): 2 bytes big-endian packed as 5-bit letters
+    mfg = (b[8] << 8) | b[9]
+    vendor = "".join(chr(((mfg >> shift) & 0x1F) + 64) for shift in (10, 5, 0))
+
+    # Prefer monitor name (descriptor 0xFC); fallback to ASCII string (0xFE)
+    def _extract_descriptor_text(block):
+        try:
+            text = block[5:18].decode("ascii", errors="ignore")
+            # EDID strings may include 0x0A as terminator; strip padding
+            text = text.split("\x0a")[0].strip().strip("\x00")
+            return text or None
+        except Exception:
+            return None
+
+    model = None
+    for off in (54, 72, 90, 108):
+        if off + 18 <= len(b):
+            desc = b[off : off + 18]
+            if desc[0:3] == b"\x00\x00\x00" and desc[3] == 0xFC:
+                model = _extract_descriptor_text(desc)
+                if model:
+                    break
+
+    if not model:
+        for off in (54, 72, 90, 108):
+            if off + 18 <= len(b):
+                desc = b[off : off + 18]
+                if desc[0:3] == b"\x00\x00\x00" and desc[3] == 0xFE:
+                    model = _extract_descriptor_text(desc)
+                    if model:
+                        break
+
+    if not model:
+        prod_code = b[10] | (b[11] << 8)  # little-endian product code
+        model = f"0x{prod_code:04X}"
+
+    return (vendor, model)
+
+
+def _parse_edid_serial(edid):
+    """Return the monitor serial from an EDID blob, or None.
+
+    Prefers the serial string descriptor (0xFF); falls back to the 32-bit
+    serial number at bytes 12-15 when that is non-zero.
+    """
+    if not edid or len(edid) < 128:
+        return None
+    b = bytes(edid)
+    for off in (54, 72, 90, 108):
+        desc = b[off : off + 18]
+        if desc[0:3] == b"\x00\x00\x00" and desc[3] == 0xFF:
+            text = desc[5:18].decode("ascii", errors="ignore").split("\x0a")[0].strip().strip("\x00")
+            if text:
+                return text
+    num = int.from_bytes(b[12:16], "little")
+    return str(num) if num else None
+
+
+def get_outputs_with_vendor_model():
+    """Return a list of (output, vendor, model) for connected displays."""
+    return [(name, *_parse_edid_vendor_model(edid)) for name, edid in get_connected_edids()]
+
+
+def describe_outputs():
+    """Return [{connector, vendor, model, serial}] for connected displays."""
+    results = []
+    for name, edid in get_connected_edids():
+        vendor, model = _parse_edid_vendor_model(edid)
+        results.append({
+            "connector": name,
+            "vendor": vendor,
+            "model": model,
+            "serial": _parse_edid_serial(edid),
+        })
+    return results
+
+
+EDID_CACHE = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", "display-edid-cache.json")
+EDID_MAX_LONGS = 128          # 512 bytes: base block + 3 extensions
+
+_mem_cache = {}               # (DISPLAY, config_timestamp) -> [(name, edid)]
+
+
+def _cache_key(config_timestamp):
+    return f"{os.environ.get('DISPLAY', '')}@{config_timestamp}"
+
+
+def _load_cached(config_timestamp):
+    key = _cache_key(config_timestamp)
+    if key in _mem_cache:
+        return _mem_cache[key]
+    try:
+        with open(EDID_CACHE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("key") != key:
+            return None
+        results = [(n, bytes.fromhex(h) if h else None) for n, h in data["outputs"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    _mem_cache[key] = results
+    return results
+
+
+def _store_cached(config_timestamp, results):
+    key = _cache_key(config_timestamp)
+    _mem_cache[key] = results
+    try:
+        tmp = f"{EDID_CACHE}.{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "outputs": [[n, e.hex() if e else None] for n, e in results]}, f)
+        os.replace(tmp, EDID_CACHE)
+    except OSError:
+        pass
+
+
+def _randr_edids(d):
+    """Collect (output, edid) over RandR with the requests pipelined.
+
+    Round-trips: GetScreenResourcesCurrent, InternAtom(EDID), then one batch
+    of GetOutputInfo + GetOutputProperty for every output whose replies are
+    read only after all requests are queued. The module-level randr.*
+    helpers block on .reply() per call, so the request classes are built
+    directly with defer=True.
+    """
+    from Xlib import X
+    from Xlib.ext import randr
+
+    root = d.screen().root
+    # Current, not probed: the server re-probes on hotplug anyway and the
+    # config_timestamp it returns is what the cache is keyed by.
+    sres = randr.get_screen_resources_current(root)
+    ts = sres.config_timestamp
+    cached = _load_cached(ts)
+    if cached is not None:
+        return cached
+
+    edid_atom = d.intern_atom("EDID", only_if_exists=True)
+    opcode = d.display.get_extension_major(randr.extname)
+
+    pending = []
+    for output_id in getattr(sres, "outputs", []) or []:
+        info = randr.GetOutputInfo(display=d.display, defer=True, opcode=opcode,
+                                   output=output_id, config_timestamp=ts)
+        prop = None
+        if edid_atom != X.NONE:
+            prop = randr.GetOutputProperty(display=d.display, defer=True, opcode=opcode,
+                                           output=output_id, property=edid_atom,
+                                           type=X.AnyPropertyType, long_offset=0,
+                                           long_length=EDID_MAX_LONGS, delete=False, pending=False)
+        pending.append((info, prop))
+
+    results = []
+    for info, prop in pending:
+        try:
+            info.reply()
+        except Exception:
+            continue
+        if getattr(info, "connection", 2) != 0:
+            continue
+        name = info.name.decode(errors="ignore") if isinstance(info.name, (bytes, bytearray)) else str(info.name)
+
+        edid = None
+        if prop is not None:
+            try:
+                prop.reply()
+                edid = bytes(prop.value) or None
+            except Exception:
+                edid = None
+        results.append((name, edid))
+
+    if results:
+        _store_cached(ts, results)
+    return results
+
+
+def get_connected_edids():
+    """Return a list of (output, edid_bytes) for connected displays.
+
+    Does not call `xrandr`. Prefers python-xlib (RandR, pipelined and cached
+    per config_timestamp). If unavailable, falls back to reading EDID from
+    `/sys/class/drm`.
+    """
+    with trace.span("edid") as sp:
+        results, sp.args["via"] = _connected_edids()
+        sp.args["outputs"] = len(results)
+    return results
+
+
+def _connected_edids():
+    # 1) Try python-xlib
+    try:
+        from Xlib import display as xdisplay
+
+        d = xdisplay.Display()
+        try:
+            results = _randr_edids(d)
+        finally:
+            try:
+                d.close()
+            except Exception:
+                pass
+
+        if results:
+            return results, "randr"
+    except Exception:
+        pass
+
+    # 2) Fallback: read from /sys/class/drm
+    results = []
+    try:
+        import glob
+        for conn_path in glob.glob("/sys/class/drm/card*-*"):
+            base = os.path.basename(conn_path)
+            if "-" not in base:
+                continue
+            name_part = base.split("-", 1)[1]
+            name = name_part.replace("HDMI-A-", "HDMI-")
+
+            try:
+                with open(os.path.join(conn_path, "status"), "r", encoding="utf-8", errors="ignore") as f:
+                    status = f.read().strip().lower()
+                if status != "connected":
+                    continue
+            except Exception:
+                continue
+
+            edid_bytes = None
+            try:
+                with open(os.path.join(conn_path, "edid"), "rb") as f:
+                    data = f.read()
+                    edid_bytes = data if data else None
+            except Exception:
+                edid_bytes = None
+
+            results.append((name, edid_bytes))
+    except Exception:
+        pass
+
+    return results, "sysfs"
+
+
+def outputs_checksum8(outputs):
+    """Return an 8-char, lowercase checksum for a list of outputs.
+
+    Accepts list items as tuples like (name, vendor, model) or strings.
+    Sorts entries to make the checksum order-independent.
+    """
+    items = []
+    for o in outputs:
+        if isinstance(o, (list, tuple)) and len(o) >= 3:
+            name, vendor, model = o[0], o[1] or "", o[2] or ""
+            items.append(f"{vendor}|{model}|{name}".lower())
+        else:
+            items.append(str(o).lower())
+    items.sort()
+    import hashlib
+
+    digest = hashlib.sha256("\n".join(items).encode("utf-8")).hexdigest()
+    return digest[:8]
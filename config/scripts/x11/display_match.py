@@ -0,0 +1,204 @@
+"""
+display_match.py — scored nearest-profile matching for unseen monitor sets.
+
+outputs_checksum8() only matches an identical set of displays. When one new
+projector joins a known desk setup, this finds the stored profile that is
+closest and adapts its layout to the monitors actually connected.
+
+Each monitor is described by {connector, vendor, model, serial, phys_mm,
+native, modes}. A pair of monitors scores on:
+
+  same vendor/model/serial   10
+  same vendor/model           6
+  same physical size          2   (±5 mm)
+  same native mode            2
+  same connector              1
+
+A profile's score is the sum over a greedy one-to-one pairing, minus one per
+monitor left unpaired on either side.
+
+An inverted index (feature token → profile names) means only profiles that
+share an identifying feature with the connected monitors are scored; tokens
+every profile carries (the built-in panel) are ignored while a rarer one
+matches. The index keeps each profile's monitor descriptors, so scoring
+never touches the profile files and only the winner is read from disk.
+"""
+
+
+SIZE_TOL_MM = 5
+MIN_SCORE = 6            # need at least one vendor/model hit to trust a match
+
+W_SERIAL, W_MODEL, W_SIZE, W_NATIVE, W_CONNECTOR = 10, 6, 2, 2, 1
+
+
+# ---------- features ------------------------------------------------------ #
+
+def _model_key(mon: dict) -> str | None:
+    if not mon.get("vendor") and not mon.get("model"):
+        return None
+    return f"{mon.get('vendor') or ''}|{mon.get('model') or ''}".lower()
+
+
+def tokens(mon: dict) -> list[str]:
+    """Identifying tokens used for candidate lookup (connector alone is too common)."""
+    out = []
+    mk = _model_key(mon)
+    if mk:
+        out.append(f"model:{mk}")
+        if mon.get("serial"):
+            out.append(f"edid:{mk}|{mon['serial']}")
+    if mon.get("native") and mon.get("phys_mm"):
+        w, h = mon["phys_mm"]
+        out.append(f"panel:{mon['native']}@{w // 10}x{h // 10}")
+    return out
+
+
+class FeatureIndex:
+    """token → set(profile name), plus each profile's monitor descriptors so
+    candidates are scored without reading their profile files."""
+
+    def __init__(self, features: dict[str, dict[str, dict]] | None = None):
+        self.by_token: dict[str, set[str]] = {}
+        self.by_name: dict[str, list[str]] = {}
+        self.monitors: dict[str, dict[str, dict]] = {}
+        for name, monitors in (features or {}).items():
+            self.add(name, monitors)
+
+    def add(self, name: str, monitors: dict[str, dict]) -> None:
+        self.remove(name)
+        self.monitors[name] = monitors
+        toks = sorted({t for mon in monitors.values() for t in tokens(mon)})
+        self.by_name[name] = toks
+        for t in toks:
+            self.by_token.setdefault(t, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        self.monitors.pop(name, None)
+        for t in self.by_name.pop(name, []):
+            names = self.by_token.get(t)
+            if names:
+                names.discard(name)
+                if not names:
+                    del self.by_token[t]
+
+    def candidates(self, monitors: list[dict]) -> set[str]:
+        """Profiles sharing a discriminating token with the monitors. A token
+        every profile has (the laptop's own panel) only counts when nothing
+        rarer matched."""
+        found: set[str] = set()
+        common: set[str] = set()
+        for mon in monitors:
+            for t in tokens(mon):
+                names = self.by_token.get(t, set())
+                if len(self.by_name) > 1 and len(names) == len(self.by_name):
+                    common |= names
+                else:
+                    found |= names
+        return found or common
+
+    def to_json(self) -> dict[str, dict[str, dict]]:
+        return self.monitors
+
+
+# ---------- scoring ------------------------------------------------------- #
+
+def pair_score(a: dict, b: dict) -> int:
+    score = 0
+    mk_a, mk_b = _model_key(a), _model_key(b)
+    if mk_a and mk_a == mk_b:
+        score += W_SERIAL if a.get("serial") and a.get("serial") == b.get("serial") else W_MODEL
+    pa, pb = a.get("phys_mm"), b.get("phys_mm")
+    if pa and pb and all(x and y for x, y in zip(pa, pb)):
+        if abs(pa[0] - pb[0]) <= SIZE_TOL_MM and abs(pa[1] - pb[1]) <= SIZE_TOL_MM:
+            score += W_SIZE
+    if a.get("native") and a.get("native") == b.get("native"):
+        score += W_NATIVE
+    if a.get("connector") and a.get("connector") == b.get("connector"):
+        score += W_CONNECTOR
+    return score
+
+
+def match_profile(monitors: list[dict], profile: dict) -> tuple[int, dict[str, str]]:
+    """Greedy one-to-one pairing; returns (score, {new connector: profile connector})."""
+    stored = profile.get("monitors") or {}
+    pairs = []
+    for mon in monitors:
+        for pconn, pmon in stored.items():
+            s = pair_score(mon, dict(pmon, connector=pconn))
+            if s > 0:
+                pairs.append((s, mon["connector"], pconn))
+    pairs.sort(reverse=True)
+
+    mapping: dict[str, str] = {}
+    used: set[str] = set()
+    total = 0
+    for s, conn, pconn in pairs:
+        if conn in mapping or pconn in used:
+            continue
+        mapping[conn] = pconn
+        used.add(pconn)
+        total += s
+    total -= (len(monitors) - len(mapping)) + (len(stored) - len(used))
+    return total, mapping
+
+
+def best_match(index: FeatureIndex, load, monitors: list[dict]) -> tuple[dict, dict[str, str], int] | None:
+    """Score indexed candidates from their descriptors; only the winner is
+    read with `load(name)`."""
+    scored = []
+    for name in sorted(index.candidates(monitors)):
+        score, mapping = match_profile(monitors, {"monitors": index.monitors[name]})
+        if score >= MIN_SCORE:
+            scored.append((-score, name, mapping))
+    for neg_score, name, mapping in sorted(scored, key=lambda x: (x[0], x[1])):
+        profile = load(name)
+        if profile:
+            return profile, mapping, -neg_score
+    return None
+
+
+# ---------- adaptation ---------------------------------------------------- #
+
+def _extent(o: dict) -> int:
+    """Right edge of an enabled output in a profile."""
+    x = int((o.get("pos") or "0x0").split("x")[0])
+    w, h = (int(v) for v in o["mode"].split("x"))
+    return x + (h if o.get("rotate") in ("left", "right") else w)
+
+
+def adapt(profile: dict, mapping: dict[str, str], monitors: list[dict]) -> dict:
+    """Re-key the matched layout onto the new connectors; extend unmatched monitors to the right."""
+    stored = profile["outputs"]
+    outputs: dict[str, dict] = {}
+    for mon in monitors:
+        pconn = mapping.get(mon["connector"])
+        if pconn is None or pconn not in stored:
+            continue
+        o = dict(stored[pconn])
+        if o.get("enabled") and o.get("mode") not in (mon.get("modes") or [o.get("mode")]):
+            if not mon.get("native"):
+                continue
+            o["mode"], o["rate"] = mon["native"], None
+        outputs[mon["connector"]] = o
+
+    right = max((_extent(o) for o in outputs.values() if o.get("enabled") and o.get("mode")), default=0)
+    for mon in monitors:
+        if mon["connector"] in outputs or not mon.get("native"):
+            continue
+        outputs[mon["connector"]] = {
+            "enabled": True, "mode": mon["native"], "rate": None,
+            "pos": f"{right}x0", "rotate": "normal", "primary": False,
+        }
+        right += int(mon["native"].split("x")[0])
+
+    if outputs and not any(o.get("primary") for o in outputs.values()):
+        first = next((o for o in outputs.values() if o.get("enabled")), None)
+        if first:
+            first["primary"] = True
+
+    return {
+        "name": f"~{profile['name']}",
+        "fingerprint": None,
+        "outputs": outputs,
+        "adapted_from": profile["name"],
+    }
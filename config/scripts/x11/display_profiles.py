@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+display_profiles.py — native display layout store (replaces autorandr calls).
+
+Profiles are keyed by the same outputs_checksum8() fingerprint that
+monitor_layout_menu.py has always used for "Save current layout". An index
+file maps fingerprint → profile name, so auto-detect is a single dict lookup
+no matter how many conference-room setups accumulate.
+
+Everything runs in-process: one `xrandr --query` to read the current state,
+one `xrandr` call to apply a layout. The autorandr postswitch hook is still
+run after a switch so the bar/wallpaper/notification behave as before.
+
+Layout on disk ($XDG_CONFIG_HOME/display-profiles):
+  index.json            {"<fingerprint>": "<profile name>", ...}
+  features.json         {"<profile name>": {"<connector>": <monitor descriptor>, ...}}
+  profiles/<name>.json  {"name", "fingerprint", "outputs": {...}, "monitors": {...}}
+
+Refresh rates follow the AC/battery policy (dotlib/power.py): on battery a
+rate above the cap is lowered, an unset one becomes the highest allowed.
+
+When no profile matches exactly, display_match.py scores the stored
+profiles against the connected monitors (vendor/model/serial, size, native
+mode, connector) and applies the closest one, adapted to the new set.
+
+Named autorandr profiles (~/.config/autorandr/<name>/) are imported on first
+use, so existing "laptop" / "horizontal-reverse" setups keep working.
+autorandr's virtual profiles ("common", "horizontal", "vertical") are never
+written to disk; they are built from the current xrandr state instead.
+
+Usage:
+  display_profiles.py save [NAME]   # default NAME = current fingerprint
+  display_profiles.py load NAME     # also common / horizontal / vertical
+  display_profiles.py auto          # exact match, else the closest stored profile
+  display_profiles.py refresh       # re-apply under the refresh cap (power source changed)
+  display_profiles.py list
+"""
+
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import proc
+from dotlib.power import HZ_SLOP, RefreshPolicy
+import display_match
+from display_edid import (_parse_edid_serial, _parse_edid_vendor_model, describe_outputs,
+                          get_outputs_with_vendor_model, outputs_checksum8)
+
+CONFIG_HOME = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
+STORE_DIR = os.path.join(CONFIG_HOME, "display-profiles")
+AUTORANDR_DIR = os.path.join(CONFIG_HOME, "autorandr")
+POSTSWITCH = os.path.join(AUTORANDR_DIR, "postswitch")
+
+QUERY_TIMEOUT_S = 5
+APPLY_TIMEOUT_S = 15
+POSTSWITCH_TIMEOUT_S = 30
+
+HEAD_RE = re.compile(
+    r"^(\S+) (connected|disconnected)( primary)?"
+    r"(?: (\d+)x(\d+)\+(\d+)\+(\d+))?"
+    r"(?: (normal|left|inverted|right))?"
+)
+PHYS_RE = re.compile(r"(\d+)mm x (\d+)mm\s*$")
+MODE_RE = re.compile(r"^\s+(\d+x\d+)\S*\s+(.*)$")
+RATE_RE = re.compile(r"(\d+\.\d+)(\*?) ?(\+?)")   # "60.00*+", "60.00 +" (preferred, not current)
+
+
+# ---------- current state (one xrandr call) ------------------------------- #
+
+def query_layout() -> dict[str, dict]:
+    """Parse `xrandr --query` into {output: {connected, enabled, mode, rate, pos,
+    rotate, primary, phys_mm, preferred, modes, rates}}; rates maps mode → Hz list."""
+    text = proc.run(["xrandr", "--query"], timeout=QUERY_TIMEOUT_S).stdout
+    outputs: dict[str, dict] = {}
+    cur: dict | None = None
+    for line in text.splitlines():
+        m = HEAD_RE.match(line)
+        if m:
+            name, state, primary, w, h, x, y, rot = m.groups()
+            cur = {
+                "connected": state == "connected",
+                "enabled": w is not None,
+                "primary": bool(primary),
+                "pos": f"{x}x{y}" if x is not None else None,
+                "rotate": rot or "normal",
+                "mode": None,
+                "rate": None,
+                "phys_mm": None,
+                "preferred": None,
+                "modes": [],
+                "rates": {},
+            }
+            pm = PHYS_RE.search(line)
+            if pm and pm.group(1) != "0":
+                cur["phys_mm"] = [int(pm.group(1)), int(pm.group(2))]
+            outputs[name] = cur
+            continue
+        if cur is None:
+            continue
+        mm = MODE_RE.match(line)
+        if not mm:
+            continue
+        cur["modes"].append(mm.group(1))
+        found = RATE_RE.findall(mm.group(2))
+        cur["rates"].setdefault(mm.group(1), []).extend(float(r) for r, _, _ in found)
+        for rate, active, pref in found:
+            if active:
+                cur["mode"], cur["rate"] = mm.group(1), rate
+            if pref and not cur["preferred"]:
+                cur["preferred"] = mm.group(1)
+    return outputs
+
+
+def snapshot(layout: dict[str, dict]) -> dict[str, dict]:
+    """Reduce a queried layout to what a profile stores (connected outputs only)."""
+    out = {}
+    for name, o in layout.items():
+        if not o["connected"]:
+            continue
+        if not o["enabled"] or not o["mode"]:
+            out[name] = {"enabled": False}
+            continue
+        out[name] = {k: o[k] for k in ("mode", "rate", "pos", "rotate", "primary")}
+        out[name]["enabled"] = True
+    return out
+
+
+def build_cmd(profile_outputs: dict[str, dict], present: list[str]) -> list[str]:
+    """One xrandr invocation; every present output not enabled by the profile is switched off."""
+    args = ["xrandr"]
+    for name in present:
+        o = profile_outputs.get(name)
+        if not o or not o.get("enabled"):
+            args += ["--output", name, "--off"]
+            continue
+        args += ["--output", name, "--mode", o["mode"]]
+        if o.get("rate"):
+            args += ["--rate", o["rate"]]
+        args += ["--pos", o.get("pos") or "0x0", "--rotate", o.get("rotate") or "normal"]
+        if o.get("primary"):
+            args.append("--primary")
+    return args
+
+
+# ---------- autorandr import ---------------------------------------------- #
+
+def read_autorandr(name: str) -> dict | None:
+    """Translate ~/.config/autorandr/<name>/{config,setup} into a store profile."""
+    pdir = os.path.join(AUTORANDR_DIR, name)
+    try:
+        with open(os.path.join(pdir, "config")) as f:
+            config = f.read().splitlines()
+    except OSError:
+        return None
+
+    outputs: dict[str, dict] = {}
+    cur: dict | None = None
+    for line in config:
+        parts = line.split(None, 1)
+        if not parts:
+            continue
+        key, val = parts[0], (parts[1].strip() if len(parts) > 1 else "")
+        if key == "output":
+            cur = outputs.setdefault(val, {"enabled": True, "primary": False})
+        elif cur is None:
+            continue
+        elif key == "off":
+            cur["enabled"] = False
+        elif key == "primary":
+            cur["primary"] = True
+        elif key in ("mode", "rate", "pos", "rotate"):
+            cur[key] = val
+
+    connected = []
+    monitors: dict[str, dict] = {}
+    try:
+        with open(os.path.join(pdir, "setup")) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 2:
+                    continue
+                try:
+                    edid = bytes.fromhex(parts[1])
+                except ValueError:
+                    continue
+                vendor, model = _parse_edid_vendor_model(edid)
+                connected.append((parts[0], vendor, model))
+                native = outputs.get(parts[0], {}).get("mode")
+                monitors[parts[0]] = {"vendor": vendor, "model": model,
+                                      "serial": _parse_edid_serial(edid), "native": native}
+    except OSError:
+        pass
+
+    return {
+        "name": name,
+        "fingerprint": outputs_checksum8(connected) if connected else None,
+        "outputs": outputs,
+        "monitors": monitors,
+    }
+
+
+# ---------- virtual profiles ---------------------------------------------- #
+
+VIRTUAL = ("common", "horizontal", "vertical")
+
+
+def _area(mode: str) -> int:
+    w, h = (int(v) for v in mode.split("x"))
+    return w * h
+
+
+def virtual_profile(name: str, layout: dict[str, dict]) -> dict | None:
+    """autorandr's built-ins: "common" mirrors every connected output at the
+    largest mode they all share; "horizontal" / "vertical" put each output's
+    preferred mode side by side / stacked, in xrandr order."""
+    connected = [n for n, o in layout.items() if o["connected"] and o["modes"]]
+    if not connected:
+        return None
+    outputs: dict[str, dict] = {}
+    if name == "common":
+        shared = set(layout[connected[0]]["modes"]).intersection(*(layout[n]["modes"] for n in connected[1:]))
+        if not shared:
+            return None
+        mode = max(shared, key=_area)
+        for n in connected:
+            outputs[n] = {"enabled": True, "mode": mode, "rate": None, "pos": "0x0",
+                          "rotate": "normal", "primary": n == connected[0]}
+    else:
+        offset = 0
+        for n in connected:
+            mode = layout[n]["preferred"] or max(layout[n]["modes"], key=_area)
+            w, h = (int(v) for v in mode.split("x"))
+            outputs[n] = {"enabled": True, "mode": mode, "rate": None,
+                          "pos": f"{offset}x0" if name == "horizontal" else f"0x{offset}",
+                          "rotate": "normal", "primary": n == connected[0]}
+            offset += w if name == "horizontal" else h
+    return {"name": name, "fingerprint": None, "outputs": outputs, "monitors": {}}
+
+
+# ---------- the store ----------------------------------------------------- #
+
+class ProfileStore:
+    """Profiles on disk plus a fingerprint → name index held in memory."""
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self.profiles_dir = os.path.join(root, "profiles")
+        self.index_path = os.path.join(root, "index.json")
+        self.features_path = os.path.join(root, "features.json")
+        self._features: display_match.FeatureIndex | None = None
+        try:
+            with open(self.index_path) as f:
+                self.index: dict[str, str] = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+            self.import_autorandr()
+
+    def import_autorandr(self) -> None:
+        """One-off migration of every autorandr profile into the store."""
+        try:
+            names = sorted(os.listdir(AUTORANDR_DIR))
+        except OSError:
+            return
+        for name in names:
+            prof = read_autorandr(name)
+            if prof:
+                self.put(prof, claim=False)
+
+    @property
+    def features(self) -> "display_match.FeatureIndex":
+        """Inverted feature index, loaded (or rebuilt) only when fuzzy matching needs it."""
+        if self._features is None:
+            try:
+                with open(self.features_path) as f:
+                    data = json.load(f)
+                if any(not isinstance(v, dict) for v in data.values()):
+                    raise ValueError("token-only features.json")  # written before descriptors were kept
+                self._features = display_match.FeatureIndex(data)
+            except (OSError, ValueError, AttributeError):
+                self._features = display_match.FeatureIndex()
+                for name in self.names():
+                    prof = self.get(name)
+                    if prof:
+                        self._features.add(name, prof.get("monitors") or {})
+                self._save_features()
+        return self._features
+
+    def _save_features(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._write_json(self.features_path, self._features.to_json())
+
+    def _path(self, name: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", name)
+        return os.path.join(self.profiles_dir, f"{safe}.json")
+
+    @staticmethod
+    def _write_json(path: str, data) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+    def names(self) -> list[str]:
+        try:
+            return sorted(f[:-5] for f in os.listdir(self.profiles_dir) if f.endswith(".json"))
+        except OSError:
+            return []
+
+    def get(self, name: str) -> dict | None:
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        # First use of an autorandr profile: import it so the next load is native
+        prof = read_autorandr(name)
+        if prof:
+            self.put(prof, claim=False)
+        return prof
+
+    def put(self, profile: dict, claim: bool = True) -> None:
+        """Store a profile. claim=False keeps an existing index entry for its
+        fingerprint (named presets like horizontal/horizontal-reverse share one)."""
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        self._write_json(self._path(profile["name"]), profile)
+        if self._features is not None or os.path.exists(self.features_path):
+            self.features.add(profile["name"], profile.get("monitors") or {})
+            self._save_features()
+        fp = profile.get("fingerprint")
+        if fp and (claim or fp not in self.index) and self.index.get(fp) != profile["name"]:
+            self.index[fp] = profile["name"]
+            self._write_json(self.index_path, self.index)
+
+    def lookup(self, fingerprint: str) -> dict | None:
+        """O(1): index hit → read exactly one profile file."""
+        name = self.index.get(fingerprint)
+        return self.get(name) if name else None
+
+
+# ---------- operations ---------------------------------------------------- #
+
+def current_fingerprint() -> str:
+    return outputs_checksum8(get_outputs_with_vendor_model())
+
+
+def current_monitors(layout: dict[str, dict]) -> list[dict]:
+    """EDID identity plus xrandr-reported size, native mode and mode list."""
+    monitors = []
+    for mon in describe_outputs():
+        o = layout.get(mon["connector"], {})
+        mon.update(phys_mm=o.get("phys_mm"), native=o.get("preferred") or (o.get("modes") or [None])[0],
+                   modes=o.get("modes") or [])
+        monitors.append(mon)
+    return monitors
+
+
+def run_postswitch(profile: dict, layout: dict[str, dict]) -> None:
+    if not os.access(POSTSWITCH, os.X_OK):
+        return
+    env = os.environ.copy()
+    env["AUTORANDR_CURRENT_PROFILE"] = profile["name"]
+    env["AUTORANDR_MONITORS"] = ":".join(n for n, o in profile["outputs"].items() if o.get("enabled"))
+    proc.run([POSTSWITCH], timeout=POSTSWITCH_TIMEOUT_S, env=env, capture=False)
+
+
+def capped_outputs(profile_outputs: dict[str, dict], layout: dict[str, dict],
+                   policy: RefreshPolicy) -> dict[str, dict]:
+    """The profile's outputs with each rate kept within the refresh cap for the
+    current power source. On battery a stored rate under the cap is kept and
+    one above it is lowered; on AC every output gets the highest rate of its
+    mode (within ac_max_hz, if set), so a profile saved on battery isn't stuck
+    at 60 Hz."""
+    names: dict[str, str] = {}
+    if policy.outputs:  # per-display overrides are keyed by EDID vendor/model
+        names = {n: f"{v or ''} {m or ''}".strip() for n, v, m in get_outputs_with_vendor_model()}
+    out = {}
+    for name, o in profile_outputs.items():
+        rates = layout.get(name, {}).get("rates", {}).get(o.get("mode")) if o.get("enabled") else None
+        if rates:
+            cap = policy.cap(names.get(name), name)
+            rate = float(o["rate"]) if o.get("rate") else None
+            if rate is None or not policy.battery or (cap is not None and rate > cap + HZ_SLOP):
+                o = dict(o, rate=f"{RefreshPolicy.pick(rates, cap):.2f}")
+        out[name] = o
+    return out
+
+
+def apply_profile(profile: dict, layout: dict[str, dict] | None = None,
+                  policy: RefreshPolicy | None = None) -> bool:
+    layout = layout if layout is not None else query_layout()
+    outputs = capped_outputs(profile["outputs"], layout, policy or RefreshPolicy())
+    cmd = build_cmd(outputs, list(layout))
+    ok = proc.ok(cmd, timeout=APPLY_TIMEOUT_S, capture=False)
+    if ok:
+        run_postswitch(profile, layout)
+    return ok
+
+
+def save_current(store: ProfileStore, name: str | None = None) -> dict:
+    fp = current_fingerprint()
+    layout = query_layout()
+    monitors = {m.pop("connector"): {k: v for k, v in m.items() if k != "modes"}
+                for m in current_monitors(layout)}
+    profile = {"name": name or fp, "fingerprint": fp, "outputs": snapshot(layout), "monitors": monitors}
+    store.put(profile)
+    return profile
+
+
+def load_named(store: ProfileStore, name: str) -> bool:
+    if name in VIRTUAL:
+        layout = query_layout()
+        profile = virtual_profile(name, layout)
+        return apply_profile(profile, layout) if profile else False
+    profile = store.get(name)
+    return apply_profile(profile) if profile else False
+
+
+def fuzzy_profile(store: ProfileStore, layout: dict[str, dict]) -> dict | None:
+    """Closest stored profile, adapted to the connected monitors; None if nothing is close."""
+    monitors = current_monitors(layout)
+    hit = display_match.best_match(store.features, store.get, monitors)
+    if not hit:
+        return None
+    profile, mapping, _score = hit
+    return display_match.adapt(profile, mapping, monitors)
+
+
+def auto_detect(store: ProfileStore, fuzzy: bool = True) -> dict | None:
+    """Apply the stored profile for the connected display set, else the
+    closest adapted one; None if neither exists."""
+    profile = store.lookup(current_fingerprint())
+    layout = query_layout()
+    if profile is None and fuzzy:
+        profile = fuzzy_profile(store, layout)
+    if profile and apply_profile(profile, layout):
+        return profile
+    return None
+
+
+def refresh(store: ProfileStore) -> dict | None:
+    """Re-apply after the power source changed: the stored layout if there is
+    one, else the current one; either way with rates re-picked under the cap."""
+    profile = auto_detect(store)
+    if profile:
+        return profile
+    layout = query_layout()
+    outputs = {n: dict(o, rate=None) for n, o in snapshot(layout).items()}
+    profile = {"name": "current", "fingerprint": None, "outputs": outputs}
+    return profile if apply_profile(profile, layout) else None
+
+
+def main(argv: list[str]) -> int:
+    store = ProfileStore()
+    op = argv[0] if argv else "auto"
+    if op == "save":
+        p = save_current(store, argv[1] if len(argv) > 1 else None)
+        print(f"Saved {p['name']} ({p['fingerprint']})")
+        return 0
+    if op == "load" and len(argv) > 1:
+        return 0 if load_named(store, argv[1]) else 1
+    if op == "auto":
+        p = auto_detect(store)
+        if p:
+            print(f"Applied {p['name']}")
+            return 0
+        # No postswitch then, but the hooks (wallpaper) still follow whatever
+        # layout the server picked; unchanged inputs are skipped
+        import post_layout
+        post_layout.run()
+        print("No stored profile for the connected displays", file=sys.stderr)
+        return 1
+    if op == "refresh":
+        p = refresh(store)
+        if p:
+            print(f"Applied {p['name']}")
+        return 0 if p else 1
+    if op == "list":
+        by_name = {v: k for k, v in store.index.items()}
+        for name in store.names():
+            print(f"{name}\t{by_name.get(name, '-')}")
+        return 0
+    print(__doc__.strip().split("Usage:")[1], file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+keyboard_layout.py — X11 keyboard layouts as XKB groups of one cached keymap.
+
+~/.config/pl_de_custom_caps_lock.xkb is group 1; the layouts in
+EXTRA_GROUPS are merged in as groups 2.. (the same pair wayfire.ini uses).
+The result is compiled once with xkbcomp into ~/.cache/xkb/<source hash>.xkm
+and uploaded from there, so a login with an unchanged source compiles
+nothing. Switching layouts is an XKB group lock (XkbLockGroup, libX11 via
+ctypes) instead of `setxkbmap`, which recompiled and re-uploaded a whole
+keymap on every toggle and could drop keystrokes while doing it.
+
+`serve` (a session.py unit) keeps one X connection open and answers
+toggle/set/get/load on $XDG_RUNTIME_DIR/keyboard_layout.sock. When udev
+reports a new keyboard (a dock) it re-uploads the cached keymap, keeping
+the locked group and the repeat rate.
+
+Usage:
+  keyboard_layout.py load       # upload the keymap (compiled only if its source changed)
+  keyboard_layout.py serve      # session service
+  keyboard_layout.py toggle     # next layout (toggle_layout.sh)
+  keyboard_layout.py set N      # layout N (0 = first)
+  keyboard_layout.py get
+
+toggle/set/get go through the service and open their own X connection when
+it isn't running.
+
+Requires:
+  - xkbcomp
+  - libX11
+  - pyudev (optional, to re-apply the keymap to new keyboards)
+"""
+
+import ctypes
+import logging
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import proc
+from dotlib.debounce import Debouncer
+
+KEYMAP_FILE = Path.home() / ".config" / "pl_de_custom_caps_lock.xkb"
+BASE_NAME = "pl"
+EXTRA_GROUPS = ["us(altgr-intl)"]   # groups 2.. in this order
+GROUP_NAMES = [BASE_NAME] + EXTRA_GROUPS
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "xkb"
+KEEP_KEYMAPS = 3
+SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "keyboard_layout.sock")
+
+COMPILE_TIMEOUT_S = 15
+UPLOAD_TIMEOUT_S = 5
+NEW_KEYBOARD_SETTLE_S = 1.0   # one keyboard announces several input nodes
+
+log = logging.getLogger("keyboard_layout")
+
+
+# ---------- keymap source and cache ---------------------------------------- #
+
+def _section_end(text: str, start: int) -> int:
+    """Index of the brace closing the section whose body starts at `start`."""
+    depth, i = 1, start
+    while i < len(text):
+        c = text[i]
+        if c == '"':
+            i = text.index('"', i + 1)
+        elif text.startswith("//", i) or c == "#":
+            i = text.find("\n", i)
+            if i < 0:
+                break
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError("unterminated xkb_symbols section")
+
+
+def keymap_source() -> str:
+    """The keymap file with EXTRA_GROUPS merged into its symbols as groups 2.."""
+    import re
+    text = KEYMAP_FILE.read_text()
+    m = re.search(r"\bxkb_symbols\b[^{]*\{", text)
+    if not m:
+        raise ValueError(f"{KEYMAP_FILE}: no xkb_symbols section")
+    end = _section_end(text, m.end())
+    extra = "".join(f'    augment "{layout}:{n}"\n' for n, layout in enumerate(EXTRA_GROUPS, start=2))
+    return text[:end] + extra + text[end:]
+
+
+def compiled_keymap() -> Path:
+    """Path of the .xkm for the current source, compiling it on a cache miss."""
+    import hashlib
+
+    source = keymap_source()
+    xkm = CACHE_DIR / f"{hashlib.sha256(source.encode()).hexdigest()[:16]}.xkm"
+    if xkm.is_file():
+        return xkm
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = xkm.with_suffix(f".{os.getpid()}.xkm")
+    r = proc.run(["xkbcomp", "-w", "0", "-xkm", "-", str(tmp)], timeout=COMPILE_TIMEOUT_S,
+                 input=source, stderr=True)
+    if not r.ok or not tmp.is_file():
+        tmp.unlink(missing_ok=True)
+        raise RuntimeError(f"xkbcomp failed: {r.stderr.strip() or r.returncode}")
+    os.replace(tmp, xkm)
+    log.info("Compiled %s", xkm)
+    for old in sorted(CACHE_DIR.glob("*.xkm"), key=lambda p: p.stat().st_mtime, reverse=True)[KEEP_KEYMAPS:]:
+        old.unlink(missing_ok=True)
+    return xkm
+
+
+def upload_keymap() -> bool:
+    """Load the cached keymap into the X server; False (logged) if that failed."""
+    try:
+        xkm = compiled_keymap()
+    except (OSError, ValueError, RuntimeError) as e:
+        log.error("Keymap unavailable: %s", e)
+        return False
+    display = os.environ.get("DISPLAY", ":0")
+    return proc.ok(["xkbcomp", "-w", "0", str(xkm), display], timeout=UPLOAD_TIMEOUT_S)
+
+
+# ---------- XKB over libX11 ------------------------------------------------ #
+
+class _XkbState(ctypes.Structure):
+    _fields_ = [("group", ctypes.c_ubyte), ("locked_group", ctypes.c_ubyte),
+                ("base_group", ctypes.c_ushort), ("latched_group", ctypes.c_short),
+                ("mods", ctypes.c_ubyte), ("base_mods", ctypes.c_ubyte),
+                ("latched_mods", ctypes.c_ubyte), ("locked_mods", ctypes.c_ubyte),
+                ("compat_state", ctypes.c_ubyte), ("grab_mods", ctypes.c_ubyte),
+                ("compat_grab_mods", ctypes.c_ubyte), ("lookup_mods", ctypes.c_ubyte),
+                ("compat_lookup_mods", ctypes.c_ubyte), ("ptr_buttons", ctypes.c_ushort)]
+
+
+class Xkb:
+    """Group lock and repeat rate of the core keyboard, over one X connection."""
+
+    USE_CORE_KBD = 0x0100
+
+    def __init__(self):
+        import ctypes.util   # pulls in subprocess/shutil; only needed with a display
+        lib = ctypes.CDLL(ctypes.util.find_library("X11") or "libX11.so.6")
+        lib.XOpenDisplay.restype = ctypes.c_void_p
+        lib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        lib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        lib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.XkbLockGroup.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_uint]
+        lib.XkbGetState.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.POINTER(_XkbState)]
+        lib.XkbGetAutoRepeatRate.argtypes = [ctypes.c_void_p, ctypes.c_uint,
+                                             ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint)]
+        lib.XkbSetAutoRepeatRate.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_uint, ctypes.c_uint]
+        self.lib = lib
+        self.dpy = lib.XOpenDisplay(None)
+        if not self.dpy:
+            raise OSError("cannot open the X display")
+        self.lock = threading.Lock()   # Xlib connections aren't thread-safe
+
+    def close(self) -> None:
+        if self.dpy:
+            self.lib.XCloseDisplay(self.dpy)
+            self.dpy = None
+
+    def group(self) -> int:
+        state = _XkbState()
+        with self.lock:
+            self.lib.XkbGetState(self.dpy, self.USE_CORE_KBD, ctypes.byref(state))
+        return state.locked_group
+
+    def lock_group(self, group: int) -> None:
+        with self.lock:
+            self.lib.XkbLockGroup(self.dpy, self.USE_CORE_KBD, group % len(GROUP_NAMES))
+            self.lib.XSync(self.dpy, 0)
+
+    def repeat_rate(self):
+        delay, interval = ctypes.c_uint(), ctypes.c_uint()
+        with self.lock:
+            self.lib.XkbGetAutoRepeatRate(self.dpy, self.USE_CORE_KBD, ctypes.byref(delay), ctypes.byref(interval))
+        return delay.value, interval.value
+
+    def set_repeat_rate(self, delay: int, interval: int) -> None:
+        with self.lock:
+            self.lib.XkbSetAutoRepeatRate(self.dpy, self.USE_CORE_KBD, delay, interval)
+            self.lib.XSync(self.dpy, 0)
+
+    def reload(self) -> bool:
+        """Upload the cached keymap again; the locked group and repeat rate survive it."""
+        group, rate = self.group(), self.repeat_rate()
+        ok = upload_keymap()
+        if ok:
+            self.set_repeat_rate(*rate)
+            self.lock_group(group)
+        return ok
+
+
+# ---------- commands ------------------------------------------------------- #
+
+def handle(xkb: Xkb, words: list[str]) -> str:
+    cmd = words[0] if words else "get"
+    if cmd == "toggle":
+        xkb.lock_group(xkb.group() + 1)
+    elif cmd == "set" and len(words) > 1 and words[1].isdigit():
+        xkb.lock_group(int(words[1]))
+    elif cmd == "load":
+        if not xkb.reload():
+            return "error: keymap upload failed"
+    elif cmd != "get":
+        return f"error: unknown command {' '.join(words)!r}"
+    g = xkb.group()
+    return f"{g} {GROUP_NAMES[g] if g < len(GROUP_NAMES) else '?'}"
+
+
+def ask(words: list[str]) -> str | None:
+    """The service's answer, or None when it isn't running."""
+    import socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(2.0)
+            s.connect(SOCKET)
+            s.sendall((" ".join(words) + "\n").encode())
+            return s.makefile("r", encoding="utf-8").readline().strip()
+    except OSError:
+        return None
+
+
+# ---------- service -------------------------------------------------------- #
+
+def watch_keyboards(on_new) -> object | None:
+    """Call on_new() once a burst of keyboard additions has settled; None without pyudev."""
+    try:
+        import pyudev
+    except ImportError:
+        log.warning("pyudev not found – new keyboards won't get the keymap")
+        return None
+    settle = Debouncer(NEW_KEYBOARD_SETTLE_S, on_new)
+
+    def on_event(device) -> None:
+        if device.action == "add" and device.properties.get("ID_INPUT_KEYBOARD") == "1":
+            log.info("Keyboard added: %s", device.sys_name)
+            settle.trigger()
+
+    monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+    monitor.filter_by(subsystem="input")
+    observer = pyudev.MonitorObserver(monitor, callback=on_event, name="udev-keyboards")
+    observer.start()
+    return observer
+
+
+def serve() -> int:
+    import socket
+    if ask(["get"]) is not None:
+        log.info("Already running")
+        return 0
+    try:
+        os.unlink(SOCKET)
+    except FileNotFoundError:
+        pass
+
+    xkb = Xkb()
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(SOCKET)
+    os.chmod(SOCKET, 0o600)
+    srv.listen(4)
+    observer = watch_keyboards(lambda: log.info("Re-applied keymap: %s", xkb.reload()))
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    log.info("Serving on %s", SOCKET)
+    try:
+        while True:
+            conn, _ = srv.accept()
+            with conn:
+                try:
+                    conn.settimeout(2.0)
+                    words = conn.makefile("r", encoding="utf-8").readline().split()
+                    conn.sendall((handle(xkb, words) + "\n").encode())
+                except OSError:
+                    pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if observer is not None:
+            observer.stop()
+        srv.close()
+        os.unlink(SOCKET)
+        xkb.close()
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%H:%M:%S")
+    op = argv[0] if argv else "get"
+    if op == "serve":
+        return serve()
+    if op == "load" and ask(["get"]) is None:
+        return 0 if upload_keymap() else 1
+    if op not in ("load", "toggle", "set", "get"):
+        print(__doc__.strip().split("Usage:")[1], file=sys.stderr)
+        return 2
+
+    reply = ask(argv)
+    if reply is None:  # no service: one-off connection
+        try:
+            xkb = Xkb()
+        except OSError as e:
+            log.error("%s", e)
+            return 1
+        try:
+            reply = handle(xkb, argv)
+        finally:
+            xkb.close()
+    if op == "get":
+        print(reply)
+    return 1 if reply.startswith("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
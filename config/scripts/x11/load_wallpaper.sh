@@ -1,2 +1,3 @@
 #!/bin/bash
-feh --bg-fill $(head -n 1 ~/.wallpaper)
+# Pre-scaled per-output variants, cached by image hash: scripts/x11/wallpaper.py
+exec /usr/bin/python3 ~/.config/scripts/dotctl.py wallpaper "$@"
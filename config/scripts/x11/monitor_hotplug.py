@@ -4,51 +4,157 @@ monitor_hotplug.py – react to display hot-plug events.
 
 Fixed for pyudev ≥ 0.21 (single-arg callback).
 
+Also watches the power_supply subsystem: when the machine switches between
+AC and battery, `display_profiles.py refresh` re-applies the layout with the
+refresh cap for the new source (debounced, POWER_DEBOUNCE_S), whatever --cmd
+is.
+
+Display events arrive in bursts (a dock announces each connector, some
+monitors re-announce while they train the link); they are coalesced for
+HOTPLUG_DEBOUNCE_S so a burst runs the command once. Reactions never overlap,
+and one that outlives REACTION_TIMEOUT_S is killed (with everything it
+started) so a wedged xrandr can't stall every later hotplug.
+
+With DOTFILES_TRACE=1 each reaction is one trace (dotlib/trace.py): the
+command and everything it runs report their spans into it.
+
+Metrics (Prometheus text, dotlib/metrics.py) are kept in
+$XDG_RUNTIME_DIR/monitor_hotplug.prom and, with --metrics-socket, served on
+a unix socket: udev events, coalesced events, reactions, event → settled
+latency, failed commands and fallback layouts (reported by
+monitor_pick_best.py).
+
 Usage (X11):
-  # Run a shell command on change (and once on start):
+  # Run a command on change (and once on start), through `sh -c`:
   python3 scripts/x11/monitor_hotplug.py --cmd 'autorandr -c && polybar-msg cmd restart'
+  python3 scripts/x11/monitor_hotplug.py --metrics-socket $XDG_RUNTIME_DIR/monitor_hotplug.sock
 
-If --cmd is not provided, it defaults to:  autorandr -c
+If --cmd is not provided, the native profile store applies the saved layout
+for the connected displays (the one "Save current layout" wrote):
+  display_profiles.py auto
 """
 
-import argparse
 import logging
-import subprocess
 import sys
 import time
 import signal
 from pathlib import Path
 import shlex
 import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib.debounce import Debouncer
+from dotlib.power import power_source
+from dotlib import metrics, proc, trace
+
+# ---------- metrics -------------------------------------------------------- #
+
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR", "/tmp")
+METRICS_FILE = os.path.join(RUNTIME_DIR, "monitor_hotplug.prom")
+REPORT_FILE = os.path.join(RUNTIME_DIR, f"monitor_hotplug.{os.getpid()}.report")
 
-try:
-    import pyudev
-except ImportError:
-    sys.stderr.write("pyudev not found – install it with:  pip install pyudev\n")
-    sys.exit(1)
+METRICS = metrics.Registry()
+UDEV_EVENTS = METRICS.counter("hotplug_udev_events_total", "udev events received", ["subsystem"])
+COALESCED = METRICS.counter("hotplug_events_coalesced_total",
+                            "display events folded into an already pending reaction")
+REACTIONS = METRICS.counter("hotplug_reactions_total", "reactions run", ["trigger"])
+LATENCY = METRICS.histogram("hotplug_reaction_latency_seconds",
+                            "first event of a burst until the command finished", labels=["trigger"])
+FAILURES = METRICS.counter("hotplug_modeset_failures_total", "reactions whose command failed")
+FALLBACKS = METRICS.counter("hotplug_fallback_activations_total",
+                            "reactions that ended on the fallback layout")
 
 
 # ---------- custom reaction ------------------------------------------------ #
 
 RUN_CMD: str | None = None  # set by main()
+PROFILES = os.path.join(os.path.dirname(os.path.realpath(__file__)), "display_profiles.py")
+DEFAULT_ARGV = [sys.executable, PROFILES, "auto"]
+POWER_ARGV = [sys.executable, PROFILES, "refresh"]  # policy-aware re-apply
+REACTION_TIMEOUT_S = 60     # xrandr + postswitch on a slow dock stays well below
 
-def reaction(connector: str | None = None) -> None:
+_reaction_lock = threading.Lock()
+
+def reaction(connector: str | None = None, trigger: str = "start", since: float | None = None,
+             argv: list[str] | None = None) -> None:
     """
     Run the helper inside the *same* session environment.
     """
-    logging.info("Display change (%s) – running command", connector or "?")
+    since = since or time.monotonic()
+    with _reaction_lock:
+        logging.info("Display change (%s) – running command", connector or "?")
+
+        # Determine the command to run
+        if argv is None:
+            argv = ["sh", "-c", RUN_CMD] if RUN_CMD else DEFAULT_ARGV
+        cmd = RUN_CMD if argv[:2] == ["sh", "-c"] else shlex.join(argv)
+
+        with trace.root("hotplug", connector=connector or "?", trigger=trigger):
+            # Preserve DISPLAY, XAUTHORITY, etc., from the current X11 session
+            env = os.environ.copy()
+            env[metrics.ENV_REPORT] = REPORT_FILE
+            res = proc.run(argv, timeout=REACTION_TIMEOUT_S, env=env, capture=False)
+
+        REACTIONS.inc(trigger=trigger)
+        LATENCY.observe(time.monotonic() - since, trigger=trigger)
+        if "fallback" in metrics.collect_reports(REPORT_FILE):
+            FALLBACKS.inc()
+        if res.timed_out:
+            FAILURES.inc()
+            logging.error("Command killed after %ss: %s", REACTION_TIMEOUT_S, cmd)
+        elif not res.ok:
+            FAILURES.inc()
+            logging.error("Command failed (%d): %s", res.returncode, cmd)
+        else:
+            logging.info("Command completed: %s", cmd)
+
+
+# ---------- display events -------------------------------------------------- #
 
-    # Preserve DISPLAY, XAUTHORITY, etc., from the current X11 session
-    env = os.environ.copy()
+HOTPLUG_DEBOUNCE_S = 0.5   # one reaction per burst of connector events
 
-    # Determine the command to run
-    cmd = RUN_CMD or "autorandr -c"
+_burst_lock = threading.Lock()
+_burst_start: float | None = None
+_burst_connectors: set[str] = set()
 
-    res = subprocess.run(cmd, shell=True, env=env)
-    if res.returncode != 0:
-        logging.error("Command failed (%d): %s", res.returncode, cmd)
-    else:
-        logging.info("Command completed: %s", cmd)
+def _display_reaction() -> None:
+    global _burst_start
+    with _burst_lock:
+        since, _burst_start = _burst_start, None
+        connectors = ",".join(sorted(_burst_connectors))
+        _burst_connectors.clear()
+    reaction(connectors, "drm", since)
+
+_display_debounce = Debouncer(HOTPLUG_DEBOUNCE_S, _display_reaction)
+
+def handle_display_event(connector: str) -> None:
+    global _burst_start
+    with _burst_lock:
+        if _burst_start is None:
+            _burst_start = time.monotonic()
+        else:
+            COALESCED.inc()
+        _burst_connectors.add(connector)
+    _display_debounce.trigger()
+
+
+# ---------- power source ---------------------------------------------------- #
+
+POWER_DEBOUNCE_S = 2.0     # chargers bounce online/offline while negotiating
+
+_power_state: str | None = None
+_power_debounce = Debouncer(POWER_DEBOUNCE_S,
+                            lambda src, since: reaction(f"power:{src}", "power", since, POWER_ARGV))
+
+def handle_power_event() -> None:
+    global _power_state
+    src = power_source()
+    if src == _power_state:
+        return  # battery capacity updates etc.
+    logging.info("Power source: %s → %s", _power_state or "?", src)
+    _power_state = src
+    _power_debounce.trigger(src, time.monotonic())
 
 
 # ---------- udev glue ------------------------------------------------------ #
@@ -59,6 +165,10 @@ def handle_event(*args):
     else:               # legacy pyudev
         action, device = args
 
+    UDEV_EVENTS.inc(subsystem=device.subsystem)
+    if device.subsystem == "power_supply":
+        handle_power_event()
+        return
     if action != "change":
         return
     if device.properties.get("HOTPLUG") != "1":
@@ -68,7 +178,7 @@ def handle_event(*args):
 
     connector = device.sys_name  # e.g. card0-HDMI-A-1
     logging.debug("Hot-plug on %s", connector)
-    reaction(connector)
+    handle_display_event(connector)
 
 
 # ---------- graceful shutdown --------------------------------------------- #
@@ -82,6 +192,14 @@ def shutdown_handler(signum, frame):
 
 def main():
     global RUN_CMD
+    import argparse
+
+    try:
+        import pyudev
+    except ImportError:
+        sys.stderr.write("pyudev not found – install it with:  pip install pyudev\n")
+        sys.exit(1)
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(message)s",
@@ -91,11 +209,18 @@ def main():
     parser = argparse.ArgumentParser(description="Monitor hot-plug watcher (X11)")
     parser.add_argument(
         "--cmd",
-        help="Shell command to run on change (default: 'autorandr -c')",
+        help="Shell command to run on change (default: 'display_profiles.py auto')",
     )
+    parser.add_argument("--metrics-file", default=METRICS_FILE,
+                        help=f"Prometheus text file to keep updated ('' = none; default: {METRICS_FILE})")
+    parser.add_argument("--metrics-socket", help="also serve the metrics on this unix socket")
     args = parser.parse_args()
     RUN_CMD = args.cmd
 
+    if args.metrics_file:
+        METRICS.export_file(args.metrics_file)
+    metrics_srv = METRICS.serve_unix(args.metrics_socket) if args.metrics_socket else None
+
     # Register signal handlers
     signal.signal(signal.SIGTERM, shutdown_handler)
     signal.signal(signal.SIGINT, shutdown_handler)
@@ -103,11 +228,14 @@ def main():
     context = pyudev.Context()
     monitor = pyudev.Monitor.from_netlink(context)
     monitor.filter_by(subsystem="drm")
+    monitor.filter_by(subsystem="power_supply")
 
     observer = pyudev.MonitorObserver(monitor, callback=handle_event,
                                       name="udev-monitor-observer")
     observer.start()
 
+    global _power_state
+    _power_state = power_source()
     reaction()
 
     logging.info("Listening for monitor hot-plug events… (Ctrl-C or SIGTERM to quit)")
@@ -115,7 +243,12 @@ def main():
         while not _stop:
             time.sleep(1)
     finally:
+        _power_debounce.cancel()
+        _display_debounce.cancel()
         observer.stop()
+        if metrics_srv is not None:
+            metrics_srv.close()
+            os.unlink(args.metrics_socket)
         logging.info("Observer stopped. Bye.")
 
 
@@ -5,22 +5,32 @@ monitor_pick_best.py
 • Pick the largest-pixel-count mode whose HEIGHT is 720-1440 p
 • Prefer external HDMI/DP over the built-in eDP/LVDS when pixels tie
 • Ignore “scaled” modes on the laptop panel (must be flagged * or +)
+• On battery, cap the refresh rate per display (dotlib/power.py policy)
 • Apply the entire layout with a single xrandr command
+• Then run the post-layout hooks (wallpaper, notification) in parallel
 • If that command fails, fall back to: eDP-1 --auto, everything else --off
 • Console logging only – set MON_PICK_LOGLEVEL=DEBUG for verbose trace
+• DOTFILES_TRACE=1 records timed spans (dotlib/trace.py)
 """
 
 import os
 import re
+import sys
+import shlex
 import logging
-import subprocess
-from pathlib import Path
-from shutil import which
+
+from display_edid import get_outputs_with_vendor_model
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib.power import RefreshPolicy
+from dotlib import hooks, metrics, proc, trace
 
 # ────────── human-readable limits ──────────
 MIN_H = 720
 MAX_H = 1440          # never drive >1440 p
 ASP_TOL = 0.01        # aspect-ratio slop
+QUERY_TIMEOUT_S = 5   # xrandr on a wedged X server never returns
+APPLY_TIMEOUT_S = 15  # a modeset can legitimately take a few seconds
 
 # ───────────── logging setup ───────────────
 LEVEL = os.getenv("MON_PICK_LOGLEVEL", "INFO").upper()
@@ -31,17 +41,23 @@ logging.basicConfig(
 log = logging.getLogger(__name__)
 
 # ───────── helper to shell out ─────────────
-def run(cmd: str) -> str:
-    log.debug("RUN %s", cmd)
-    return subprocess.run(
-        cmd, shell=True, text=True,
-        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
-    ).stdout
+def run(*argv: str) -> str:
+    log.debug("RUN %s", shlex.join(argv))
+    r = proc.run(argv, timeout=QUERY_TIMEOUT_S)
+    if r.timed_out:
+        log.warning("Timed out after %ss: %s", QUERY_TIMEOUT_S, shlex.join(argv))
+    return r.stdout
+
+def run_apply(argv: list[str]) -> bool:
+    r = proc.run(argv, timeout=APPLY_TIMEOUT_S, capture=False)
+    if r.timed_out:
+        log.error("Timed out after %ss: %s", APPLY_TIMEOUT_S, shlex.join(argv))
+    return r.ok
 
 # ───────── enumerate every output ──────────
 def all_outputs() -> list[str]:
     outs = []
-    for ln in run("xrandr --query").splitlines():
+    for ln in run("xrandr", "--query").splitlines():
         m = re.match(r"^(\S+)\s+(dis)?connected", ln)
         if m:
             outs.append(m.group(1))
@@ -49,13 +65,30 @@ def all_outputs() -> list[str]:
     return outs
 
 def connected_outputs() -> list[str]:
+    query = run("xrandr", "--query")
     return [o for o in all_outputs()
-            if re.search(rf"^{o}\s+connected", run("xrandr --query"), re.M)]
+            if re.search(rf"^{re.escape(o)}\s+connected", query, re.M)]
+
+def output_section(output: str) -> str:
+    """The `xrandr --query` block of one connected output: its header and mode lines."""
+    lines = []
+    for ln in run("xrandr", "--query").splitlines():
+        if lines and not ln[:1].isspace():
+            break
+        if lines or re.match(rf"^{re.escape(output)} connected", ln):
+            lines.append(ln)
+    return "\n".join(lines)
 
 # ───── parse modelines & choose “best” ─────
-def parse_modes(output: str, internal: bool) -> list[tuple[int, str]]:
-    """Return list of (pixels, 'WxH') modes obeying rules."""
-    section = run(f"xrandr --query | sed -n '/^{output} connected/,/^[A-Z]/p'")
+def parse_modes(output: str, internal: bool) -> list[tuple[int, str, list[float]]]:
+    """Return list of (pixels, 'WxH', [rates]) modes obeying rules."""
+    with trace.span("parse modes", output=output) as sp:
+        modes = _parse_modes(output, internal)
+        sp.args["modes"] = len(modes)
+    return modes
+
+def _parse_modes(output: str, internal: bool) -> list[tuple[int, str, list[float]]]:
+    section = output_section(output)
     have_native = False
     native_asp = None
     modes = []
@@ -75,90 +108,89 @@ def parse_modes(output: str, internal: bool) -> list[tuple[int, str]]:
             have_native = True
         if abs((w / h) - native_asp) > ASP_TOL:
             continue
-        modes.append((w * h, f"{w}x{h}"))
+        rates = [float(r) for r in re.findall(r"(\d+\.\d+)", ln[m.end():])]
+        modes.append((w * h, f"{w}x{h}", rates))
     log.debug("%s modes: %s", output, modes)
     return modes
 
-def pick_best_monitor() -> tuple[str, str] | None:
-    """Return (output, mode) or None."""
+def edid_names() -> dict[str, str]:
+    """output → 'VENDOR MODEL' (EDID), the fingerprint used by the refresh policy."""
+    return {n: f"{v or ''} {m or ''}".strip() for n, v, m in get_outputs_with_vendor_model()}
+
+def pick_best_monitor(policy: RefreshPolicy | None = None) -> tuple[str, str, float | None] | None:
+    """Return (output, mode, rate) or None."""
+    with trace.span("decide") as sp:
+        best = _pick_best_monitor(policy)
+        sp.args["chosen"] = " ".join(str(v) for v in best) if best else None
+    return best
+
+def _pick_best_monitor(policy: RefreshPolicy | None) -> tuple[str, str, float | None] | None:
     cand = []
+    names = edid_names() if policy else {}
     for out in connected_outputs():
         internal = out.lower().startswith(("edp", "lvds"))
         modes = parse_modes(out, internal)
         if modes:
             # largest pixel count
-            mode = max(modes, key=lambda t: t[0])[1]
-            pixels = max(modes)[0]
+            pixels, mode, rates = max(modes, key=lambda t: t[0])
+            cap = policy.cap(names.get(out), out) if policy else None
+            rate = RefreshPolicy.pick(rates, cap)
             pri = 2 if internal else (1 if out.lower().startswith("dp") else 0)
-            cand.append((pixels, pri, out, mode))
+            cand.append((pixels, pri, out, mode, rate))
     if not cand:
         return None
-    pixels, pri, out, mode = sorted(cand, key=lambda t: (-t[0], t[1]))[0]
-    log.info("Chosen: %s @ %s  (%d px)", out, mode, pixels)
-    return out, mode
+    pixels, pri, out, mode, rate = sorted(cand, key=lambda t: (-t[0], t[1]))[0]
+    log.info("Chosen: %s @ %s %s Hz  (%d px)", out, mode, rate or "auto", pixels)
+    return out, mode, rate
 
 # ─────── build & run xrandr command ────────
-def build_cmd(primary_out: str, primary_mode: str) -> str:
-    parts = []
+def build_cmd(primary_out: str, primary_mode: str, rate: float | None = None) -> list[str]:
+    parts = ["xrandr"]
     for out in all_outputs():
         if out == primary_out:
             parts += ["--output", out, "--mode", primary_mode, "--primary"]
+            if rate:
+                parts += ["--rate", f"{rate:.2f}"]
         else:
             parts += ["--output", out, "--off"]
-    return "xrandr " + " ".join(parts)
+    return parts
 
-def run_layout(primary_out: str, primary_mode: str) -> bool:
-    cmd = build_cmd(primary_out, primary_mode)
-    log.info("Applying layout: %s", cmd)
-    ok = subprocess.run(cmd, shell=True).returncode == 0
+def run_layout(primary_out: str, primary_mode: str, rate: float | None = None) -> bool:
+    cmd = build_cmd(primary_out, primary_mode, rate)
+    log.info("Applying layout: %s", shlex.join(cmd))
+    with trace.span("apply", output=primary_out, mode=primary_mode, rate=rate):
+        ok = run_apply(cmd)
     log.info("→ %s", "success" if ok else "FAILED")
     return ok
 
-# ─────────────── wallpaper ────────────────
-def redraw_wallpaper() -> None:
-    fp = Path.home() / ".wallpaper"
-    if fp.is_file() and which("feh"):
-        img = fp.read_text().strip()
-        if Path(img).is_file():
-            subprocess.run(f'feh --bg-scale "{img}"', shell=True)
-
-# ─────────── polybar helper ────────────
-def redraw_polybar() -> None:
-    """
-    Restart Polybar so it re-reads the new monitor geometry.
-    """
-    if not which("polybar"):
-        log.debug("Polybar not installed – skipping")
-        return
-
-    # 1) Gentle restart
-    res = subprocess.run("polybar-msg cmd restart",
-                         shell=True, stdout=subprocess.DEVNULL,
-                         stderr=subprocess.DEVNULL)
-    if res.returncode == 0:
-        log.info("Polybar restarted via IPC")
-        return
-
 # ─────────────── fallback ──────────────────
 def fallback() -> None:
     panel = next((o for o in all_outputs()
                   if o.lower().startswith(("edp", "lvds"))), None)
-    cmd = ("xrandr --output {p} --auto --primary ".format(p=panel)
-           + " ".join(f"--output {o} --off" for o in all_outputs() if o != panel))
-    log.warning("Fallback: %s", cmd)
-    subprocess.run(cmd, shell=True)
+    cmd = ["xrandr", "--output", str(panel), "--auto", "--primary"]
+    for o in all_outputs():
+        if o != panel:
+            cmd += ["--output", o, "--off"]
+    log.warning("Fallback: %s", shlex.join(cmd))
+    metrics.report("fallback")
+    with trace.span("fallback"):
+        run_apply(cmd)
 
 # ────────────────── main ───────────────────
 def main() -> None:
-    best = pick_best_monitor()
+    policy = RefreshPolicy()
+    log.info("Power source: %s", "battery" if policy.battery else "AC")
+    best = pick_best_monitor(policy)
     if best and run_layout(*best):
         pass
     else:
         log.error("Best layout failed – activating fallback")
         fallback()
-    
-    redraw_wallpaper()
-    redraw_polybar()
+
+    import post_layout  # deferred: only needed after a switch
+    for line in hooks.report(post_layout.run()).splitlines():
+        log.info("%s", line)
 
 if __name__ == "__main__":
-    main()
+    with trace.span("pick best"):
+        main()
@@ -1,21 +1,17 @@
 #!/usr/bin/env python3
 
-import subprocess
 import re
 from collections import defaultdict
 import os
 import math
+import sys
 
-def redraw_wallpaper():
-    wallpaper_file = os.path.expanduser("~/.wallpaper")
-    if os.path.isfile(wallpaper_file):
-        with open(wallpaper_file) as f:
-            image_path = f.read().strip()
-            if os.path.isfile(image_path):
-                subprocess.run(f'feh --bg-scale "{image_path}"', shell=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import menu, proc
+from display_edid import get_outputs_with_vendor_model, outputs_checksum8
 
-def run(cmd):
-    return subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+def run(*argv):
+    return proc.output(argv)
 
 def get_monitors():
     output = run("xrandr")
@@ -64,34 +60,33 @@ def sort_monitors(monitors):
             sorted_entries.append((label, mon, mode['res'], mode['freq']))
     return sorted_entries
 
-def show_rofi(entries):
-    menu = '\n'.join([entry[0] for entry in entries])
-    selected = run(f'echo "{menu}" | rofi -dmenu -i -p "Select Monitor Mode"').strip()
-    return next((e for e in entries if e[0] == selected), None)
+def list_entries():
+    return [(e[0], list(e[1:])) for e in sort_monitors(get_monitors())]
+
+def show_rofi():
+    # Cached per connected-display set; xrandr's probe runs behind the open menu
+    key = outputs_checksum8(get_outputs_with_vendor_model())
+    return menu.pick("monitor-all", list_entries,
+                     ["rofi", "-dmenu", "-i", "-p", "Select Monitor Mode"],
+                     key=key, empty="❌ No displays or resolutions found")
 
 def apply_mode(monitor, res, freq):
-    all_monitors = run("xrandr --listmonitors").splitlines()[1:]
+    all_monitors = run("xrandr", "--listmonitors").splitlines()[1:]
     all_names = [line.strip().split()[-1] for line in all_monitors]
 
     for mon in all_names:
-        subprocess.run(f"xrandr --output {mon} --off", shell=True)
+        proc.run(["xrandr", "--output", mon, "--off"])
 
-    cmd = f"xrandr --output {monitor} --mode {res} --rate {freq} --primary"
-    subprocess.run(cmd, shell=True)
+    proc.run(["xrandr", "--output", monitor, "--mode", res, "--rate", str(freq), "--primary"])
 
 def main():
-    monitors = get_monitors()
-    if not monitors:
-        subprocess.run(['notify-send', '❌ No displays or resolutions found'])
-        return
-
-    entries = sort_monitors(monitors)
-    selection = show_rofi(entries)
+    selection = show_rofi()
 
     if selection:
-        _, monitor, res, freq = selection
+        monitor, res, freq = selection
         apply_mode(monitor, res, freq)
-        redraw_wallpaper()
+        import post_layout  # deferred: only needed after a switch
+        post_layout.run()
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,15 @@
 #!/usr/bin/env python3
 
-import subprocess
 import re
 import os
+import sys
 
-def redraw_wallpaper():
-    wallpaper_file = os.path.expanduser("~/.wallpaper")
-    if os.path.isfile(wallpaper_file):
-        with open(wallpaper_file) as f:
-            image_path = f.read().strip()
-            if os.path.isfile(image_path):
-                subprocess.run(f'feh --bg-scale "{image_path}"', shell=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import menu, proc
+from display_edid import get_outputs_with_vendor_model, outputs_checksum8
 
-def run(cmd):
-    return subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+def run(*argv):
+    return proc.output(argv).strip()
 
 def parse_native_modes():
     output = run("xrandr")
@@ -54,9 +50,9 @@ def parse_native_modes():
 
     return final_monitors
 
-def show_rofi(monitors):
+def list_entries():
     entries = []
-    for mon, info in monitors.items():
+    for mon, info in parse_native_modes().items():
         label = f"{mon} | {info['res']} @ {info['freq']}Hz"
         entries.append((label, mon, info['res'], info['freq']))
 
@@ -72,31 +68,31 @@ def show_rofi(monitors):
         return (3, name)
 
     entries.sort(key=sort_key)
-    menu = '\n'.join(e[0] for e in entries)
-    selected = run(f'echo "{menu}" | rofi -dmenu -i -p "🖥 Native Display Setup"')
+    return [(e[0], list(e[1:])) for e in entries]
 
-    return next((e for e in entries if e[0] == selected), None)
+def show_rofi():
+    # Cached per connected-display set; xrandr's probe runs behind the open menu
+    key = outputs_checksum8(get_outputs_with_vendor_model())
+    return menu.pick("monitor-native", list_entries,
+                     ["rofi", "-dmenu", "-i", "-p", "🖥 Native Display Setup"],
+                     key=key, empty="❌ No connected displays found")
 
 def apply_mode(monitor, res, freq):
-    all_monitors = run("xrandr --listmonitors").splitlines()[1:]
+    all_monitors = run("xrandr", "--listmonitors").splitlines()[1:]
     all_outputs = [line.strip().split()[-1] for line in all_monitors]
 
     for out in all_outputs:
-        subprocess.run(f"xrandr --output {out} --off", shell=True)
+        proc.run(["xrandr", "--output", out, "--off"])
 
-    subprocess.run(f"xrandr --output {monitor} --mode {res} --rate {freq} --primary", shell=True)
+    proc.run(["xrandr", "--output", monitor, "--mode", res, "--rate", str(freq), "--primary"])
 
 def main():
-    monitors = parse_native_modes()
-    if not monitors:
-        subprocess.run(['notify-send', '❌ No connected displays found'])
-        return
-
-    selected = show_rofi(monitors)
+    selected = show_rofi()
     if selected:
-        _, monitor, res, freq = selected
+        monitor, res, freq = selected
         apply_mode(monitor, res, freq)
-        redraw_wallpaper()
+        import post_layout  # deferred: only needed after a switch
+        post_layout.run()
 
 if __name__ == "__main__":
     main()
@@ -1,26 +1,23 @@
 #!/usr/bin/env python3
 
-import subprocess
 import re
 from collections import defaultdict
 import os
 import math
+import sys
 
-def redraw_wallpaper():
-    wallpaper_file = os.path.expanduser("~/.wallpaper")
-    if os.path.isfile(wallpaper_file):
-        with open(wallpaper_file) as f:
-            image_path = f.read().strip()
-            if os.path.isfile(image_path):
-                subprocess.run(f'feh --bg-scale "{image_path}"', shell=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import menu, proc
+from display_edid import get_outputs_with_vendor_model, outputs_checksum8
 
-def run(cmd):
-    return subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+def run(*argv):
+    return proc.output(argv)
 
 def get_monitors():
     output = run("xrandr")
     monitors = defaultdict(list)
     native_aspect = {}
+    native_ratio = {}
     native_resolutions = {}
     native_freqs = {}
     current_monitor = None
@@ -30,6 +27,7 @@ def get_monitors():
         if " connected" in line:
             current_monitor = line.split()[0]
             native_aspect[current_monitor] = None
+            native_ratio[current_monitor] = None
             native_resolutions[current_monitor] = None
             native_freqs[current_monitor] = 0.0
             seen_first_mode[current_monitor] = False
@@ -53,13 +51,13 @@ def get_monitors():
             # Save native resolution and aspect
             if is_native and native_aspect[current_monitor] is None:
                 native_aspect[current_monitor] = aspect
+                native_ratio[current_monitor] = width / height
                 native_resolutions[current_monitor] = res
 
             # Compare aspect ratio to native (with tolerance)
-            if native_aspect[current_monitor] is not None:
-                native_ratio = eval(native_aspect[current_monitor].replace(":", "/"))
+            if native_ratio[current_monitor] is not None:
                 current_ratio = width / height
-                if abs(current_ratio - native_ratio) > 0.01:
+                if abs(current_ratio - native_ratio[current_monitor]) > 0.01:
                     continue
 
             for f in freqs_raw:
@@ -105,36 +103,33 @@ def sort_monitors(monitors):
             sorted_entries.append((label, mon, mode['res'], mode['freq']))
     return sorted_entries
 
-def show_rofi(entries):
-    menu = '\n'.join([entry[0] for entry in entries])
-    selected = run(f'echo "{menu}" | rofi -dmenu -markup-rows -p "Select Monitor Mode"').strip()
-    # Strip Pango tags before matching
-    plain_entries = {re.sub(r'<[^>]+>', '', e[0]): e for e in entries}
-    return plain_entries.get(re.sub(r'<[^>]+>', '', selected), None)
+def list_entries():
+    return [(e[0], list(e[1:])) for e in sort_monitors(get_monitors())]
+
+def show_rofi():
+    # Cached per connected-display set; xrandr's probe runs behind the open menu
+    key = outputs_checksum8(get_outputs_with_vendor_model())
+    return menu.pick("monitor-reasonable", list_entries,
+                     ["rofi", "-dmenu", "-markup-rows", "-p", "Select Monitor Mode"],
+                     key=key, empty="❌ No displays or resolutions found")
 
 def apply_mode(monitor, res, freq):
-    all_monitors = run("xrandr --listmonitors").splitlines()[1:]
+    all_monitors = run("xrandr", "--listmonitors").splitlines()[1:]
     all_names = [line.strip().split()[-1] for line in all_monitors]
 
     for mon in all_names:
-        subprocess.run(f"xrandr --output {mon} --off", shell=True)
+        proc.run(["xrandr", "--output", mon, "--off"])
 
-    cmd = f"xrandr --output {monitor} --mode {res} --rate {freq} --primary"
-    subprocess.run(cmd, shell=True)
+    proc.run(["xrandr", "--output", monitor, "--mode", res, "--rate", str(freq), "--primary"])
 
 def main():
-    monitors = get_monitors()
-    if not monitors:
-        subprocess.run(['notify-send', '❌ No displays or resolutions found'])
-        return
-
-    entries = sort_monitors(monitors)
-    selection = show_rofi(entries)
+    selection = show_rofi()
 
     if selection:
-        _, monitor, res, freq = selection
+        monitor, res, freq = selection
         apply_mode(monitor, res, freq)
-        redraw_wallpaper()
+        import post_layout  # deferred: only needed after a switch
+        post_layout.run()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+post_layout.py — everything that follows an X11 layout change, in parallel.
+
+The hooks (dotlib/hooks.py) start together and each is skipped when the
+part of the layout it depends on is unchanged:
+
+  • wallpaper  — output geometries and ~/.wallpaper; a refresh-rate-only
+                 change keeps the current root pixmap
+  • notify     — the whole layout (rates included) and the profile name;
+                 one "display" bubble (dotlib/notify.py)
+
+Polybar is no hook: bar_manager.py follows RandR events on its own.
+
+Run by autorandr/postswitch (and display_profiles.py auto when no profile
+matches), monitor_pick_best.py and the monitor switchers;
+prints how long each hook took.
+
+Usage:
+  post_layout.py [--profile NAME] [--force]
+"""
+
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import hooks, notify, proc
+from dotlib.hooks import Hook
+import wallpaper
+
+QUERY_TIMEOUT_S = 5
+
+HEADER_RE = re.compile(r"^(\S+) connected( primary)? (\d+x\d+\+-?\d+\+-?\d+)")
+
+
+def current_layout() -> dict[str, dict]:
+    """Active outputs: name → {"geometry": "WxH+X+Y", "rate": "143.91", "primary": bool}."""
+    layout: dict[str, dict] = {}
+    current: dict | None = None
+    for line in proc.output(["xrandr", "--query"], QUERY_TIMEOUT_S).splitlines():
+        if not line[:1].isspace():
+            m = HEADER_RE.match(line)
+            current = layout.setdefault(m.group(1), {"geometry": m.group(3), "rate": None,
+                                                     "primary": bool(m.group(2))}) if m else None
+        elif current is not None and current["rate"] is None:
+            rate = next((t for t in line.split()[1:] if "*" in t), None)
+            if rate:
+                current["rate"] = rate.strip("*+")
+    return layout
+
+
+def describe(layout: dict[str, dict]) -> str:
+    return ", ".join(f"{name} {o['geometry'].split('+')[0]}" + (f" @ {o['rate']} Hz" if o["rate"] else "")
+                     for name, o in sorted(layout.items(), key=lambda kv: not kv[1]["primary"]))
+
+
+def wallpaper_inputs(layout: dict[str, dict]) -> dict:
+    src = wallpaper.source_image()
+    try:
+        mtime = os.stat(src).st_mtime if src else None
+    except OSError:
+        mtime = None
+    return {"geometry": sorted(o["geometry"] for o in layout.values()),
+            "source": str(src) if src else None, "mtime": mtime}
+
+
+def post_layout_hooks(layout: dict[str, dict], profile: str | None = None) -> list[Hook]:
+    def announce() -> bool:
+        title = f"Display profile: {profile}" if profile else "Display layout"
+        return notify.send(title, describe(layout) or "no active outputs", tag="display", icon="display")
+
+    return [
+        Hook("wallpaper", wallpaper.redraw_wallpaper, inputs=wallpaper_inputs),
+        Hook("notify", announce, inputs=lambda l: {"layout": l, "profile": profile}),
+    ]
+
+
+def run(profile: str | None = None, force: bool = False) -> dict[str, dict]:
+    """Run the hooks for the layout that is active now; returns their timings."""
+    layout = current_layout()
+    return hooks.run_all(post_layout_hooks(layout, profile), layout, force=force)
+
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the post-layout hooks")
+    parser.add_argument("--profile", default=os.environ.get("AUTORANDR_CURRENT_PROFILE"),
+                        help="profile name for the notification (default: $AUTORANDR_CURRENT_PROFILE)")
+    parser.add_argument("--force", action="store_true", help="run every hook, changed or not")
+    args = parser.parse_args()
+
+    results = run(args.profile, args.force)
+    print(hooks.report(results))
+    return 0 if all(r["status"] in ("ok", "skipped") for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
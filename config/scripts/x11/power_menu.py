@@ -1,85 +1,292 @@
 #!/usr/bin/env python3
+"""
+power_menu.py — rofi power menu talking to logind and the WM directly.
+
+Opening the menu and acting on it forks nothing but rofi:
+
+  • The window manager is detected once per session (/proc scan, SWAYSOCK /
+    I3SOCK, shutil.which) and cached with the logind capabilities in
+    $XDG_RUNTIME_DIR/power_menu.json, keyed by XDG_SESSION_ID.
+  • Sleep / hibernate / shutdown call org.freedesktop.login1.Manager over
+    D-Bus. CanSuspend / CanHibernate / CanHybridSleep / CanPowerOff are
+    asked up front and options the machine can't do are hidden.
+  • Logout uses the WM's own channel: the _OB_CONTROL client message for
+    Openbox, the i3/sway IPC socket, awesome's Remote.Eval; otherwise the
+    logind session is terminated.
+
+Falls back to systemctl / loginctl / openbox --exit when jeepney or
+python-xlib are missing.
+
+Requires (optional):
+  - jeepney      (logind, awesome)
+  - python-xlib  (openbox, i3 socket discovery)
+"""
 
 import os
-import subprocess
+import shutil
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import notify, proc
 
-def run(cmd):
-    return subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+# (label, logind Manager method, capability query)
+ACTIONS = [
+    (" Logout", None, None),
+    (" Sleep", "Suspend", "CanSuspend"),
+    (" Hybrid-sleep", "HybridSleep", "CanHybridSleep"),
+    (" Hibernate", "Hibernate", "CanHibernate"),
+    (" Shutdown", "PowerOff", "CanPowerOff"),
+]
+FAIL_LABELS = {
+    "Suspend": "sleep",
+    "HybridSleep": "hybrid-sleep",
+    "Hibernate": "hibernate",
+    "PowerOff": "shutdown",
+}
+SYSTEMCTL = {
+    "Suspend": "suspend",
+    "HybridSleep": "hybrid-sleep",
+    "Hibernate": "hibernate",
+    "PowerOff": "poweroff",
+}
 
+# Process names → WM, in detection priority order
+KNOWN_WMS = ("openbox", "i3", "sway", "awesome", "labwc", "wayfire")
 
-def _has_cmd(cmd):
-    return subprocess.run(f"command -v {cmd} >/dev/null 2>&1", shell=True).returncode == 0
+CACHE_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "power_menu.json")
+
+LOGIND = dict(object_path="/org/freedesktop/login1", bus_name="org.freedesktop.login1",
+              interface="org.freedesktop.login1.Manager")
+
+OB_CONTROL_EXIT = 3
+I3_IPC_MAGIC = b"i3-ipc"
+I3_IPC_RUN_COMMAND = 0
 
 
 def _notify(msg):
+    notify.send(msg, tag="power", urgency=notify.CRITICAL)
+
+
+# ---------- session cache ------------------------------------------------- #
+
+def _session_key():
+    return os.environ.get("XDG_SESSION_ID") or os.environ.get("WAYLAND_DISPLAY") or os.environ.get("DISPLAY", "")
+
+
+def _load_cache():
+    import json
+    try:
+        with open(CACHE_FILE, "r") as f:
+            data = json.load(f)
+        return data if data.get("session") == _session_key() else None
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cache(data):
+    import json
     try:
-        subprocess.run(["notify-send", msg])
+        with open(CACHE_FILE, "w") as f:
+            json.dump(dict(data, session=_session_key()), f)
+    except OSError:
+        pass
+
+
+# ---------- detection ----------------------------------------------------- #
+
+def _running_comms():
+    """Names of this user's processes, read straight from /proc."""
+    uid = os.getuid()
+    comms = set()
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            if os.stat(f"/proc/{pid}").st_uid != uid:
+                continue
+            with open(f"/proc/{pid}/comm", "r") as f:
+                comms.add(f.read().strip())
+        except OSError:
+            continue
+    return comms
+
+
+def detect_wm():
+    if os.environ.get("SWAYSOCK"):
+        return "sway"
+    if os.environ.get("I3SOCK"):
+        return "i3"
+    comms = _running_comms()
+    for wm in KNOWN_WMS:
+        if wm in comms and shutil.which(wm):
+            return wm
+    return None
+
+
+def _logind_call(method, signature=None, body=()):
+    from jeepney import DBusAddress, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+
+    with open_dbus_connection(bus="SYSTEM") as conn:
+        addr = DBusAddress(**LOGIND)
+        reply = conn.send_and_get_reply(new_method_call(addr, method, signature, body))
+    if reply.header.message_type.name == "error":
+        raise RuntimeError(reply.body[0] if reply.body else method)
+    return reply.body
+
+
+def probe_capabilities():
+    """{method: bool}; unknown (no jeepney/logind) means shown."""
+    caps = {}
+    try:
+        from jeepney import DBusAddress, new_method_call
+        from jeepney.io.blocking import open_dbus_connection
+
+        with open_dbus_connection(bus="SYSTEM") as conn:
+            addr = DBusAddress(**LOGIND)
+            for _label, method, query in ACTIONS:
+                if not query:
+                    continue
+                reply = conn.send_and_get_reply(new_method_call(addr, query))
+                answer = reply.body[0] if reply.body else "na"
+                caps[method] = answer in ("yes", "challenge")
     except Exception:
         pass
+    return caps
 
 
-def do_logout():
-    # Try compositor/WM-specific exits first, then fall back to logind.
-    # Openbox
-    if _has_cmd("openbox") and subprocess.run("pgrep -x openbox >/dev/null", shell=True).returncode == 0:
-        subprocess.run(["openbox", "--exit"])  # best-effort
-        return
-    
-    # i3
-    if _has_cmd("i3-msg") and subprocess.run(["i3-msg", "-t", "get_version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
-        subprocess.run(["i3-msg", "exit"])  # best-effort
-        return
+def session_info():
+    info = _load_cache()
+    if info is None:
+        info = {"wm": detect_wm(), "caps": probe_capabilities()}
+        if info["caps"]:  # don't pin "unknown" for the whole session
+            _save_cache(info)
+    return info
 
-    # Sway
-    if _has_cmd("swaymsg") and os.environ.get("SWAYSOCK"):
-        subprocess.run(["swaymsg", "exit"])  # best-effort
-        return
 
-    # Fallback: terminate the current systemd-logind session
+# ---------- logout -------------------------------------------------------- #
+
+def _openbox_exit():
+    try:
+        from Xlib import X, display
+        from Xlib.protocol import event
+    except ImportError:
+        return proc.ok(["openbox", "--exit"])
+
+    d = display.Display()
+    root = d.screen().root
+    ev = event.ClientMessage(window=root, client_type=d.intern_atom("_OB_CONTROL"),
+                             data=(32, [OB_CONTROL_EXIT, 0, 0, 0, 0]))
+    root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+    d.flush()
+    d.close()
+    return True
+
+
+def _i3_socket_path(wm):
+    path = os.environ.get("SWAYSOCK" if wm == "sway" else "I3SOCK")
+    if path or wm == "sway":
+        return path
+    try:
+        from Xlib import X, display
+        d = display.Display()
+        prop = d.screen().root.get_full_property(d.intern_atom("I3_SOCKET_PATH"), X.AnyPropertyType)
+        d.close()
+        if prop and prop.value:
+            raw = prop.value
+            return (raw.decode() if isinstance(raw, bytes) else str(raw)).rstrip("\0")
+    except Exception:
+        pass
+    return None
+
+
+def _i3_ipc_exit(wm):
+    import struct
+    import socket
+    path = _i3_socket_path(wm)
+    if not path:
+        return False
+    payload = b"exit"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(path)
+        s.sendall(I3_IPC_MAGIC + struct.pack("=II", len(payload), I3_IPC_RUN_COMMAND) + payload)
+    return True
+
+
+def _awesome_exit():
+    from jeepney import DBusAddress, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+
+    remote = DBusAddress("/", bus_name="org.awesomewm.awful", interface="org.awesomewm.awful.Remote")
+    with open_dbus_connection(bus="SESSION") as conn:
+        conn.send(new_method_call(remote, "Eval", "s", ("awesome.quit()",)))
+    return True
+
+
+def _terminate_session():
     session_id = os.environ.get("XDG_SESSION_ID", "")
+    try:
+        if session_id:
+            _logind_call("TerminateSession", "s", (session_id,))
+        else:
+            # As a last resort, kill the user session (can be harsh)
+            _logind_call("KillUser", "ui", (os.getuid(), 15))
+        return
+    except Exception:
+        pass
     if session_id:
-        subprocess.run(["loginctl", "terminate-session", session_id])
+        proc.run(["loginctl", "terminate-session", session_id])
     else:
-        # As a last resort, kill the user session (can be harsh)
-        uid = os.getuid()
-        subprocess.run(["loginctl", "kill-user", str(uid)])
+        proc.run(["loginctl", "kill-user", str(os.getuid())])
 
 
-def do_systemctl(action, label):
-    rc = subprocess.run(["systemctl", action]).returncode
-    if rc != 0:
-        _notify(f"❌ Failed to {label}")
+def do_logout(wm):
+    # Try compositor/WM-specific exits first, then fall back to logind.
+    exits = {
+        "openbox": _openbox_exit,
+        "i3": lambda: _i3_ipc_exit("i3"),
+        "sway": lambda: _i3_ipc_exit("sway"),
+        "awesome": _awesome_exit,
+    }
+    try:
+        if wm in exits and exits[wm]():
+            return
+    except Exception:
+        pass  # best-effort
+    _terminate_session()
 
 
-def apply_action(choice):
-    if choice == " Logout":
-        do_logout()
-    elif choice == " Sleep":
-        do_systemctl("suspend", "sleep")
-    elif choice == " Hybrid-sleep":
-        do_systemctl("hybrid-sleep", "hybrid-sleep")
-    elif choice == " Hibernate":
-        do_systemctl("hibernate", "hibernate")
-    elif choice == " Shutdown":
-        do_systemctl("poweroff", "shutdown")
+# ---------- power actions ------------------------------------------------- #
+
+def do_logind(method):
+    try:
+        _logind_call(method, "b", (True,))
+        return
+    except ImportError:
+        if proc.ok(["systemctl", SYSTEMCTL[method]], timeout=10):
+            return
+    except Exception:
+        pass
+    _notify(f"❌ Failed to {FAIL_LABELS[method]}")
 
 
 def main():
-    options = [
-        " Logout",
-        " Sleep",
-        " Hybrid-sleep",
-        " Hibernate",
-        " Shutdown",
-    ]
+    info = session_info()
+    caps = info.get("caps") or {}
+    actions = [(label, method) for label, method, _query in ACTIONS
+               if method is None or caps.get(method, True)]
+    options = [label for label, _method in actions]
 
-    menu = "\n".join(options)
-    selected = run(f'echo "{menu}" | rofi -dmenu -i -p "Power"')
-    if selected in options:
-        apply_action(selected)
+    p = proc.run(["rofi", "-dmenu", "-i", "-p", "Power"], timeout=None, input="\n".join(options) + "\n")
+    selected = p.stdout.strip()
+    method = dict(actions).get(selected, False)
+    if method is False:
+        return
+    if method is None:
+        do_logout(info.get("wm"))
+    else:
+        do_logind(method)
 
 
 if __name__ == "__main__":
     main()
-
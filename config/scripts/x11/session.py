@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+session.py — start the Openbox session: dependency-ordered, in parallel.
+
+openbox/autostart used to run every step one after another in bash. Here
+each step is a unit with the units it must wait for (`after`); everything
+else starts at once:
+
+  • oneshot units run to completion (at most ONESHOT_TIMEOUT_S; a unit that
+    takes longer is left running and its dependents go ahead)
+  • daemon units are spawned in their own session and count as started
+  • the touchpad/TrackPoint properties are set over one X connection
+    (XInput2 XIChangeProperty) instead of one `xinput --set-prop` per value
+
+The display layout is left to monitor_hotplug.py: its start-up reaction
+already applies the stored profile (display_profiles.py auto), so the
+separate `autorandr --change` is gone. The wallpaper comes from the same
+reaction's post-layout hooks (post_layout.py); the hook state of the last
+X session is dropped first so they run once on the bare root window.
+
+When everything is started a per-unit timing report is printed and saved to
+$XDG_RUNTIME_DIR/session-startup.json.
+
+Usage:
+  session.py              # start the session (openbox/autostart)
+  session.py --dry-run    # show units and their dependencies only
+
+Requires:
+  - python-xlib (optional; falls back to xinput for the input properties)
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable, Sequence
+
+HOME = os.path.expanduser("~")
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+PYTHON = sys.executable or "/usr/bin/python3"
+sys.path.insert(0, SCRIPTS_DIR)
+
+ONESHOT_TIMEOUT_S = 10.0
+REPORT_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), "session-startup.json")
+
+# (device name, property, values) — calibrate the touchpad first:
+#   sudo libinput measure touchpad-size 115x61
+#   sudo systemd-hwdb update
+#   Restart system
+TOUCHPAD = "ELAN0676:00 04F3:3195 Touchpad"
+TRACKPOINT = "TPPS/2 Elan TrackPoint"
+INPUT_PROPS = [
+    (TOUCHPAD, "libinput Accel Speed", [0.4]),
+    (TOUCHPAD, "libinput Accel Profile Enabled", [1, 0, 0]),
+    (TOUCHPAD, "libinput Scrolling Pixel Distance", [25]),
+    (TOUCHPAD, "libinput Tapping Enabled", [1]),
+    (TOUCHPAD, "libinput Natural Scrolling Enabled", [1]),
+    (TRACKPOINT, "libinput Accel Speed", [-0.5]),
+    (TRACKPOINT, "libinput Scrolling Pixel Distance", [45]),
+]
+
+Command = Sequence[str] | Callable[[], bool]
+
+
+class Unit:
+    def __init__(self, name: str, run: Command, after: tuple[str, ...] = (), daemon: bool = False):
+        self.name = name
+        self.run = run
+        self.after = after
+        self.daemon = daemon
+
+
+def script(*parts: str) -> str:
+    return os.path.join(SCRIPTS_DIR, *parts)
+
+
+# ---------- input properties ---------------------------------------------- #
+
+def _xinput_fallback() -> bool:
+    procs = [subprocess.Popen(["xinput", "--set-prop", dev, prop, *map(str, vals)],
+                              stderr=subprocess.DEVNULL)
+             for dev, prop, vals in INPUT_PROPS]
+    return all(p.wait() == 0 for p in procs)
+
+
+def set_input_props() -> bool:
+    """Apply INPUT_PROPS in-process; devices that aren't present are skipped."""
+    import struct
+    try:
+        from Xlib import X, display
+        from Xlib.ext import xinput
+    except ImportError:
+        return _xinput_fallback()
+
+    d = display.Display()
+    try:
+        if not d.has_extension("XInputExtension"):
+            return _xinput_fallback()
+        devices: dict[str, list[int]] = {}
+        for info in d.xinput_query_device(xinput.AllDevices).devices:
+            devices.setdefault(info.name, []).append(info.deviceid)
+        float_atom = d.intern_atom("FLOAT")
+
+        ok = True
+        for dev, prop, vals in INPUT_PROPS:
+            atom = d.intern_atom(prop, only_if_exists=True)
+            if not atom:
+                ok = False  # no driver has registered this property
+                continue
+            for devid in devices.get(dev, []):
+                cur = d.xinput_get_device_property(devid, atom, X.AnyPropertyType, 0, 0)
+                if not cur.type:
+                    ok = False  # property not supported by this driver
+                    continue
+                fmt = cur.value[0] if cur.value else 32
+                if cur.type == float_atom:
+                    data = [struct.unpack("=I", struct.pack("=f", float(v)))[0] for v in vals]
+                else:
+                    data = [int(v) for v in vals]
+                d.xinput_change_device_property(devid, atom, cur.type, X.PropModeReplace, (fmt, data))
+        d.sync()
+        return ok
+    finally:
+        d.close()
+
+
+def forget_post_layout() -> bool:
+    from dotlib import hooks
+    hooks.forget()
+    return True
+
+
+# ---------- units --------------------------------------------------------- #
+
+UNITS = [
+    Unit("xrdb", ["xrdb", "-merge", f"{HOME}/.Xresources"]),
+    # Cached .xkm with every layout as a group; compiled only when the .xkb changed
+    Unit("keymap", [PYTHON, script("x11", "keyboard_layout.py"), "load"]),
+    Unit("keyboard", [PYTHON, script("x11", "keyboard_layout.py"), "serve"], after=("keymap",), daemon=True),
+    # Loading a keymap resets the repeat rate, so xset goes after it (DPMS in the same call)
+    Unit("xset", ["xset", "r", "rate", "350", "25", "+dpms", "dpms", "360", "390", "600"], after=("keymap",)),
+    Unit("input", set_input_props),
+    Unit("post-layout", forget_post_layout),
+    # Applies the profile, then post_layout.py draws the wallpaper
+    Unit("hotplug", [PYTHON, script("x11", "monitor_hotplug.py")], after=("post-layout",), daemon=True),
+    Unit("picom", ["picom", "--config", f"{HOME}/.config/picom/picom.conf"], after=("xrdb",), daemon=True),
+    Unit("polkit", ["/usr/lib/policykit-1-gnome/polkit-gnome-authentication-agent-1"], daemon=True),
+    Unit("bars", [PYTHON, script("x11", "bar_manager.py")], after=("xrdb",), daemon=True),
+    Unit("nm-applet", ["nm-applet"], after=("xrdb",), daemon=True),
+    Unit("redshift", ["redshift"], daemon=True),
+    Unit("dunst", ["dunst"], after=("xrdb",), daemon=True),
+    Unit("chrome", ["google-chrome-stable",
+                    "--enable-features=AcceleratedVideoEncoder,AcceleratedVideoDecodeLinuxGL,"
+                    "AcceleratedVideoDecodeLinuxZeroCopyGL",
+                    "--ignore-gpu-blocklist",
+                    "--disable-gpu-driver-bug-workaround"], daemon=True),
+]
+
+
+def check_units(units: list[Unit]) -> None:
+    """Unknown dependencies or cycles are configuration errors."""
+    names = {u.name for u in units}
+    for u in units:
+        missing = [a for a in u.after if a not in names]
+        if missing:
+            raise ValueError(f"unit {u.name!r} waits for unknown unit(s) {missing}")
+    deps = {u.name: set(u.after) for u in units}
+    while deps:
+        free = [n for n, after in deps.items() if not after & deps.keys()]
+        if not free:
+            raise ValueError(f"dependency cycle among {sorted(deps)}")
+        for n in free:
+            del deps[n]
+
+
+# ---------- runner -------------------------------------------------------- #
+
+def run_unit(u: Unit) -> str:
+    if callable(u.run):
+        return "ok" if u.run() else "failed"
+    if not shutil.which(u.run[0]):
+        return "missing"
+    if u.daemon:
+        subprocess.Popen(list(u.run), stdin=subprocess.DEVNULL, start_new_session=True)
+        return "started"
+    proc = subprocess.Popen(list(u.run), stdin=subprocess.DEVNULL)
+    try:
+        return "ok" if proc.wait(ONESHOT_TIMEOUT_S) == 0 else f"exit {proc.returncode}"
+    except subprocess.TimeoutExpired:
+        return "timeout"
+
+
+def start(units: list[Unit]) -> dict[str, dict]:
+    t0 = time.monotonic()
+    done = {u.name: threading.Event() for u in units}
+    results: dict[str, dict] = {}
+
+    def worker(u: Unit) -> None:
+        for dep in u.after:
+            done[dep].wait()
+        began = time.monotonic()
+        try:
+            status = run_unit(u)
+        except Exception as e:
+            status = f"error: {e}"
+        results[u.name] = {"start": began - t0, "took": time.monotonic() - began,
+                           "status": status, "after": list(u.after)}
+        done[u.name].set()
+
+    threads = [threading.Thread(target=worker, args=(u,), name=f"unit-{u.name}") for u in units]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def report(units: list[Unit], results: dict[str, dict]) -> str:
+    total = max((r["start"] + r["took"] for r in results.values()), default=0.0)
+    lines = [f"session: all units started in {total:.3f}s",
+             f"  {'unit':<12} {'start':>7} {'took':>7}  status"]
+    for u in sorted(units, key=lambda u: results[u.name]["start"]):
+        r = results[u.name]
+        lines.append(f"  {u.name:<12} {r['start']:7.3f} {r['took']:7.3f}  {r['status']}")
+    return "\n".join(lines)
+
+
+def save_report(results: dict[str, dict]) -> None:
+    import json
+    try:
+        with open(REPORT_FILE, "w") as f:
+            json.dump({"ts": time.time(), "units": results}, f, indent=2)
+    except OSError:
+        pass
+
+
+def main() -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Parallel Openbox session start-up")
+    parser.add_argument("--dry-run", action="store_true", help="show the units and exit")
+    args = parser.parse_args()
+
+    check_units(UNITS)
+    if args.dry_run:
+        for u in UNITS:
+            kind = "daemon" if u.daemon else "oneshot"
+            after = f"  after {', '.join(u.after)}" if u.after else ""
+            print(f"{u.name:<12} {kind:<8}{after}")
+        return 0
+
+    results = start(UNITS)
+    print(report(UNITS, results), flush=True)
+    save_report(results)
+    return 0 if all(r["status"] in ("ok", "started") for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,3 @@
 #!/bin/bash
-
-current_layout=$(setxkbmap -query | awk '/layout:/ { print $2 }')
-current_variant=$(setxkbmap -query | awk '/variant:/ { print $2 }')
-
-if [ "$current_layout" == "us" ]; then
-    setxkbmap pl
-else
-    setxkbmap us -variant altgr-intl
-fi
+# XKB group lock on the cached keymap, no setxkbmap recompile: scripts/x11/keyboard_layout.py
+exec /usr/bin/python3 ~/.config/scripts/dotctl.py keyboard toggle "$@"
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+wallpaper.py — per-output wallpaper with pre-scaled, cached variants.
+
+The source image named in ~/.wallpaper is decoded and scaled once per
+output geometry with Pillow (crop-to-fill, like `feh --bg-fill`) and kept
+in ~/.cache/wallpaper/<image hash>/<W>x<H>.jpg. A layout change then only
+hands feh one ready-made image per output (`feh --bg-center a.jpg b.jpg`,
+one per Xinerama screen in monitor order), so nothing is decoded at full
+resolution or rescaled on the hot path.
+
+`set` and `prerender` also render every geometry found in the display
+profile store (display_profiles.py), so switching to a known setup never
+waits on a resize.
+
+The image hash is memoised per (path, size, mtime) in the cache's
+index.json; only the two most recent images' variants are kept.
+
+Without Pillow it falls back to `feh --bg-fill <source>`.
+
+Usage:
+  wallpaper.py                 # apply ~/.wallpaper to the current outputs
+  wallpaper.py set IMAGE       # remember IMAGE, pre-render, apply
+  wallpaper.py prerender       # render variants for all stored layouts
+
+Requires:
+  - feh
+  - Pillow (optional, for the cache)
+  - python-xlib (optional, otherwise `xrandr --listmonitors`)
+"""
+
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+from collections.abc import Iterable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from dotlib import proc, trace
+
+WALLPAPER_FILE = Path.home() / ".wallpaper"
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "wallpaper"
+INDEX_FILE = CACHE_DIR / "index.json"
+KEEP_IMAGES = 2
+JPEG_QUALITY = 92
+FEH_TIMEOUT_S = 10   # feh only sets the root pixmap; it exits once done
+
+LISTMON_RE = re.compile(r"^\s*\d+:\s+\S+\s+(\d+)/\d+x(\d+)/\d+\+(-?\d+)\+(-?\d+)\s+(\S+)")
+
+Geometry = tuple[int, int]
+
+
+# ---------- source image -------------------------------------------------- #
+
+def source_image() -> Path | None:
+    try:
+        line = WALLPAPER_FILE.read_text().splitlines()[0].strip()
+    except (OSError, IndexError):
+        return None
+    path = Path(os.path.expanduser(line))
+    return path if path.is_file() else None
+
+
+def _load_index() -> dict:
+    import json
+    try:
+        return json.loads(INDEX_FILE.read_text())
+    except (OSError, ValueError):
+        return {"images": []}
+
+
+def _save_index(index: dict) -> None:
+    import json
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = INDEX_FILE.with_suffix(f".{os.getpid()}")
+    tmp.write_text(json.dumps(index, indent=2))
+    os.replace(tmp, INDEX_FILE)
+
+
+def image_hash(path: Path) -> str:
+    """Content hash, recomputed only when the file's size or mtime changed."""
+    st = path.stat()
+    stamp = [str(path), st.st_size, st.st_mtime_ns]
+    index = _load_index()
+    for entry in index["images"]:
+        if entry["stamp"] == stamp:
+            return entry["hash"]
+
+    import hashlib  # only on a cache miss
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()[:16]
+
+    images = [e for e in index["images"] if e["hash"] != digest]
+    images.insert(0, {"hash": digest, "stamp": stamp})
+    for old in images[KEEP_IMAGES:]:
+        shutil.rmtree(CACHE_DIR / old["hash"], ignore_errors=True)
+    index["images"] = images[:KEEP_IMAGES]
+    _save_index(index)
+    return digest
+
+
+# ---------- geometry ------------------------------------------------------ #
+
+def current_outputs() -> list[tuple[str, Geometry]]:
+    """[(name, (w, h))] of active monitors, in RandR/Xinerama order."""
+    with trace.span("geometry") as sp:
+        outputs = _current_outputs()
+        sp.args["outputs"] = [n for n, _ in outputs]
+    return outputs
+
+
+def _current_outputs() -> list[tuple[str, Geometry]]:
+    try:
+        from Xlib import display
+        from Xlib.ext import randr
+
+        d = display.Display()
+        try:
+            mons = randr.get_monitors(d.screen().root, is_active=True).monitors
+            return [(d.get_atom_name(m.name), (m.width_in_pixels, m.height_in_pixels)) for m in mons]
+        finally:
+            d.close()
+    except Exception:
+        pass
+
+    out = proc.output(["xrandr", "--listmonitors"])
+    outputs = []
+    for line in out.splitlines()[1:]:
+        m = LISTMON_RE.match(line)
+        if m:
+            outputs.append((m.group(5), (int(m.group(1)), int(m.group(2)))))
+    return outputs
+
+
+def stored_geometries() -> Iterable[Geometry]:
+    """Logical sizes used by any layout in the display profile store."""
+    try:
+        import display_profiles
+        store = display_profiles.ProfileStore()
+        names = store.names()
+    except Exception:
+        return []
+    sizes = set()
+    for name in names:
+        prof = store.get(name) or {}
+        for o in (prof.get("outputs") or {}).values():
+            if not o.get("enabled") or not o.get("mode"):
+                continue
+            w, h = (int(v) for v in o["mode"].split("x"))
+            sizes.add((h, w) if o.get("rotate") in ("left", "right") else (w, h))
+    return sorted(sizes)
+
+
+# ---------- variants ------------------------------------------------------ #
+
+def variant_path(digest: str, size: Geometry) -> Path:
+    return CACHE_DIR / digest / f"{size[0]}x{size[1]}.jpg"
+
+
+def render(src: Path, digest: str, sizes: Iterable[Geometry]) -> dict[Geometry, Path]:
+    """Make sure a variant exists for every size; the source is decoded at most once."""
+    from PIL import Image, ImageOps
+
+    paths = {s: variant_path(digest, s) for s in sizes}
+    missing = [s for s, p in paths.items() if not p.is_file()]
+    if missing:
+        paths[missing[0]].parent.mkdir(parents=True, exist_ok=True)
+        with Image.open(src) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            for size in missing:
+                tmp = paths[size].with_suffix(f".{os.getpid()}.jpg")
+                ImageOps.fit(img, size, Image.LANCZOS).save(tmp, quality=JPEG_QUALITY)
+                os.replace(tmp, paths[size])
+    return paths
+
+
+def apply(src: Path, outputs: list[tuple[str, Geometry]]) -> bool:
+    if not shutil.which("feh"):
+        return False
+    try:
+        with trace.span("render", sizes=len({g for _, g in outputs})):
+            paths = render(src, image_hash(src), {g for _, g in outputs})
+    except ImportError:
+        paths = None  # no Pillow
+    if not paths or not outputs:
+        argv = ["feh", "--no-fehbg", "--bg-fill", str(src)]
+    else:
+        # One image per Xinerama screen, already at that screen's size
+        argv = ["feh", "--no-fehbg", "--bg-center", *(str(paths[g]) for _, g in outputs)]
+    return proc.ok(argv, timeout=FEH_TIMEOUT_S, capture=False)
+
+
+def redraw_wallpaper() -> bool:
+    """Re-apply ~/.wallpaper to the current layout (the post_layout.py hook)."""
+    src = source_image()
+    return apply(src, current_outputs()) if src else True
+
+
+def prerender(src: Path) -> None:
+    sizes = set(stored_geometries()) | {g for _, g in current_outputs()}
+    try:
+        render(src, image_hash(src), sizes)
+    except ImportError:
+        pass
+
+
+# ---------- main ---------------------------------------------------------- #
+
+def main(argv: list[str]) -> int:
+    op = argv[0] if argv else "apply"
+    if op == "set" and len(argv) > 1:
+        path = Path(argv[1]).expanduser().resolve()
+        if not path.is_file():
+            print(f"No such image: {path}", file=sys.stderr)
+            return 1
+        WALLPAPER_FILE.write_text(f"{path}\n")
+        prerender(path)
+        return 0 if apply(path, current_outputs()) else 1
+
+    src = source_image()
+    if src is None:
+        print(f"No wallpaper configured in {WALLPAPER_FILE}", file=sys.stderr)
+        return 1
+    if op == "prerender":
+        prerender(src)
+        return 0
+    if op == "apply":
+        return 0 if apply(src, current_outputs()) else 1
+    print(__doc__.strip().split("Usage:")[1], file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    with trace.span("wallpaper"):
+        rc = main(sys.argv[1:])
+    sys.exit(rc)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+workspaces.py — push-based workspace indicator for polybar (tail = true).
+
+Prints a line only when the workspace state changes; no polling, no
+per-second process churn.
+
+Backends:
+  openbox   Subscribe to PropertyNotify on the root window for
+            _NET_CURRENT_DESKTOP / _NET_DESKTOP_NAMES / _NET_NUMBER_OF_DESKTOPS
+            (works with any EWMH window manager).
+  awesome   Listen for the org.awesomewm.Workspaces.Changed D-Bus signal
+            emitted by ~/.config/awesome/workspaces_signal.lua. The initial
+            state is fetched once through awesome's own Remote.Eval method,
+            on the same connection (no awesome-client fork).
+
+Usage:
+  workspaces.py openbox [--names]     # "3" (or the desktop name)
+  workspaces.py awesome               # "1 [2] 3 4"
+
+Requires:
+  - python-xlib (openbox)
+  - jeepney     (awesome)
+"""
+
+import argparse
+import sys
+
+AWESOME_IFACE = "org.awesomewm.Workspaces"
+AWESOME_SIGNAL = "Changed"
+
+# Same text the Lua snippet publishes; used for the initial state only
+AWESOME_QUERY = """
+local awful = require("awful")
+local s = awful.screen.focused()
+local tags = {}
+for _, t in ipairs(s.tags) do
+  table.insert(tags, t.selected and ("[" .. t.name .. "]") or t.name)
+end
+return table.concat(tags, " ")
+"""
+
+
+class Emitter:
+    """Print only when the rendered text actually changes."""
+
+    def __init__(self):
+        self.last = None
+
+    def __call__(self, text: str) -> None:
+        if text != self.last:
+            print(text, flush=True)
+            self.last = text
+
+
+# ---------- Openbox / EWMH ------------------------------------------------ #
+
+def run_openbox(show_names: bool) -> int:
+    try:
+        from Xlib import X, display
+    except ImportError:
+        sys.stderr.write("python-xlib not found – install it with:  pip install python-xlib\n")
+        return 1
+
+    d = display.Display()
+    root = d.screen().root
+    current = d.intern_atom("_NET_CURRENT_DESKTOP")
+    names = d.intern_atom("_NET_DESKTOP_NAMES")
+    number = d.intern_atom("_NET_NUMBER_OF_DESKTOPS")
+    watched = {current, names, number}
+
+    def render() -> str:
+        prop = root.get_full_property(current, X.AnyPropertyType)
+        if not prop or not len(prop.value):
+            return ""
+        idx = int(prop.value[0])
+        if show_names:
+            nprop = root.get_full_property(names, X.AnyPropertyType)
+            if nprop and nprop.value:
+                raw = nprop.value
+                if isinstance(raw, str):
+                    raw = raw.encode()
+                labels = bytes(raw).decode("utf-8", errors="ignore").split("\0")
+                if idx < len(labels) and labels[idx]:
+                    return labels[idx]
+        return str(idx + 1)
+
+    emit = Emitter()
+    root.change_attributes(event_mask=X.PropertyChangeMask)
+    emit(render())
+
+    while True:
+        ev = d.next_event()
+        if ev.type == X.PropertyNotify and ev.atom in watched:
+            emit(render())
+
+
+# ---------- Awesome / D-Bus ----------------------------------------------- #
+
+def run_awesome() -> int:
+    try:
+        from jeepney import DBusAddress, MatchRule, message_bus, new_method_call
+        from jeepney.io.blocking import Proxy, open_dbus_connection
+    except ImportError:
+        sys.stderr.write("jeepney not found – install it with:  pip install jeepney\n")
+        return 1
+
+    conn = open_dbus_connection(bus="SESSION")
+    rule = MatchRule(type="signal", interface=AWESOME_IFACE, member=AWESOME_SIGNAL)
+    Proxy(message_bus, conn).AddMatch(rule)
+
+    emit = Emitter()
+    with conn.filter(rule) as queue:
+        # Subscribe first, then ask: a switch in between is not lost
+        remote = DBusAddress("/", bus_name="org.awesomewm.awful",
+                             interface="org.awesomewm.awful.Remote")
+        try:
+            reply = conn.send_and_get_reply(new_method_call(remote, "Eval", "s", (AWESOME_QUERY,)))
+            if reply.body:
+                emit(str(reply.body[0]))
+        except Exception:
+            pass  # awesome not up yet; the first signal will fill it in
+
+        while True:
+            msg = conn.recv_until_filtered(queue)
+            if msg.body:
+                emit(str(msg.body[0]))
+
+
+# ---------- main ---------------------------------------------------------- #
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Event-driven workspace indicator")
+    parser.add_argument("wm", choices=["openbox", "awesome"])
+    parser.add_argument("--names", action="store_true", help="show desktop names instead of numbers (openbox)")
+    args = parser.parse_args()
+
+    if args.wm == "awesome":
+        return run_awesome()
+    return run_openbox(args.names)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except (KeyboardInterrupt, BrokenPipeError):
+        sys.exit(0)
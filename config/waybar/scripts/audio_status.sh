@@ -0,0 +1,5 @@
+#!/bin/bash
+
+# Long-lived producer: one sound-server subscription, prints only on change.
+# See `dotctl.py audio status --help` for the available options.
+exec /usr/bin/python3 ~/.config/scripts/dotctl.py audio status "$@"
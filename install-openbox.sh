@@ -176,14 +176,38 @@ CONFIG_FILES=(
   rofi/wifi.rasi
   rofi/themes/violet-dark.rasi
   rofi/config.rasi
+  scripts/dotctl.py
   scripts/cpu_speed_limit.sh
+  scripts/cpu_freq.py
+  scripts/cpu_cap.py
+  scripts/dotlib/__init__.py
+  scripts/dotlib/power.py
+  scripts/dotlib/debounce.py
+  scripts/dotlib/audio.py
+  scripts/dotlib/menu.py
+  scripts/dotlib/trace.py
+  scripts/dotlib/metrics.py
+  scripts/dotlib/proc.py
+  scripts/dotlib/notify.py
+  scripts/dotlib/hooks.py
+  scripts/switch_audio_sink.py
+  scripts/audio_status.py
+  scripts/wifi_picker.py
+  scripts/notify.py
+  display-refresh.json
   scripts/x11/screenshot-area.sh
   scripts/x11/load_wallpaper.sh
+  scripts/x11/wallpaper.py
+  scripts/x11/post_layout.py
+  scripts/x11/bar_manager.py
+  scripts/x11/session.py
   scripts/x11/bluetooth_picker.py
   scripts/x11/power_menu.py
   scripts/x11/wifi-picker.sh
   scripts/x11/monitor_hotplug.py
   scripts/x11/toggle_layout.sh
+  scripts/x11/keyboard_layout.py
+  scripts/x11/workspaces.py
   scripts/x11/record_screen_mic_only.sh
   scripts/x11/record_screen_audio_mic.sh
   scripts/x11/monitor_switcher_reasonable.py
@@ -192,11 +216,15 @@ CONFIG_FILES=(
   scripts/x11/monitor_switcher_native.py
   scripts/x11/record_screen_audio.sh
   scripts/x11/monitor_layout_menu.py
+  scripts/x11/display_edid.py
+  scripts/x11/display_profiles.py
+  scripts/x11/display_match.py
   scripts/x11/monitor_switcher_all.py
   scripts/modem_read_sms.sh
   redshift.conf
   polybar/config.ini
   polybar/scripts/cpu_speed.sh
+  polybar/scripts/audio_status.sh
   polybar/scripts/bluetooth.sh
   polybar/scripts/awesome-workspaces.sh
   polybar/scripts/cpu_speed_limit.sh
@@ -209,6 +237,7 @@ CONFIG_FILES=(
   polybar/launch.sh
   picom/picom.conf
   wireplumber/main.lua.d/50-alsa-config.lua
+  awesome/workspaces_signal.lua
   autorandr/settings.ini
   autorandr/postswitch
   pl_de_custom_caps_lock.xkb
@@ -239,6 +268,22 @@ mkdir -p "$DEST_TMP_DIR"
 
 copy_files "./dotfiles" "$DEST_TMP_DIR" "${DOT_FILES[@]}"
 copy_files "./config" "$DEST_TMP_DIR/.config" "${CONFIG_FILES[@]}"
+# Byte-compile the scripts now so dotctl.py starts from cached bytecode
+python3 -m compileall -q -x 'app_menu\.py$' "$DEST_TMP_DIR/.config/scripts" >/dev/null ||
+  echo "Warning: some scripts failed to byte-compile" >&2
 copy_files "./themes" "$DEST_TMP_DIR/.themes" "${THEME_FILES[@]}"
 
+# 3. Root helper for cpu_cap.py: root-owned, so the sudo rule can't be used to run user-editable code
+sudo install -D -o root -g root -m 0755 ./system/usr/local/libexec/cpu-cap-apply /usr/local/libexec/cpu-cap-apply
+sudo install -D -o root -g root -m 0644 ./system/usr/share/polkit-1/actions/org.dotfiles.cpu-cap.policy \
+  /usr/share/polkit-1/actions/org.dotfiles.cpu-cap.policy
+SUDOERS_TMP=$(mktemp)
+echo "$USER ALL=(root) NOPASSWD: /usr/local/libexec/cpu-cap-apply" > "$SUDOERS_TMP"
+if sudo visudo -cqf "$SUDOERS_TMP"; then
+  sudo install -o root -g root -m 0440 "$SUDOERS_TMP" /etc/sudoers.d/cpu-cap
+else
+  echo "Warning: sudoers rule rejected; cpu_cap.py will ask through pkexec" >&2
+fi
+rm -f "$SUDOERS_TMP"
+
 echo 'All done.'
@@ -177,7 +177,25 @@ CONFIG_FILES=(
   rofi/wifi.rasi
   rofi/themes/violet-dark.rasi
   rofi/config.rasi
+  scripts/dotctl.py
   scripts/cpu_speed_limit.sh
+  scripts/cpu_freq.py
+  scripts/cpu_cap.py
+  scripts/dotlib/__init__.py
+  scripts/dotlib/power.py
+  scripts/dotlib/debounce.py
+  scripts/dotlib/audio.py
+  scripts/dotlib/menu.py
+  scripts/dotlib/trace.py
+  scripts/dotlib/metrics.py
+  scripts/dotlib/proc.py
+  scripts/dotlib/notify.py
+  scripts/dotlib/hooks.py
+  scripts/switch_audio_sink.py
+  scripts/audio_status.py
+  scripts/wifi_picker.py
+  scripts/notify.py
+  display-refresh.json
   scripts/modem_read_sms.sh
   scripts/wayland/screenshot-area.sh
   scripts/wayland/screenshot-clipboard.sh
@@ -186,6 +204,9 @@ CONFIG_FILES=(
   scripts/wayland/screenshot-area-clipboard.sh
   scripts/wayland/app_menu.py
   scripts/wayland/pick_best_output.py
+  scripts/wayland/mode_index.py
+  scripts/wayland/wlr_output_client.py
+  scripts/wayland/kanshi_gen.py
   scripts/wayland/switch-audio-sink.sh
   scripts/wayland/monitor_layout_menu.py
   scripts/wayland/screenshot-fullscreen.sh
@@ -199,6 +220,7 @@ CONFIG_FILES=(
   waybar/config
   waybar/style.css
   waybar/scripts/cpu_speed.sh
+  waybar/scripts/audio_status.sh
   waybar/scripts/bluetooth.sh
   waybar/scripts/awesome-workspaces.sh
   waybar/scripts/cpu_speed_limit.sh
@@ -237,5 +259,25 @@ mkdir -p "$DEST_TMP_DIR"
 
 copy_files "./dotfiles" "$DEST_TMP_DIR" "${DOT_FILES[@]}"
 copy_files "./config" "$DEST_TMP_DIR/.config" "${CONFIG_FILES[@]}"
+# Byte-compile the scripts now so dotctl.py starts from cached bytecode
+python3 -m compileall -q -x 'app_menu\.py$' "$DEST_TMP_DIR/.config/scripts" >/dev/null ||
+  echo "Warning: some scripts failed to byte-compile" >&2
+# Wrap the hand-written kanshi profiles in kanshi_gen.py's generated blocks, so
+# the catch-all profiles learn every new monitor set from the first login on
+XDG_CONFIG_HOME="$DEST_TMP_DIR/.config" python3 "$DEST_TMP_DIR/.config/scripts/wayland/kanshi_gen.py" generate ||
+  echo "Warning: could not generate the kanshi profiles" >&2
+
+# 3. Root helper for cpu_cap.py: root-owned, so the sudo rule can't be used to run user-editable code
+sudo install -D -o root -g root -m 0755 ./system/usr/local/libexec/cpu-cap-apply /usr/local/libexec/cpu-cap-apply
+sudo install -D -o root -g root -m 0644 ./system/usr/share/polkit-1/actions/org.dotfiles.cpu-cap.policy \
+  /usr/share/polkit-1/actions/org.dotfiles.cpu-cap.policy
+SUDOERS_TMP=$(mktemp)
+echo "$USER ALL=(root) NOPASSWD: /usr/local/libexec/cpu-cap-apply" > "$SUDOERS_TMP"
+if sudo visudo -cqf "$SUDOERS_TMP"; then
+  sudo install -o root -g root -m 0440 "$SUDOERS_TMP" /etc/sudoers.d/cpu-cap
+else
+  echo "Warning: sudoers rule rejected; cpu_cap.py will ask through pkexec" >&2
+fi
+rm -f "$SUDOERS_TMP"
 
 echo 'All done.'